@@ -0,0 +1,111 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class AnswerCache:
+    def __init__(self, cfg):
+        self.max_size = cfg.ANSWER_CACHE_SIZE
+        self.ttl = cfg.ANSWER_CACHE_TTL
+        self.threshold = cfg.ANSWER_CACHE_SIMILARITY
+        self.history_turns = cfg.ANSWER_CACHE_HISTORY_TURNS
+
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._entries = OrderedDict()
+        self._next_id = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def _context_key(self, rows, history):
+        products = tuple((row[0], row[5]) for row in rows)
+        turns = history[-self.history_turns:] if self.history_turns else []
+        digest = hashlib.sha1(
+            json.dumps(turns, ensure_ascii=False, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        return products, digest
+
+    @staticmethod
+    def _unit(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _remove(self, entry_id):
+        key, _, _, _ = self._entries.pop(entry_id)
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            bucket.discard(entry_id)
+            if not bucket:
+                del self._buckets[key]
+
+    def get(self, query_embedding, rows, history):
+        key = self._context_key(rows, history)
+        query = self._unit(query_embedding)
+        now = time.time()
+
+        with self._lock:
+            best_id, best_score = None, self.threshold
+            for entry_id in list(self._buckets.get(key, ())):
+                _, vector, answer, stored_at = self._entries[entry_id]
+                if self.ttl and now - stored_at > self.ttl:
+                    self._remove(entry_id)
+                    continue
+                score = float(np.dot(query, vector))
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(best_id)
+            return self._entries[best_id][2]
+
+    def put(self, query_embedding, rows, history, answer):
+        key = self._context_key(rows, history)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (key, self._unit(query_embedding), answer, time.time())
+            self._buckets.setdefault(key, set()).add(entry_id)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_products(self, product_ids):
+        product_ids = set(product_ids)
+        with self._lock:
+            stale = [
+                entry_id for entry_id, (key, _, _, _) in self._entries.items()
+                if any(pid in product_ids for pid, _ in key[0])
+            ]
+            for entry_id in stale:
+                self._remove(entry_id)
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+            }
@@ -1,24 +1,66 @@
-from flask import Blueprint, request, jsonify, session
+import json
+import os
+import threading
+import uuid
+
+from flask import Blueprint, Response, abort, request, jsonify, session, stream_with_context
+
+from metrics import REGISTRY
 
 api_bp = Blueprint("api", __name__)
 
+def product_card(row):
+    pid, name, desc, link, reviews, version, capacity, image_url, *_ = row
+    return {
+        "id": pid,
+        "name": name,
+        "link": link or f"/product/{pid}",
+        "capacity": capacity,
+        "image_url": image_url or "/static/no_image.png"
+    }
+
+def sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
 def register_api(api_bp, deps):
     product_repo = deps["product_repo"]
     review_repo = deps["review_repo"]
     chat_service = deps["chat_service"]
     logger = deps["logger"]
+    log_repo = deps["log_repo"]
+    log_maintenance = deps["log_maintenance"]
+    review_digests = deps["review_digests"]
+    embedding_sweeper = deps["embedding_sweeper"]
+    llm_gateway = deps["llm_gateway"]
+    db_pool = deps["db_pool"]
+    query_embedder = deps["query_embedder"]
+    answer_cache = deps["answer_cache"]
+    job_repo = deps["job_repo"]
+    import_repo = deps["import_repo"]
+    importer = deps["importer"]
+    importer_dir = deps["import_dir"]
+    fetcher = deps["fetcher"]
+    conversations = deps["conversations"]
+    conversation_pruner = deps["conversation_pruner"]
+    page_cache = deps["page_cache"]
+    startup = deps["startup"]
+    embedding_batcher = deps["embedding_batcher"]
+    metrics_enabled = deps["metrics_enabled"]
+
+    def invalidate_answers(*product_ids):
+        if answer_cache is not None:
+            answer_cache.invalidate_products([int(pid) for pid in product_ids if pid is not None])
 
     @api_bp.before_app_request
     def ensure_session():
-        import uuid
         if "session_id" not in session:
             session["session_id"] = str(uuid.uuid4())
-        if "history" not in session:
-            session["history"] = []
+        if "history" in session:
+            session.pop("history")
 
     @api_bp.get("/get_history")
     def get_history():
-        return jsonify(session.get("history", []))
+        return jsonify(conversations.load(session["session_id"]))
 
     @api_bp.post("/ask")
     def ask():
@@ -27,34 +69,178 @@ def register_api(api_bp, deps):
         if not question:
             return jsonify({"answer": "", "products": [], "error": "Brak pytania"}), 400
 
-        history = session.get("history", [])
+        session_id = session["session_id"]
+        history = conversations.load(session_id)
         history.append({"role": "user", "content": question})
+        conversations.append(session_id, "user", question)
+
+        answer, rows, usage = chat_service.answer(question, history)
+        conversations.append(session_id, "assistant", answer)
+
+        products = [product_card(row) for row in chat_service.referenced_products(rows, answer)]
+        return jsonify({"answer": answer, "products": products, "usage": usage})
+
+    @api_bp.post("/ask_stream")
+    def ask_stream():
+        data = request.json or {}
+        question = data.get("question")
+        if not question:
+            return jsonify({"answer": "", "products": [], "error": "Brak pytania"}), 400
+
+        session_id = session["session_id"]
+        history = conversations.load(session_id)
+        history.append({"role": "user", "content": question})
+        conversations.append(session_id, "user", question)
+
+        def generate():
+            rows = []
+            try:
+                for event, payload in chat_service.answer_stream(question, history):
+                    if event == "products":
+                        rows = payload
+                        yield sse("products", [product_card(row) for row in rows])
+                    elif event == "token":
+                        yield sse("token", {"text": payload})
+                    elif event == "done":
+                        answer, usage = payload
+                        conversations.append(session_id, "assistant", answer)
+                        yield sse("done", {
+                            "answer": answer,
+                            "products": [row[0] for row in chat_service.referenced_products(rows, answer)],
+                            "usage": usage,
+                        })
+            except Exception as e:
+                print(f"Błąd strumieniowania odpowiedzi: {e}")
+                yield sse("error", {"error": "Błąd generowania odpowiedzi"})
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @api_bp.get("/jobs")
+    def list_jobs():
+        return jsonify(job_repo.latest(limit=request.args.get("limit", 50, type=int)))
 
-        answer, rows = chat_service.answer(question, history)
+    @api_bp.get("/jobs/<int:id>")
+    def get_job(id):
+        job = job_repo.get(id)
+        if not job:
+            return jsonify({"error": "Zadanie nie istnieje"}), 404
+        return jsonify(job)
 
-        history.append({"role": "assistant", "content": answer})
-        session["history"] = history
-        session.modified = True
+    @api_bp.post("/imports")
+    def start_import():
+        upload = request.files.get("file")
+        if not upload or not upload.filename:
+            return jsonify({"error": "Brak pliku"}), 400
 
+        ext = os.path.splitext(upload.filename)[1].lower()
+        if ext not in (".csv", ".jsonl"):
+            return jsonify({"error": "Obsługiwane formaty: CSV, JSONL"}), 400
 
-        products_info = []
-        answer_lower = answer.lower()
-        for pid, name, desc, link, reviews in rows:
-            if any(word.lower() in answer_lower for word in name.split()):
-                products_info.append({
-                    "id": pid,
-                    "name": name,
-                    "link": link or f"/product/{pid}",
-                    "capacity": None,
-                    "image_url": "/static/no_image.png"
-                })
+        source = f"upload-{uuid.uuid4().hex}"
+        os.makedirs(importer_dir, exist_ok=True)
+        path = os.path.join(importer_dir, source + ext)
+        upload.save(path)
 
-        return jsonify({"answer": answer, "products": products_info})
+        def run():
+            try:
+                importer.run(path, source=source, report=lambda msg: None)
+                logger.log("BULK_IMPORT", f"Import {source} ({upload.filename}) finished")
+            except Exception as e:
+                print(f"Błąd importu {source}: {e}")
+                logger.log("BULK_IMPORT_FAIL", f"Import {source}: {e}")
+
+        threading.Thread(target=run, name=f"import-{source}", daemon=True).start()
+        return jsonify({"source": source, "status_url": f"/imports/{source}"}), 202
+
+    @api_bp.get("/imports/<source>")
+    def get_import(source):
+        run = import_repo.get(source)
+        if not run:
+            return jsonify({"error": "Import nie istnieje"}), 404
+        return jsonify(run)
+
+    @api_bp.get("/stats/db_pool")
+    def db_pool_stats():
+        return jsonify(db_pool.stats())
+
+    @api_bp.get("/stats/embedding_cache")
+    def embedding_cache_stats():
+        return jsonify(query_embedder.stats())
+
+    @api_bp.get("/stats/embedding_batcher")
+    def embedding_batcher_stats():
+        return jsonify(embedding_batcher.stats() if embedding_batcher is not None else {"enabled": False})
+
+    @api_bp.get("/stats/answer_cache")
+    def answer_cache_stats():
+        return jsonify(answer_cache.stats() if answer_cache is not None else {"enabled": False})
+
+    @api_bp.get("/stats/page_cache")
+    def page_cache_stats():
+        return jsonify(page_cache.stats())
+
+    @api_bp.get("/stats/fetcher")
+    def fetcher_stats():
+        return jsonify(fetcher.stats())
+
+    @api_bp.get("/stats/event_logger")
+    def event_logger_stats():
+        return jsonify(logger.stats())
+
+    @api_bp.get("/stats/logs")
+    def log_stats():
+        return jsonify({**log_maintenance.stats(), "rollups": log_repo.rollups(days=7)})
+
+    @api_bp.get("/stats/review_digests")
+    def review_digest_stats():
+        return jsonify({**review_digests.stats(), **review_digests.repo.stats()})
+
+    @api_bp.get("/stats/llm")
+    def llm_stats():
+        return jsonify(llm_gateway.stats() if llm_gateway is not None else {"enabled": False})
+
+    @api_bp.get("/stats/embedding_sweeper")
+    def embedding_sweeper_stats():
+        return jsonify(embedding_sweeper.stats())
+
+    @api_bp.get("/stats/conversations")
+    def conversation_stats():
+        return jsonify(conversation_pruner.stats())
+
+    @api_bp.get("/stats/startup")
+    def startup_stats():
+        return jsonify(startup.stats())
+
+    @api_bp.get("/metrics")
+    def metrics():
+        if not metrics_enabled:
+            abort(404)
+        gauges = [
+            ("db_pool", db_pool.stats()),
+            ("embedding_cache", query_embedder.stats()),
+            ("page_cache", page_cache.stats()),
+            ("fetcher", fetcher.stats()),
+            ("event_logger", logger.stats()),
+            ("log_maintenance", log_maintenance.stats()),
+            ("conversation_pruner", conversation_pruner.stats()),
+            ("review_digests", review_digests.stats()),
+            ("embedding_sweeper", embedding_sweeper.stats()),
+        ]
+        if embedding_batcher is not None:
+            gauges.append(("embedding_batcher", embedding_batcher.stats()))
+        if answer_cache is not None:
+            gauges.append(("answer_cache", answer_cache.stats()))
+        if llm_gateway is not None:
+            gauges.extend((f"llm_{model}", stats) for model, stats in llm_gateway.stats()["models"].items())
+        return Response(REGISTRY.render(gauges), mimetype="text/plain; version=0.0.4")
 
     @api_bp.get("/new_chat")
     def new_chat():
-        session["history"] = []
-        session.modified = True
+        conversations.clear(session["session_id"])
         return jsonify({"status": "ok"})
 
     @api_bp.delete("/delete/<int:id>")
@@ -65,18 +251,27 @@ def register_api(api_bp, deps):
             return jsonify({"error": "Produkt nie istnieje"}), 404
 
         product_repo.delete(id)
+        invalidate_answers(id)
         logger.log("DELETE_PRODUCT", f"Deleted product {id}")
 
         page = request.args.get("page", 1)
         q = request.args.get("q", "")
         return jsonify({"redirect": f"/view.html?page={page}&q={q}"})
 
+    @api_bp.get("/reviews/<int:product_id>")
+    def more_reviews(product_id):
+        before = request.args.get("before", type=int)
+        limit = min(max(1, request.args.get("limit", 20, type=int)), 100)
+        reviews, has_more = review_repo.list_page(product_id, before, limit)
+        return jsonify({"reviews": reviews, "has_more": has_more})
+
     @api_bp.delete("/delete_review/<int:id>")
     def delete_review(id):
         txt = review_repo.get_text(id)
         if not txt:
             return jsonify({"error": "Opinia nie istnieje"}), 404
-        review_repo.delete(id)
+        product_id = review_repo.delete(id)
+        invalidate_answers(product_id)
         logger.log("DELETE_REVIEW", f"Deleted review ID {id}")
         return jsonify({"status": "ok"})
 
@@ -84,7 +279,8 @@ def register_api(api_bp, deps):
     def edit_review(id):
         data = request.json or {}
         new_text = data.get("review_text", "")
-        review_repo.update(id, new_text)
+        product_id = review_repo.update(id, new_text)
+        invalidate_answers(product_id)
         logger.log("EDIT_REVIEW", f"Edited review ID {id}")
         return jsonify({"status": "ok"})
 
@@ -95,5 +291,6 @@ def register_api(api_bp, deps):
         review_text = data.get("review_text", "")
 
         review_id = review_repo.add(product_id, review_text)
-        logger.log("ADD_REVIEW", f"Review for product_id {product_id}: {review_text}")
+        invalidate_answers(product_id)
+        logger.log("ADD_REVIEW", f"Review for product_id {product_id} ({len(review_text)} chars)")
         return jsonify({"id": review_id, "text": review_text})
\ No newline at end of file
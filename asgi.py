@@ -0,0 +1,238 @@
+import asyncio
+import contextlib
+import json
+import uuid
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from a2wsgi import WSGIMiddleware
+from itsdangerous import BadSignature
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+from api import product_card, sse
+from chat_service import AsyncChatService
+from config import Config
+from connection_pool import create_async_pool
+from llm import create_async_openai_client
+from main import create_app
+from product_repo import AsyncProductRepository
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+class FlaskSession:
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+        self.cookie_name = flask_app.config["SESSION_COOKIE_NAME"]
+        self.max_age = int(flask_app.permanent_session_lifetime.total_seconds())
+
+    def load(self, request):
+        cookie = request.cookies.get(self.cookie_name)
+        if not cookie:
+            return {}
+        try:
+            return self.serializer.loads(cookie, max_age=self.max_age)
+        except BadSignature:
+            return {}
+
+    def session_id(self, request):
+        data = self.load(request)
+        if "session_id" in data:
+            return data["session_id"], None
+        data["session_id"] = str(uuid.uuid4())
+        data.pop("history", None)
+        return data["session_id"], self.serializer.dumps(data)
+
+    def save(self, response, cookie):
+        if cookie is not None:
+            response.set_cookie(
+                self.cookie_name, cookie,
+                httponly=self.flask_app.config["SESSION_COOKIE_HTTPONLY"],
+                secure=self.flask_app.config["SESSION_COOKIE_SECURE"],
+                samesite=self.flask_app.config["SESSION_COOKIE_SAMESITE"],
+            )
+        return response
+
+
+async def wait_for_disconnect(request):
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def run_until_disconnect(request, coro, timeout):
+    work = asyncio.ensure_future(asyncio.wait_for(coro, timeout))
+    watcher = asyncio.ensure_future(wait_for_disconnect(request))
+    try:
+        done, _ = await asyncio.wait({work, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        if work not in done:
+            raise ClientDisconnected()
+        return work.result()
+    finally:
+        for task in (work, watcher):
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError, Exception):
+                await task
+
+
+def create_asgi_app(cfg=Config):
+    flask_app = create_app()
+    deps = flask_app.extensions["deps"]
+    sync_chat = deps["chat_service"]
+    conversations = deps["conversations"]
+    logger = deps["logger"]
+    sessions = FlaskSession(flask_app)
+
+    async_pool = create_async_pool(cfg)
+    gateway = deps["llm_gateway"]
+    if gateway is not None:
+        client = gateway.async_client(create_async_openai_client(cfg, max_retries=0))
+    else:
+        client = create_async_openai_client(cfg)
+    chat_service = AsyncChatService(
+        client,
+        sync_chat.embedder,
+        AsyncProductRepository(async_pool, cfg, deps["product_repo"].column),
+        logger,
+        sync_chat.prompt_builder,
+        sync_chat.answer_cache,
+        sync_chat.matcher,
+        timeout=cfg.ASYNC_CHAT_TIMEOUT,
+    )
+    inflight = asyncio.Semaphore(cfg.ASYNC_CHAT_MAX_INFLIGHT)
+
+    async def read_question(request):
+        try:
+            data = await request.json()
+        except json.JSONDecodeError:
+            data = {}
+        return (data or {}).get("question")
+
+    async def start_turn(request, question):
+        session_id, cookie = sessions.session_id(request)
+        history = await asyncio.to_thread(conversations.load, session_id)
+        history.append({"role": "user", "content": question})
+        await asyncio.to_thread(conversations.append, session_id, "user", question)
+        return session_id, cookie, history
+
+    def busy():
+        return JSONResponse({"answer": "", "products": [], "error": "Serwer jest przeciążony"}, status_code=503)
+
+    async def try_acquire():
+        if inflight.locked():
+            return False
+        await inflight.acquire()
+        return True
+
+    async def ask(request):
+        question = await read_question(request)
+        if not question:
+            return JSONResponse({"answer": "", "products": [], "error": "Brak pytania"}, status_code=400)
+        if not await try_acquire():
+            return busy()
+
+        try:
+            session_id, cookie, history = await start_turn(request, question)
+            try:
+                answer, rows, usage = await run_until_disconnect(
+                    request, chat_service.answer(question, history), cfg.ASYNC_CHAT_TIMEOUT
+                )
+            except ClientDisconnected:
+                logger.log("ASK_CANCELLED", f"Question: '{question}'")
+                return sessions.save(JSONResponse({"error": "Anulowano"}, status_code=499), cookie)
+            except TimeoutError:
+                logger.log("ASK_TIMEOUT", f"Question: '{question}'")
+                return sessions.save(
+                    JSONResponse({"answer": "", "products": [], "error": "Przekroczono czas odpowiedzi"}, status_code=504),
+                    cookie,
+                )
+            await asyncio.to_thread(conversations.append, session_id, "assistant", answer)
+        finally:
+            inflight.release()
+
+        products = [product_card(row) for row in chat_service.referenced_products(rows, answer)]
+        return sessions.save(JSONResponse({"answer": answer, "products": products, "usage": usage}), cookie)
+
+    async def ask_stream(request):
+        question = await read_question(request)
+        if not question:
+            return JSONResponse({"answer": "", "products": [], "error": "Brak pytania"}, status_code=400)
+        if not await try_acquire():
+            return busy()
+
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                inflight.release()
+
+        try:
+            session_id, cookie, history = await start_turn(request, question)
+        except BaseException:
+            release()
+            raise
+
+        async def generate():
+            rows = []
+            try:
+                async with asyncio.timeout(cfg.ASYNC_CHAT_TIMEOUT):
+                    async for event, payload in chat_service.answer_stream(question, history):
+                        if event == "products":
+                            rows = payload
+                            yield sse("products", [product_card(row) for row in rows])
+                        elif event == "token":
+                            yield sse("token", {"text": payload})
+                        elif event == "done":
+                            answer, usage = payload
+                            await asyncio.to_thread(conversations.append, session_id, "assistant", answer)
+                            yield sse("done", {
+                                "answer": answer,
+                                "products": [row[0] for row in chat_service.referenced_products(rows, answer)],
+                                "usage": usage,
+                            })
+            except asyncio.CancelledError:
+                logger.log("ASK_CANCELLED", f"Question: '{question}'")
+                raise
+            except TimeoutError:
+                logger.log("ASK_TIMEOUT", f"Question: '{question}'")
+                yield sse("error", {"error": "Przekroczono czas odpowiedzi"})
+            except Exception as e:
+                print(f"Błąd strumieniowania odpowiedzi: {e}")
+                yield sse("error", {"error": "Błąd generowania odpowiedzi"})
+            finally:
+                release()
+
+        response = StreamingResponse(
+            generate(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            background=BackgroundTask(release),
+        )
+        return sessions.save(response, cookie)
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        await async_pool.open()
+        try:
+            yield
+        finally:
+            await async_pool.close()
+
+    return Starlette(
+        routes=[
+            Route("/ask", ask, methods=["POST"]),
+            Route("/ask_stream", ask_stream, methods=["POST"]),
+            Mount("/", app=WSGIMiddleware(flask_app)),
+        ],
+        lifespan=lifespan,
+    )
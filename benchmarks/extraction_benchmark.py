@@ -0,0 +1,68 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from text_extraction import TextExtractionEngine, available_backends
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pages")
+
+
+def bench(fn, repeat):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def run(corpus, repeat):
+    files = sorted(glob.glob(os.path.join(corpus, "*.html")) + glob.glob(os.path.join(corpus, "*.pdf")))
+    if not files:
+        raise SystemExit(f"Brak plików .html/.pdf w {corpus}")
+
+    results = []
+    for path in files:
+        with open(path, "rb") as f:
+            content = f.read()
+        name = os.path.basename(path)
+
+        if name.endswith(".pdf"):
+            engine = TextExtractionEngine(Config)
+            seconds, text = bench(lambda: engine.pdf_text(content), repeat)
+            results.append({"file": name, "backend": "pymupdf", "boilerplate": True,
+                            "ms": round(seconds * 1000, 3), "chars": len(text), "bytes": len(content)})
+            continue
+
+        for backend_name, backend_cls in available_backends().items():
+            for strip in (False, True):
+                Config.EXTRACT_STRIP_BOILERPLATE = strip
+                engine = TextExtractionEngine(Config, html_backend=backend_cls())
+                seconds, text = bench(lambda: engine.html_text(content, "utf-8"), repeat)
+                results.append({"file": name, "backend": backend_name, "boilerplate": strip,
+                                "ms": round(seconds * 1000, 3), "chars": len(text), "bytes": len(content)})
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Porównanie parserów HTML/PDF na korpusie zapisanych stron")
+    parser.add_argument("--corpus", default=FIXTURES)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--json", help="zapisz wyniki do pliku JSON")
+    args = parser.parse_args()
+
+    results = run(args.corpus, args.repeat)
+
+    print(f"{'plik':<20} {'parser':<12} {'boilerplate':<12} {'ms':>9} {'znaki':>8}")
+    for r in results:
+        print(f"{r['file']:<20} {r['backend']:<12} {'usunięty' if r['boilerplate'] else 'zostawiony':<12} "
+              f"{r['ms']:>9.3f} {r['chars']:>8}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,154 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER = "Na podstawie opinii polecam pierwszy produkt z listy, ma najlepsze oceny."
+
+
+class FakeOpenAIState:
+    def __init__(self, latency_ms=0.0, tokens_per_second=0.0, failure_rate=0.0, failure_status=503, seed=42):
+        self.latency = latency_ms / 1000
+        self.tokens_per_second = tokens_per_second
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.inflight = 0
+        self.max_inflight = 0
+        self.requests = 0
+        self.failures = 0
+
+    def enter(self):
+        with self.lock:
+            self.requests += 1
+            self.inflight += 1
+            self.max_inflight = max(self.max_inflight, self.inflight)
+            fail = self.rng.random() < self.failure_rate
+            if fail:
+                self.failures += 1
+            return fail
+
+    def leave(self):
+        with self.lock:
+            self.inflight -= 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "failures": self.failures,
+                "inflight": self.inflight,
+                "max_inflight": self.max_inflight,
+            }
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/stats"):
+            self._json(200, self.state.stats())
+        else:
+            self._json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._json(404, {"error": {"message": "not found"}})
+            return
+
+        fail = self.state.enter()
+        try:
+            if self.state.latency:
+                time.sleep(self.state.latency)
+            if fail:
+                self._json(self.state.failure_status, {"error": {"message": "fake failure", "type": "server_error"}})
+                return
+
+            model = request.get("model", "fake")
+            prompt = "".join(str(m.get("content", "")) for m in request.get("messages", []))
+            usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(ANSWER) // 4,
+                     "total_tokens": (len(prompt) + len(ANSWER)) // 4}
+            if request.get("stream"):
+                self._stream(model, usage, bool((request.get("stream_options") or {}).get("include_usage")))
+            else:
+                self._json(200, {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": ANSWER}}],
+                    "usage": usage,
+                })
+        finally:
+            self.state.leave()
+
+    def _event(self, payload):
+        data = payload if isinstance(payload, str) else json.dumps(payload)
+        chunk = f"data: {data}\n\n".encode("utf-8")
+        self.wfile.write(f"{len(chunk):x}\r\n".encode("ascii") + chunk + b"\r\n")
+        self.wfile.flush()
+
+    def _stream(self, model, usage, include_usage):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        base = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()), "model": model}
+        delay = 1 / self.state.tokens_per_second if self.state.tokens_per_second else 0
+        words = ANSWER.split(" ")
+        for i, word in enumerate(words):
+            if delay:
+                time.sleep(delay)
+            content = word if i == 0 else " " + word
+            self._event({**base, "choices": [{"index": 0, "delta": {"content": content}, "finish_reason": None}]})
+        self._event({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if include_usage:
+            self._event({**base, "choices": [], "usage": usage})
+        self._event("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def serve(host="127.0.0.1", port=8089, **options):
+    handler = type("Handler", (FakeOpenAIHandler,), {"state": FakeOpenAIState(**options)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lokalny serwer zgodny z API OpenAI do testów bramki LLM")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="odsetek odpowiedzi z błędem (0-1)")
+    parser.add_argument("--failure-status", type=int, default=503)
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, latency_ms=args.latency_ms, tokens_per_second=args.tokens_per_second,
+                   failure_rate=args.failure_rate, failure_status=args.failure_status)
+    print(f"Serwer: http://{args.host}:{args.port}/v1 (OPENAI_BASE_URL lub --llm-base-url w load_test.py)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
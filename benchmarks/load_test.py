@@ -0,0 +1,282 @@
+import argparse
+import glob
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from config import Config
+from seed_catalog import BRANDS, FEATURES, TYPES
+from stubs import StubEmbeddingModel, StubFetcher, StubOpenAIClient
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pages")
+SCENARIOS = ("ask", "view_search_deep", "view_keyset_tail", "view_keyset", "view_search", "product", "add")
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def build_app(args):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES, "*.html"))):
+        with open(path, "rb") as f:
+            pages.append(f.read())
+
+    client = StubOpenAIClient(args.llm_latency_ms, args.llm_tokens_per_second)
+    model = StubEmbeddingModel(Config.EMBEDDING_DIM, args.embed_latency_ms)
+    Config.ANSWER_CACHE_ENABLED = args.answer_cache
+    Config.PAGE_CACHE_ENABLED = args.page_cache
+    Config.LLM_GATEWAY_ENABLED = args.llm_gateway
+    if args.llm_base_url:
+        Config.OPENAI_BASE_URL = args.llm_base_url
+        Config.OPENAI_API_KEY = Config.OPENAI_API_KEY or "bench"
+
+    import llm_gateway
+    import main
+    factory = llm_gateway.create_openai_client if args.llm_base_url else lambda cfg, lazy=False, max_retries=None: client
+    with mock.patch.object(llm_gateway, "create_openai_client", factory), \
+            mock.patch.object(main, "create_embedding_model", lambda cfg, lazy=False: model), \
+            mock.patch.object(main, "HttpFetcher", lambda cfg: StubFetcher(pages)):
+        app = main.create_app()
+    return app, None if args.llm_base_url else client
+
+
+def catalog_info(deps):
+    with deps["db_pool"].cursor() as cur:
+        cur.execute("SELECT COUNT(*), COALESCE(MIN(id), 0), COALESCE(MAX(id), 0) FROM products")
+        products, min_id, max_id = cur.fetchone()
+        cur.execute("SELECT COUNT(*) FROM reviews")
+        reviews = cur.fetchone()[0]
+    return {"products": products, "reviews": reviews, "min_id": min_id, "max_id": max_id}
+
+
+class Scenarios:
+    def __init__(self, deps, catalog, per_page, seed_value):
+        self.deps = deps
+        self.catalog = catalog
+        self.per_page = per_page
+        self.rng = random.Random(seed_value)
+        self._lock = threading.Lock()
+        self.added = []
+
+    def _random(self, fn, *args):
+        with self._lock:
+            return fn(*args)
+
+    def _product_id(self):
+        return self._random(self.rng.randint, self.catalog["min_id"], self.catalog["max_id"])
+
+    def _term(self):
+        return f"{self._random(self.rng.choice, BRANDS)} {self._random(self.rng.choice, TYPES)}"
+
+    def ask(self, client):
+        question = f"Jaki {self._term()} {self._random(self.rng.choice, FEATURES)} polecasz?"
+        r = client.post("/ask", json={"question": question})
+        return r.status_code, r.status_code == 200
+
+    def view_search_deep(self, client):
+        last_page = max(1, min(self.catalog["products"], Config.SEARCH_TEXT_CANDIDATES) // self.per_page)
+        page = self._random(self.rng.randint, max(1, int(last_page * 0.8)), last_page)
+        r = client.get("/view.html", query_string={"q": self._term(), "page": page, "per_page": self.per_page})
+        return r.status_code, r.status_code == 200
+
+    def view_keyset_tail(self, client):
+        span = self.catalog["max_id"] - self.catalog["min_id"]
+        after = self._random(self.rng.randint, self.catalog["min_id"] + int(span * 0.8), self.catalog["max_id"])
+        r = client.get(f"/view.html?after={after}&per_page={self.per_page}")
+        return r.status_code, r.status_code == 200
+
+    def view_keyset(self, client):
+        r = client.get(f"/view.html?after={self._product_id()}&per_page={self.per_page}")
+        return r.status_code, r.status_code == 200
+
+    def view_search(self, client):
+        r = client.get("/view.html", query_string={"q": self._term(), "per_page": self.per_page})
+        return r.status_code, r.status_code == 200
+
+    def product(self, client):
+        r = client.get(f"/product/{self._product_id()}")
+        return r.status_code, r.status_code in (200, 404)
+
+    def add(self, client, timeout=60):
+        n = self._random(self.rng.randint, 1, 10**9)
+        r = client.post("/add.html", data={"name": f"Bench {self._term()} {n}", "link": f"https://bench.local/{n}"})
+        if r.status_code != 302:
+            return r.status_code, False
+        job_id = int(r.headers["Location"].rsplit("job=", 1)[1])
+        job_repo = self.deps["job_repo"]
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            job = job_repo.get(job_id)
+            if job and job["status"] in ("done", "failed"):
+                if job["product_id"]:
+                    with self._lock:
+                        self.added.append(job["product_id"])
+                return r.status_code, job["status"] == "done"
+            time.sleep(0.01)
+        return r.status_code, False
+
+    def cleanup(self):
+        for pid in self.added:
+            self.deps["product_repo"].delete(pid)
+
+
+def run_scenario(app, fn, requests, concurrency, warmup):
+    local = threading.local()
+
+    def call(_):
+        if not hasattr(local, "client"):
+            local.client = app.test_client()
+        started = time.perf_counter()
+        try:
+            status, ok = fn(local.client)
+        except Exception as e:
+            print(f"Błąd żądania: {e}")
+            status, ok = 0, False
+        return time.perf_counter() - started, status, ok
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(call, range(warmup)))
+        started = time.perf_counter()
+        samples = list(pool.map(call, range(requests)))
+        wall = time.perf_counter() - started
+
+    latencies = sorted(s for s, _, _ in samples)
+    errors = sum(1 for _, _, ok in samples if not ok)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(samples) / wall, 2) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p90_ms": round(percentile(latencies, 90) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {r["scenario"]: r for r in json.load(f)["results"]}
+    print(f"\nPorównanie z {baseline_path}:")
+    for r in results:
+        base = baseline.get(r["scenario"])
+        if base is None:
+            continue
+        deltas = []
+        for key in ("throughput_rps", "p50_ms", "p99_ms"):
+            change = (r[key] - base[key]) / base[key] * 100 if base[key] else 0.0
+            deltas.append(f"{key} {base[key]} -> {r[key]} ({change:+.1f}%)")
+        print(f"{r['scenario']:<12} " + ", ".join(deltas))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Test obciążeniowy aplikacji z deterministycznym LLM i embedderem")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"lista po przecinku z: {', '.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--add-requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--per-page", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0)
+    parser.add_argument("--llm-base-url", help="adres serwera zgodnego z OpenAI (np. benchmarks/fake_openai_server.py) "
+                                               "zamiast klienta w pamięci")
+    parser.add_argument("--no-llm-gateway", dest="llm_gateway", action="store_false",
+                        help="wywołuj model bez bramki (kolejkowanie, retry, circuit breaker)")
+    parser.add_argument("--answer-cache", action="store_true", help="nie wyłączaj cache odpowiedzi")
+    parser.add_argument("--no-page-cache", dest="page_cache", action="store_false")
+    parser.add_argument("--keep-added", action="store_true", help="nie usuwaj produktów dodanych w scenariuszu add")
+    parser.add_argument("--label", default="", help="etykieta przebiegu zapisywana w wynikach")
+    parser.add_argument("--json", help="zapisz wyniki do pliku JSON")
+    parser.add_argument("--history", help="dopisz wyniki jako linię JSON do pliku historii")
+    parser.add_argument("--compare", help="plik JSON z poprzedniego przebiegu do porównania")
+    args = parser.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"Nieznane scenariusze: {', '.join(sorted(unknown))}")
+
+    app, llm = build_app(args)
+    deps = app.extensions["deps"]
+    catalog = catalog_info(deps)
+    if not catalog["products"]:
+        raise SystemExit("Pusty katalog, uruchom najpierw: python benchmarks/seed_catalog.py 1k --reset")
+
+    runner = Scenarios(deps, catalog, args.per_page, args.seed)
+    results = []
+    try:
+        for name in scenarios:
+            requests = args.add_requests if name == "add" else args.requests
+            warmup = 0 if name == "add" else args.warmup
+            result = {"scenario": name, **run_scenario(app, getattr(runner, name), requests, args.concurrency, warmup)}
+            results.append(result)
+            print(f"{name:<12} {result['throughput_rps']:>9.1f} req/s  p50 {result['p50_ms']:>8.2f} ms  "
+                  f"p99 {result['p99_ms']:>8.2f} ms  błędy {result['errors']}")
+    finally:
+        if not args.keep_added:
+            runner.cleanup()
+
+    run = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "label": args.label,
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "catalog": {"products": catalog["products"], "reviews": catalog["reviews"]},
+        "settings": {
+            "concurrency": args.concurrency,
+            "per_page": args.per_page,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_tokens_per_second": args.llm_tokens_per_second,
+            "embed_latency_ms": args.embed_latency_ms,
+            "answer_cache": args.answer_cache,
+            "page_cache": args.page_cache,
+            "vector_index": Config.VECTOR_INDEX_TYPE,
+            "db_pool_max_size": Config.DB_POOL_MAX_SIZE,
+            "llm_gateway": args.llm_gateway,
+            "llm_base_url": args.llm_base_url,
+        },
+        "llm_calls": llm.calls if llm is not None else None,
+        "llm_gateway": deps["llm_gateway"].stats() if deps["llm_gateway"] is not None else None,
+        "db_pool": deps["db_pool"].stats(),
+        "results": results,
+    }
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(run, f, ensure_ascii=False, indent=2)
+    if args.history:
+        with open(args.history, "a", encoding="utf-8") as f:
+            f.write(json.dumps(run, ensure_ascii=False) + "\n")
+    if args.compare:
+        compare(results, args.compare)
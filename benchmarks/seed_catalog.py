@@ -0,0 +1,146 @@
+import argparse
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from config import Config
+from database_connection import get_db_connection, migrate, rebuild_vector_index, vector_index_name
+from embedding_versions import EmbeddingRegistry, content_hash
+from connection_pool import ConnectionPool
+from stubs import StubEmbeddingModel
+
+SIZES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+
+BRANDS = ["Bosch", "Philips", "Tefal", "Electrolux", "Samsung", "Zelmer", "Amica", "Beko", "Sencor", "Xiaomi",
+          "Gorenje", "Whirlpool", "Braun", "Russell", "Krups", "DeLonghi", "Severin", "Clatronic", "Midea", "Dyson"]
+TYPES = ["czajnik", "odkurzacz", "pralka", "lodówka", "zmywarka", "mikser", "blender", "toster", "ekspres",
+         "żelazko", "suszarka", "piekarnik", "okap", "frytkownica", "robot", "grill", "wentylator", "oczyszczacz"]
+FEATURES = ["cichy", "energooszczędny", "kompaktowy", "inox", "turbo", "inwerter", "parowy", "bezprzewodowy",
+            "wifi", "szklany", "ceramiczny", "antykamień", "timer", "programowalny", "składany", "przenośny"]
+CAPACITIES = ["0,5 l", "1 l", "1,7 l", "2 l", "7 kg", "8 kg", "9 kg", "250 l", "320 l", None]
+REVIEWS = [
+    "Działa bez zarzutu, polecam.",
+    "Trochę głośny, ale spełnia swoje zadanie.",
+    "Po miesiącu używania jestem zadowolony.",
+    "Obudowa szybko się rysuje.",
+    "Świetny stosunek jakości do ceny.",
+    "Instrukcja mogłaby być lepsza.",
+    "Szybko się nagrzewa i łatwo się czyści.",
+    "Zepsuł się po pół roku, serwis naprawił na gwarancji.",
+]
+
+
+def parse_size(value):
+    value = value.lower()
+    return SIZES[value] if value in SIZES else int(value)
+
+
+def synthetic_product(rng, i):
+    brand = rng.choice(BRANDS)
+    kind = rng.choice(TYPES)
+    features = rng.sample(FEATURES, 2)
+    capacity = rng.choice(CAPACITIES)
+    name = f"{brand} {kind.capitalize()} {brand[:2].upper()}{i}"
+    description = (
+        f"## Podstawowe informacje\n- Nazwa produktu: {name}\n- Typ: {kind}\n- Marka: {brand}\n\n"
+        f"## Parametry techniczne\n- Cechy: {', '.join(features)}\n"
+        + (f"- Pojemność: {capacity}\n" if capacity else "")
+    )
+    return name, description, f"https://example.com/p/{i}", capacity
+
+
+def _copy_value(value):
+    if value is None:
+        return "\\N"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def _vector_literal(vector):
+    return "[" + ",".join(map(str, vector.round(5).tolist())) + "]"
+
+
+def seed(cfg, size, reviews_per_product=3, chunk_size=10_000, seed_value=42, reset=False, report=print):
+    migrate(cfg, report=lambda *_: None)
+    pool = ConnectionPool(cfg)
+    column = EmbeddingRegistry(pool).column_for(cfg.EMBEDDING_MODEL) or "embedding"
+    pool.close()
+
+    rng = random.Random(seed_value)
+    model = StubEmbeddingModel(cfg.EMBEDDING_DIM)
+
+    conn = get_db_connection(cfg)
+    cur = conn.cursor()
+    if reset:
+        cur.execute("TRUNCATE products, reviews, ingestion_jobs RESTART IDENTITY CASCADE;")
+    cur.execute(f"DROP INDEX IF EXISTS {vector_index_name(column)};")
+    conn.commit()
+
+    started = time.perf_counter()
+    done = 0
+    reviews = 0
+    while done < size:
+        products = [synthetic_product(rng, done + i + 1) for i in range(min(chunk_size, size - done))]
+        vectors = model.encode([description for _, description, _, _ in products])
+
+        buf = io.StringIO()
+        for (name, description, link, capacity), vector in zip(products, vectors):
+            buf.write("\t".join(_copy_value(v) for v in (
+                name, description, link, capacity, content_hash(description)
+            )) + "\t" + _vector_literal(vector) + "\n")
+        buf.seek(0)
+
+        cur.execute("SELECT COALESCE(MAX(id), 0) FROM products")
+        last_id = cur.fetchone()[0]
+        cur.copy_expert(
+            f"COPY products (name, description, link, capacity, {column}_hash, {column}) FROM STDIN", buf
+        )
+        cur.execute("SELECT id FROM products WHERE id > %s ORDER BY id", (last_id,))
+        ids = [row[0] for row in cur.fetchall()]
+
+        buf = io.StringIO()
+        for pid in ids:
+            for _ in range(rng.randint(0, reviews_per_product * 2)):
+                buf.write(f"{pid}\t{_copy_value(rng.choice(REVIEWS))}\n")
+                reviews += 1
+        buf.seek(0)
+        cur.copy_expert("COPY reviews (product_id, review_text) FROM STDIN", buf)
+        cur.execute("""
+            INSERT INTO review_digests (product_id, review_count, dirty_since)
+            SELECT product_id, COUNT(*), NOW() FROM reviews WHERE product_id > %s GROUP BY product_id
+            ON CONFLICT (product_id) DO NOTHING
+        """, (last_id,))
+        conn.commit()
+
+        done += len(products)
+        elapsed = time.perf_counter() - started
+        report(f"{done}/{size} produktów, {reviews} opinii, {done / elapsed:.0f} produktów/s")
+
+    cur.close()
+    conn.close()
+
+    report(f"Budowanie indeksu {vector_index_name(column)}...")
+    rebuild_vector_index(cfg, column)
+    return {"products": done, "reviews": reviews, "column": column, "seconds": round(time.perf_counter() - started, 1)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generowanie syntetycznego katalogu produktów do testów wydajności")
+    parser.add_argument("size", help="liczba produktów: 1k, 100k, 1m lub dowolna liczba")
+    parser.add_argument("--reviews", type=int, default=3, help="średnia liczba opinii na produkt")
+    parser.add_argument("--chunk", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="wyczyść produkty, opinie i zadania przed generowaniem")
+    args = parser.parse_args()
+
+    if not args.reset:
+        print("Uwaga: dane zostaną dopisane do istniejącego katalogu (użyj --reset, aby zacząć od zera)")
+    print(f"Baza: {Config.DB_NAME}@{Config.DB_HOST}")
+    result = seed(Config, parse_size(args.size), args.reviews, args.chunk, args.seed, args.reset)
+    print(f"Gotowe: {result['products']} produktów, {result['reviews']} opinii w {result['seconds']}s")
@@ -0,0 +1,137 @@
+import functools
+import hashlib
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from http_fetcher import FetchResult
+
+_TOKEN = re.compile(r"\w+")
+
+DESCRIPTION_TEMPLATE = """## Podstawowe informacje
+- Nazwa produktu: Produkt testowy
+- Typ: urządzenie AGD
+- Marka: Bench
+
+## Parametry techniczne
+- Pojemność: 1,7 l
+- Moc: 2000 W
+
+## Ergonomia i bezpieczeństwo
+- Automatyczne wyłączanie
+
+## Zastosowanie
+- Codzienne użytkowanie w domu
+
+## Podsumowanie
+Deterministyczny opis wygenerowany na potrzeby testów wydajności."""
+
+
+def _stable_hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+@functools.lru_cache(maxsize=65536)
+def _token_slot(token, dim):
+    h = _stable_hash(token)
+    return h % dim, 1.0 if (h >> 32) & 1 else -1.0
+
+
+class StubEmbeddingModel:
+    def __init__(self, dim, latency_ms=0.0):
+        self.dim = dim
+        self.latency = latency_ms / 1000
+
+    def load(self):
+        return self
+
+    @property
+    def loaded(self):
+        return True
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def _vector(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in _TOKEN.findall((text or "").casefold()):
+            index, sign = _token_slot(token, self.dim)
+            vector[index] += sign
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            vector[0] = 1.0
+            return vector
+        return vector / norm
+
+    def encode(self, sentences, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        if isinstance(sentences, str):
+            return self._vector(sentences)
+        return np.stack([self._vector(s) for s in sentences]) if sentences else np.empty((0, self.dim), np.float32)
+
+
+class _Completions:
+    def __init__(self, latency, tokens_per_second):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _answer(self, messages):
+        prompt = messages[-1]["content"] if messages else ""
+        if "opis produktu w formacie MARKDOWN" in prompt:
+            return DESCRIPTION_TEMPLATE, prompt
+        if prompt.lstrip().startswith("Streść"):
+            return "Użytkownik pytał o sprzęt AGD.", prompt
+        return "Na podstawie opinii polecam pierwszy produkt z listy, ma najlepsze oceny.", prompt
+
+    def create(self, model=None, messages=None, stream=False, **kwargs):
+        with self._lock:
+            self.calls += 1
+        text, prompt = self._answer(messages or [])
+        usage = SimpleNamespace(prompt_tokens=len(prompt) // 4, completion_tokens=len(text) // 4)
+        if self.latency:
+            time.sleep(self.latency)
+        if not stream:
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=SimpleNamespace(content=text))],
+                usage=usage,
+            )
+        return self._stream(text, usage)
+
+    def _stream(self, text, usage):
+        words = text.split(" ")
+        delay = 1 / self.tokens_per_second if self.tokens_per_second else 0
+        for i, word in enumerate(words):
+            if delay:
+                time.sleep(delay)
+            delta = SimpleNamespace(content=word if i == 0 else " " + word)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+        yield SimpleNamespace(choices=[], usage=usage)
+
+
+class StubOpenAIClient:
+    def __init__(self, latency_ms=0.0, tokens_per_second=0.0):
+        self.chat = SimpleNamespace(completions=_Completions(latency_ms / 1000, tokens_per_second))
+
+    @property
+    def calls(self):
+        return self.chat.completions.calls
+
+
+class StubFetcher:
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = 0
+
+    def fetch(self, url):
+        self.requests += 1
+        content = self.pages[_stable_hash(url) % len(self.pages)]
+        return FetchResult(url, content, "text/html; charset=utf-8", "utf-8", False)
+
+    def stats(self):
+        return {"requests": self.requests, "stub": True}
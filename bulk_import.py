@@ -0,0 +1,168 @@
+import argparse
+import csv
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from product_description_service import extract_capacity
+
+
+def read_rows(path):
+    if path.lower().endswith(".jsonl"):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+    else:
+        with open(path, encoding="utf-8", newline="") as f:
+            yield from csv.DictReader(f)
+
+
+def chunked(iterable, size):
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class BulkImporter:
+    def __init__(self, import_repo, extractor, summarizer, embedder, cfg):
+        self.import_repo = import_repo
+        self.extractor = extractor
+        self.summarizer = summarizer
+        self.embedder = embedder
+
+        self.chunk_size = cfg.BULK_IMPORT_CHUNK_SIZE
+        self.llm_workers = cfg.BULK_IMPORT_LLM_WORKERS
+        self.embed_batch_size = cfg.BULK_IMPORT_EMBED_BATCH_SIZE
+
+    def _summarize(self, text):
+        if not text:
+            return None, "Nie udało się pobrać treści ze strony"
+        try:
+            return self.summarizer.summarize_markdown(text, raise_errors=True), None
+        except Exception as e:
+            return None, f"Błąd generowania opisu: {e}"
+
+    def _describe(self, rows):
+        pending = [i for i, row in enumerate(rows) if not row.get("description")]
+
+        texts = self.extractor.extract_many(rows[i].get("link") for i in pending)
+        fetch_done = time.perf_counter()
+
+        with ThreadPoolExecutor(self.llm_workers) as pool:
+            results = list(pool.map(self._summarize, texts))
+
+        descriptions = [row.get("description") for row in rows]
+        errors = [None] * len(rows)
+        for i, (summary, error) in zip(pending, results):
+            descriptions[i] = summary
+            errors[i] = error
+        return descriptions, errors, fetch_done
+
+    def run(self, path, source=None, report=print):
+        source = source or os.path.abspath(path)
+        skip = self.import_repo.start(source)
+        retry = self.import_repo.failed_rows(source)
+        rows_done = skip
+        totals = {"imported": 0, "failed": 0, "fetch": 0.0, "summarize": 0.0, "embed": 0.0, "write": 0.0}
+        started = time.perf_counter()
+
+        todo = ((n, row) for n, row in enumerate(read_rows(path)) if n >= skip or n in retry)
+        try:
+            for chunk in chunked(todo, self.chunk_size):
+                failures = [
+                    (n, "Brak nazwy lub linku") for n, row in chunk
+                    if not (row.get("name") and (row.get("link") or row.get("description")))
+                ]
+                invalid = {n for n, _ in failures}
+                valid = [(n, row) for n, row in chunk if n not in invalid]
+
+                t0 = time.perf_counter()
+                descriptions, errors, t1 = self._describe([row for _, row in valid])
+                failures.extend((n, error) for (n, _), error in zip(valid, errors) if error)
+                described = [(n, row, d) for (n, row), d, error in zip(valid, descriptions, errors) if not error]
+                t2 = time.perf_counter()
+                embeddings = self.embedder.encode(
+                    [d for _, _, d in described], batch_size=self.embed_batch_size
+                ) if described else []
+                t3 = time.perf_counter()
+
+                products = [
+                    (row["name"], description, row.get("link") or None, embedding.tolist(),
+                     row.get("capacity") or extract_capacity(description), row.get("image_url") or None)
+                    for (_, row, description), embedding in zip(described, embeddings)
+                ]
+                rows_done = max(rows_done, chunk[-1][0] + 1)
+                retried = [n for n, _, _ in described if n in retry]
+                self.import_repo.write_chunk(source, rows_done, products, failures, retried)
+                t4 = time.perf_counter()
+
+                totals["imported"] += len(products)
+                totals["failed"] += len(failures)
+                totals["fetch"] += t1 - t0
+                totals["summarize"] += t2 - t1
+                totals["embed"] += t3 - t2
+                totals["write"] += t4 - t3
+
+                elapsed = t4 - started
+                report(f"[{source}] {rows_done} wierszy, {totals['imported'] / elapsed:.1f} produktów/s")
+        except Exception as e:
+            self.import_repo.finish(source, "failed", str(e))
+            raise
+
+        self.import_repo.finish(source, "done")
+        elapsed = time.perf_counter() - started
+        summary = {
+            "source": source,
+            "resumed_from": skip,
+            "rows_done": rows_done,
+            "imported": totals["imported"],
+            "failed": totals["failed"],
+            "seconds": round(elapsed, 3),
+            "products_per_second": round(totals["imported"] / elapsed, 2) if elapsed else 0.0,
+            "stage_seconds": {k: round(totals[k], 3) for k in ("fetch", "summarize", "embed", "write")},
+        }
+        report(json.dumps(summary, ensure_ascii=False))
+        return summary
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    from config import Config
+    from connection_pool import ConnectionPool
+    from content_extraction_service import ContentExtractionService
+    from http_fetcher import HttpFetcher
+    from text_extraction import TextExtractionEngine
+    from embedding import create_embedding_model
+    from embedding_versions import EmbeddingRegistry
+    from import_repo import ImportRepository
+    from page_cache import create_page_cache
+    from llm import create_openai_client
+    from product_description_service import ProductDescriptionService
+
+    parser = argparse.ArgumentParser(description="Import produktów z pliku CSV/JSONL (name, link[, description, capacity, image_url])")
+    parser.add_argument("path")
+    parser.add_argument("--source", help="identyfikator importu (do wznawiania), domyślnie ścieżka pliku")
+    parser.add_argument("--chunk-size", type=int)
+    args = parser.parse_args()
+
+    if args.chunk_size:
+        Config.BULK_IMPORT_CHUNK_SIZE = args.chunk_size
+
+    pool = ConnectionPool(Config)
+    column = EmbeddingRegistry(pool).column_for(Config.EMBEDDING_MODEL) or "embedding"
+    importer = BulkImporter(
+        ImportRepository(pool, create_page_cache(Config), column),
+        ContentExtractionService(HttpFetcher(Config), TextExtractionEngine(Config), Config.FETCH_WORKERS),
+        ProductDescriptionService(create_openai_client(Config)),
+        create_embedding_model(Config),
+        Config,
+    )
+    importer.run(args.path, source=args.source)
@@ -1,43 +1,236 @@
+import asyncio
+import time
+
+from llm_gateway import LLMUnavailableError
+from metrics import observe_stage, record_llm_usage, span
+from product_matcher import ProductMatcher
+from prompt_builder import usage_from_response
+
+CHAT_MODEL = "gpt-5.1"
+CHAT_TEMPERATURE = 0.3
+DEGRADED_PRODUCTS = 5
+
 class ChatService:
-    def __init__(self, client, embedder, product_repo, logger):
+    def __init__(self, client, embedder, product_repo, logger, prompt_builder, answer_cache=None, matcher=None):
         self.client = client
         self.embedder = embedder
         self.product_repo = product_repo
         self.logger = logger
+        self.prompt_builder = prompt_builder
+        self.answer_cache = answer_cache
+        self.matcher = matcher or ProductMatcher()
 
-    def answer(self, question: str, history: list):
-        query_embedding = self.embedder.encode(question).tolist()
-        rows = self.product_repo.semantic_search_top5(query_embedding)
-
-        context = "\n\n".join([
-            f"{name}: {desc[:600]}\nOpinie użytkowników: {reviews or 'Brak opinii'}"
-            for pid, name, desc, link, reviews in rows
-        ])
-
-        prompt = f"""
-Użytkownik pyta: {question}
-
-Oto produkty z bazy, które mogą pasować (używaj tylko tych!):
-{context}
-
-Zasady odpowiedzi:
-- opisuj wyłącznie produkty z listy powyżej
-- uwzględniaj opinie użytkowników w rekomendacjach
-- nie wymyślaj nowych produktów
-- jeśli żaden produkt nie pasuje, napisz to
-- odpowiedź krótka i konkretna
-"""
-
-        messages = [{"role": "system", "content": "Jesteś inteligentnym asystentem produktowym. Odpowiadasz po polsku."}]
-        messages.extend(history)
-        messages.append({"role": "user", "content": prompt})
-
-        resp = self.client.chat.completions.create(
-            model="gpt-5.1",
-            messages=messages,
-            temperature=0.3,
+    @staticmethod
+    def _prior_history(question: str, history: list):
+        if history and history[-1] == {"role": "user", "content": question}:
+            return history[:-1]
+        return history
+
+    def _cached(self, query_embedding, rows, prior_history):
+        if self.answer_cache is None:
+            return None
+        return self.answer_cache.get(query_embedding, rows, prior_history)
+
+    def _retrieve(self, question: str, history: list):
+        with span("chat.embed"):
+            query_embedding = self.embedder.encode(question).tolist()
+        with span("chat.search"):
+            rows = self.product_repo.semantic_search(query_embedding)
+        prior_history = self._prior_history(question, history)
+        with span("chat.answer_cache"):
+            cached = self._cached(query_embedding, rows, prior_history)
+        return query_embedding, rows, prior_history, cached
+
+    def _finish(self, question, query_embedding, rows, prior_history, answer, usage):
+        record_llm_usage(CHAT_MODEL, usage.get("prompt_tokens"), usage.get("completion_tokens"))
+        if self.answer_cache is not None:
+            self.answer_cache.put(query_embedding, rows, prior_history, answer)
+        self.logger.log(
+            "ASK_QUERY",
+            f"Question: '{question}', answer chars: {len(answer)}, "
+            f"prompt tokens: {usage.get('prompt_tokens', usage['estimated_prompt_tokens'])}"
         )
+
+    def _degraded(self, question, rows, error):
+        self.logger.log("ASK_DEGRADED", f"Question: '{question}', reason: {error}")
+        if not rows:
+            return "Asystent jest chwilowo niedostępny. Spróbuj ponownie za chwilę.", {"degraded": True}
+        names = "\n".join(f"- {row[1]}" for row in rows[:DEGRADED_PRODUCTS])
+        answer = (
+            "Asystent jest chwilowo niedostępny, więc nie mogę przygotować pełnej odpowiedzi. "
+            f"Produkty najlepiej pasujące do pytania:\n{names}"
+        )
+        return answer, {"degraded": True}
+
+    def referenced_products(self, rows, answer: str):
+        ids = set(self.matcher.match(rows, answer))
+        return [row for row in rows if row[0] in ids]
+
+    def answer(self, question: str, history: list):
+        query_embedding, rows, prior_history, cached = self._retrieve(question, history)
+        if cached is not None:
+            self.logger.log("ASK_QUERY_CACHED", f"Question: '{question}'")
+            return cached, rows, {"cached": True}
+
+        with span("chat.prompt"):
+            messages, usage = self.prompt_builder.build(question, prior_history, rows, query_embedding)
+        try:
+            with span("chat.llm"):
+                resp = self.client.chat.completions.create(
+                    model=CHAT_MODEL,
+                    messages=messages,
+                    temperature=CHAT_TEMPERATURE,
+                )
+        except LLMUnavailableError as e:
+            answer, usage = self._degraded(question, rows, e)
+            return answer, rows, usage
+        answer = resp.choices[0].message.content.strip()
+        usage_from_response(usage, resp.usage)
+
+        self._finish(question, query_embedding, rows, prior_history, answer, usage)
+        return answer, rows, usage
+
+    def answer_stream(self, question: str, history: list):
+        query_embedding, rows, prior_history, cached = self._retrieve(question, history)
+        yield "products", rows
+
+        if cached is not None:
+            self.logger.log("ASK_QUERY_CACHED", f"Question: '{question}'")
+            yield "token", cached
+            yield "done", (cached, {"cached": True})
+            return
+
+        with span("chat.prompt"):
+            messages, usage = self.prompt_builder.build(question, prior_history, rows, query_embedding)
+        started = time.perf_counter()
+        try:
+            stream = self.client.chat.completions.create(
+                model=CHAT_MODEL,
+                messages=messages,
+                temperature=CHAT_TEMPERATURE,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+        except LLMUnavailableError as e:
+            answer, usage = self._degraded(question, rows, e)
+            yield "token", answer
+            yield "done", (answer, usage)
+            return
+
+        parts = []
+        try:
+            for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    usage_from_response(usage, chunk.usage)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if not parts:
+                        observe_stage("chat.llm_first_token", time.perf_counter() - started)
+                    parts.append(delta)
+                    yield "token", delta
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+
+        observe_stage("chat.llm", time.perf_counter() - started)
+        answer = "".join(parts).strip()
+        self._finish(question, query_embedding, rows, prior_history, answer, usage)
+        yield "done", (answer, usage)
+
+
+class AsyncChatService(ChatService):
+    def __init__(self, client, embedder, product_repo, logger, prompt_builder, answer_cache=None, matcher=None,
+                 timeout=None):
+        super().__init__(client, embedder, product_repo, logger, prompt_builder, answer_cache, matcher)
+        self.timeout = timeout
+
+    async def _retrieve(self, question: str, history: list):
+        with span("chat.embed"):
+            query_embedding = (await asyncio.to_thread(self.embedder.encode, question)).tolist()
+        with span("chat.search"):
+            rows = await self.product_repo.semantic_search(query_embedding)
+        prior_history = self._prior_history(question, history)
+        with span("chat.answer_cache"):
+            cached = self._cached(query_embedding, rows, prior_history)
+        return query_embedding, rows, prior_history, cached
+
+    async def answer(self, question: str, history: list):
+        query_embedding, rows, prior_history, cached = await self._retrieve(question, history)
+        if cached is not None:
+            self.logger.log("ASK_QUERY_CACHED", f"Question: '{question}'")
+            return cached, rows, {"cached": True}
+
+        with span("chat.prompt"):
+            messages, usage = await asyncio.to_thread(
+                self.prompt_builder.build, question, prior_history, rows, query_embedding
+            )
+        try:
+            with span("chat.llm"):
+                resp = await self.client.chat.completions.create(
+                    model=CHAT_MODEL,
+                    messages=messages,
+                    temperature=CHAT_TEMPERATURE,
+                    timeout=self.timeout,
+                )
+        except LLMUnavailableError as e:
+            answer, usage = self._degraded(question, rows, e)
+            return answer, rows, usage
         answer = resp.choices[0].message.content.strip()
+        usage_from_response(usage, resp.usage)
+
+        self._finish(question, query_embedding, rows, prior_history, answer, usage)
+        return answer, rows, usage
+
+    async def answer_stream(self, question: str, history: list):
+        query_embedding, rows, prior_history, cached = await self._retrieve(question, history)
+        yield "products", rows
+
+        if cached is not None:
+            self.logger.log("ASK_QUERY_CACHED", f"Question: '{question}'")
+            yield "token", cached
+            yield "done", (cached, {"cached": True})
+            return
+
+        with span("chat.prompt"):
+            messages, usage = await asyncio.to_thread(
+                self.prompt_builder.build, question, prior_history, rows, query_embedding
+            )
+        started = time.perf_counter()
+        try:
+            stream = await self.client.chat.completions.create(
+                model=CHAT_MODEL,
+                messages=messages,
+                temperature=CHAT_TEMPERATURE,
+                stream=True,
+                stream_options={"include_usage": True},
+                timeout=self.timeout,
+            )
+        except LLMUnavailableError as e:
+            answer, usage = self._degraded(question, rows, e)
+            yield "token", answer
+            yield "done", (answer, usage)
+            return
+
+        parts = []
+        try:
+            async for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    usage_from_response(usage, chunk.usage)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if not parts:
+                        observe_stage("chat.llm_first_token", time.perf_counter() - started)
+                    parts.append(delta)
+                    yield "token", delta
+        finally:
+            await stream.close()
 
-        self.logger.log("ASK_QUERY", f"Question: '{question}', AI answer: '{answer}'")
-        return answer, rows
\ No newline at end of file
+        observe_stage("chat.llm", time.perf_counter() - started)
+        answer = "".join(parts).strip()
+        self._finish(question, query_embedding, rows, prior_history, answer, usage)
+        yield "done", (answer, usage)
@@ -9,5 +9,143 @@ class Config:
     DB_HOST = os.getenv("DB_HOST")
     DB_PORT = os.getenv("DB_PORT")
 
+    DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+    DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+    DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))
+    DB_POOL_HEALTH_CHECK_AFTER = float(os.getenv("DB_POOL_HEALTH_CHECK_AFTER", "30"))
+
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-    EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
\ No newline at end of file
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+    EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+    EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "384"))
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+    EMBEDDING_MODEL_FILE = os.getenv("EMBEDDING_MODEL_FILE", "")
+    EMBEDDING_BATCHING = os.getenv("EMBEDDING_BATCHING", "1") == "1"
+    EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+    EMBEDDING_BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5"))
+    EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))
+    EMBEDDING_CACHE_TTL = float(os.getenv("EMBEDDING_CACHE_TTL", "86400"))
+    EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "")
+
+    VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "hnsw")
+    VECTOR_HNSW_M = int(os.getenv("VECTOR_HNSW_M", "16"))
+    VECTOR_HNSW_EF_CONSTRUCTION = int(os.getenv("VECTOR_HNSW_EF_CONSTRUCTION", "64"))
+    VECTOR_HNSW_EF_SEARCH = int(os.getenv("VECTOR_HNSW_EF_SEARCH", "40"))
+    VECTOR_IVFFLAT_LISTS = int(os.getenv("VECTOR_IVFFLAT_LISTS", "100"))
+    VECTOR_IVFFLAT_PROBES = int(os.getenv("VECTOR_IVFFLAT_PROBES", "10"))
+
+    SEARCH_TOP_K = int(os.getenv("SEARCH_TOP_K", "5"))
+    SEARCH_MAX_DISTANCE = float(os.getenv("SEARCH_MAX_DISTANCE")) if os.getenv("SEARCH_MAX_DISTANCE") else None
+
+    ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "1") == "1"
+    ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+    ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+    ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+    ANSWER_CACHE_HISTORY_TURNS = int(os.getenv("ANSWER_CACHE_HISTORY_TURNS", "4"))
+
+    INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "2"))
+    INGESTION_MAX_ATTEMPTS = int(os.getenv("INGESTION_MAX_ATTEMPTS", "3"))
+    INGESTION_RETRY_BACKOFF = float(os.getenv("INGESTION_RETRY_BACKOFF", "5"))
+    INGESTION_POLL_INTERVAL = float(os.getenv("INGESTION_POLL_INTERVAL", "2"))
+    INGESTION_STALE_AFTER = float(os.getenv("INGESTION_STALE_AFTER", "600"))
+
+    BULK_IMPORT_DIR = os.getenv("BULK_IMPORT_DIR", "imports")
+    BULK_IMPORT_CHUNK_SIZE = int(os.getenv("BULK_IMPORT_CHUNK_SIZE", "256"))
+    BULK_IMPORT_LLM_WORKERS = int(os.getenv("BULK_IMPORT_LLM_WORKERS", "8"))
+    BULK_IMPORT_EMBED_BATCH_SIZE = int(os.getenv("BULK_IMPORT_EMBED_BATCH_SIZE", "64"))
+
+    FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "20"))
+    FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", str(20 * 1024 * 1024)))
+    FETCH_POOL_SIZE = int(os.getenv("FETCH_POOL_SIZE", "32"))
+    FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", "16"))
+    FETCH_PER_HOST_CONCURRENCY = int(os.getenv("FETCH_PER_HOST_CONCURRENCY", "4"))
+    FETCH_USER_AGENT = os.getenv("FETCH_USER_AGENT", "Mozilla/5.0 (compatible; ProductAssistant/1.0)")
+    CONTENT_CACHE_DIR = os.getenv("CONTENT_CACHE_DIR", "content_cache")
+
+    EXTRACT_HTML_BACKEND = os.getenv("EXTRACT_HTML_BACKEND", "auto")
+    EXTRACT_STRIP_BOILERPLATE = os.getenv("EXTRACT_STRIP_BOILERPLATE", "1") == "1"
+    EXTRACT_MAX_CHARS = int(os.getenv("EXTRACT_MAX_CHARS", "20000"))
+    EXTRACT_PDF_MAX_PAGES = int(os.getenv("EXTRACT_PDF_MAX_PAGES", "40"))
+
+    PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))
+    PROMPT_HISTORY_BUDGET = int(os.getenv("PROMPT_HISTORY_BUDGET", "1000"))
+    PROMPT_TOKEN_ENCODING = os.getenv("PROMPT_TOKEN_ENCODING", "o200k_base")
+    PROMPT_DESCRIPTION_CHARS = int(os.getenv("PROMPT_DESCRIPTION_CHARS", "600"))
+    PROMPT_REVIEWS_PER_PRODUCT = int(os.getenv("PROMPT_REVIEWS_PER_PRODUCT", "3"))
+    PROMPT_REVIEW_CANDIDATES = int(os.getenv("PROMPT_REVIEW_CANDIDATES", "20"))
+    PROMPT_SUMMARIZE_HISTORY = os.getenv("PROMPT_SUMMARIZE_HISTORY", "0") == "1"
+
+    REVIEW_DIGEST_ENABLED = os.getenv("REVIEW_DIGEST_ENABLED", "1") == "1"
+    REVIEW_DIGEST_MODE = os.getenv("REVIEW_DIGEST_MODE", "extractive")
+    REVIEW_DIGEST_DEBOUNCE = float(os.getenv("REVIEW_DIGEST_DEBOUNCE", "30"))
+    REVIEW_DIGEST_INTERVAL = float(os.getenv("REVIEW_DIGEST_INTERVAL", "5"))
+    REVIEW_DIGEST_BATCH_SIZE = int(os.getenv("REVIEW_DIGEST_BATCH_SIZE", "20"))
+    REVIEW_DIGEST_LEASE = float(os.getenv("REVIEW_DIGEST_LEASE", "300"))
+    REVIEW_DIGEST_SUMMARY_REVIEWS = int(os.getenv("REVIEW_DIGEST_SUMMARY_REVIEWS", "3"))
+    REVIEW_DIGEST_SUMMARY_CHARS = int(os.getenv("REVIEW_DIGEST_SUMMARY_CHARS", "400"))
+    REVIEW_DIGEST_LLM_MIN_REVIEWS = int(os.getenv("REVIEW_DIGEST_LLM_MIN_REVIEWS", "10"))
+    REVIEW_DIGEST_MAX_REVIEWS = int(os.getenv("REVIEW_DIGEST_MAX_REVIEWS", "200"))
+
+    CHAT_STORE = os.getenv("CHAT_STORE", "postgres")
+    CHAT_HISTORY_MAX_MESSAGES = int(os.getenv("CHAT_HISTORY_MAX_MESSAGES", "50"))
+    CHAT_HISTORY_MAX_SESSIONS = int(os.getenv("CHAT_HISTORY_MAX_SESSIONS", "10000"))
+    CHAT_HISTORY_RETENTION_DAYS = int(os.getenv("CHAT_HISTORY_RETENTION_DAYS", "30"))
+    CHAT_HISTORY_PRUNE_INTERVAL = float(os.getenv("CHAT_HISTORY_PRUNE_INTERVAL", "3600"))
+
+    LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "100"))
+    LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "1"))
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    LOG_QUEUE_OVERFLOW = os.getenv("LOG_QUEUE_OVERFLOW", "drop")
+    LOG_QUEUE_BLOCK_TIMEOUT = float(os.getenv("LOG_QUEUE_BLOCK_TIMEOUT", "0.05"))
+    LOG_DETAILS_MAX_CHARS = int(os.getenv("LOG_DETAILS_MAX_CHARS", "1000"))
+    LOG_RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", "30"))
+    LOG_PARTITION_PREMAKE_DAYS = int(os.getenv("LOG_PARTITION_PREMAKE_DAYS", "7"))
+    LOG_MAINTENANCE_INTERVAL = float(os.getenv("LOG_MAINTENANCE_INTERVAL", "3600"))
+    LOG_PAGE_SIZE = int(os.getenv("LOG_PAGE_SIZE", "100"))
+
+    SEARCH_TS_CONFIG = os.getenv("SEARCH_TS_CONFIG", "simple")
+    SEARCH_TRGM_THRESHOLD = float(os.getenv("SEARCH_TRGM_THRESHOLD", "0.3"))
+    SEARCH_TEXT_CANDIDATES = int(os.getenv("SEARCH_TEXT_CANDIDATES", "200"))
+    SEARCH_HYBRID = os.getenv("SEARCH_HYBRID", "1") == "1"
+    SEARCH_HYBRID_VECTOR_CANDIDATES = int(os.getenv("SEARCH_HYBRID_VECTOR_CANDIDATES", "20"))
+    SEARCH_RRF_K = int(os.getenv("SEARCH_RRF_K", "60"))
+
+    VIEW_MAX_PER_PAGE = int(os.getenv("VIEW_MAX_PER_PAGE", "50"))
+    VIEW_REVIEWS_PER_PRODUCT = int(os.getenv("VIEW_REVIEWS_PER_PRODUCT", "5"))
+    VIEW_COUNT_CACHE_TTL = float(os.getenv("VIEW_COUNT_CACHE_TTL", "60"))
+    VIEW_EXACT_COUNT_BELOW = int(os.getenv("VIEW_EXACT_COUNT_BELOW", "10000"))
+
+    PAGE_CACHE_ENABLED = os.getenv("PAGE_CACHE_ENABLED", "1") == "1"
+    PAGE_CACHE_BACKEND = os.getenv("PAGE_CACHE_BACKEND", "memory")
+    PAGE_CACHE_REDIS_URL = os.getenv("PAGE_CACHE_REDIS_URL", "redis://localhost:6379/0")
+    PAGE_CACHE_PREFIX = os.getenv("PAGE_CACHE_PREFIX", "pages:")
+    PAGE_CACHE_SIZE = int(os.getenv("PAGE_CACHE_SIZE", "2048"))
+    PAGE_CACHE_TTL = float(os.getenv("PAGE_CACHE_TTL", "300"))
+
+    PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "1") == "1"
+    MIGRATE_ON_START = os.getenv("MIGRATE_ON_START", "0") == "1"
+
+    ASYNC_DB_POOL_MIN_SIZE = int(os.getenv("ASYNC_DB_POOL_MIN_SIZE", "1"))
+    ASYNC_DB_POOL_MAX_SIZE = int(os.getenv("ASYNC_DB_POOL_MAX_SIZE", "20"))
+    ASYNC_CHAT_TIMEOUT = float(os.getenv("ASYNC_CHAT_TIMEOUT", "60"))
+    ASYNC_CHAT_MAX_INFLIGHT = int(os.getenv("ASYNC_CHAT_MAX_INFLIGHT", "500"))
+
+    INGESTION_REFRESH_ON_EDIT = os.getenv("INGESTION_REFRESH_ON_EDIT", "0") == "1"
+    REEMBED_BATCH_SIZE = int(os.getenv("REEMBED_BATCH_SIZE", "256"))
+    EMBEDDING_SWEEP_INTERVAL = float(os.getenv("EMBEDDING_SWEEP_INTERVAL", "60"))
+
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+    SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+
+    LLM_GATEWAY_ENABLED = os.getenv("LLM_GATEWAY_ENABLED", "1") == "1"
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+    LLM_MODEL_CONCURRENCY = os.getenv("LLM_MODEL_CONCURRENCY", "")
+    LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "64"))
+    LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "10"))
+    LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "60"))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    LLM_RETRY_BACKOFF = float(os.getenv("LLM_RETRY_BACKOFF", "0.5"))
+    LLM_RETRY_BACKOFF_MAX = float(os.getenv("LLM_RETRY_BACKOFF_MAX", "8"))
+    LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+    LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
@@ -0,0 +1,244 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+
+from database_connection import get_db_connection
+from metrics import record_query
+
+
+class PoolExhaustedError(Exception):
+    pass
+
+
+class TimedCursor(extensions.cursor):
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            record_query(time.perf_counter() - started)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            record_query(time.perf_counter() - started)
+
+
+def _connect(cfg):
+    conn = get_db_connection(cfg)
+    conn.cursor_factory = TimedCursor
+    return conn
+
+
+class ConnectionPool:
+    def __init__(self, cfg):
+        self.cfg = cfg
+        self.min_size = cfg.DB_POOL_MIN_SIZE
+        self.max_size = cfg.DB_POOL_MAX_SIZE
+        self.timeout = cfg.DB_POOL_TIMEOUT
+        self.max_lifetime = cfg.DB_POOL_MAX_LIFETIME
+        self.health_check_after = cfg.DB_POOL_HEALTH_CHECK_AFTER
+
+        self._lock = threading.Condition()
+        self._idle = deque()
+        self._created_at = {}
+        self._size = 0
+        self._closed = False
+
+        self._checkouts = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+        self._exhausted = 0
+        self._timeouts = 0
+        self._recycled = 0
+        self._failed_health_checks = 0
+
+        for _ in range(self.min_size):
+            conn = self._open()
+            self._idle.append((conn, time.monotonic()))
+
+    def _open(self):
+        conn = _connect(self.cfg)
+        with self._lock:
+            self._size += 1
+            self._created_at[id(conn)] = time.monotonic()
+        return conn
+
+    def _discard(self, conn):
+        with self._lock:
+            self._size -= 1
+            self._created_at.pop(id(conn), None)
+            self._lock.notify()
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _expired(self, conn):
+        if not self.max_lifetime:
+            return False
+        created = self._created_at.get(id(conn), 0)
+        return time.monotonic() - created > self.max_lifetime
+
+    def _healthy(self, conn, idle_since):
+        if conn.closed:
+            return False
+        if time.monotonic() - idle_since < self.health_check_after:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            self._failed_health_checks += 1
+            return False
+
+    def getconn(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        exhausted = False
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise PoolExhaustedError("Pula połączeń jest zamknięta")
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                elif self._size < self.max_size:
+                    conn, idle_since = None, None
+                    self._size += 1
+                else:
+                    if not exhausted:
+                        exhausted = True
+                        self._exhausted += 1
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._lock.wait(remaining):
+                        if time.monotonic() >= deadline:
+                            self._timeouts += 1
+                            raise PoolExhaustedError(
+                                f"Brak wolnego połączenia po {self.timeout}s"
+                            )
+                    continue
+
+            if conn is None:
+                try:
+                    conn = _connect(self.cfg)
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                        self._lock.notify()
+                    raise
+                with self._lock:
+                    self._created_at[id(conn)] = time.monotonic()
+            elif self._expired(conn):
+                self._recycled += 1
+                self._discard(conn)
+                continue
+            elif not self._healthy(conn, idle_since):
+                self._discard(conn)
+                continue
+
+            waited = time.monotonic() - start
+            with self._lock:
+                self._checkouts += 1
+                self._wait_time_total += waited
+                self._wait_time_max = max(self._wait_time_max, waited)
+            return conn
+
+    def putconn(self, conn):
+        if conn.closed or self._closed or self._expired(conn):
+            self._discard(conn)
+            return
+
+        try:
+            status = conn.get_transaction_status()
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                self._discard(conn)
+                return
+            if status != extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+        except psycopg2.Error:
+            self._discard(conn)
+            return
+
+        with self._lock:
+            self._idle.append((conn, time.monotonic()))
+            self._lock.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.getconn()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                pass
+            raise
+        finally:
+            self.putconn(conn)
+
+    @contextmanager
+    def cursor(self):
+        with self.connection() as conn:
+            cur = conn.cursor()
+            try:
+                yield cur
+            finally:
+                cur.close()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._lock.notify_all()
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "max_size": self.max_size,
+                "checkouts": self._checkouts,
+                "wait_time_total": round(self._wait_time_total, 6),
+                "wait_time_max": round(self._wait_time_max, 6),
+                "wait_time_avg": round(self._wait_time_total / self._checkouts, 6) if self._checkouts else 0.0,
+                "exhausted": self._exhausted,
+                "timeouts": self._timeouts,
+                "recycled": self._recycled,
+                "failed_health_checks": self._failed_health_checks,
+            }
+
+
+def create_async_pool(cfg):
+    from psycopg.conninfo import make_conninfo
+    from psycopg_pool import AsyncConnectionPool
+
+    conninfo = make_conninfo(
+        dbname=cfg.DB_NAME,
+        user=cfg.DB_USER,
+        password=cfg.DB_PASSWORD,
+        host=cfg.DB_HOST,
+        port=cfg.DB_PORT,
+    )
+    return AsyncConnectionPool(
+        conninfo,
+        min_size=cfg.ASYNC_DB_POOL_MIN_SIZE,
+        max_size=cfg.ASYNC_DB_POOL_MAX_SIZE,
+        timeout=cfg.DB_POOL_TIMEOUT,
+        max_lifetime=cfg.DB_POOL_MAX_LIFETIME,
+        open=False,
+    )
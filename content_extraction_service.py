@@ -1,44 +1,44 @@
-import fitz
-import requests
-from bs4 import BeautifulSoup
-import tempfile
-import os
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import timed
+from text_extraction import meta_image_url
 
 class ContentExtractionService:
+    def __init__(self, fetcher, engine, workers=16):
+        self.fetcher = fetcher
+        self.engine = engine
+        self.workers = workers
+
     def extract_text_from_link(self, link: str) -> str:
         if not link:
             return ""
         try:
-            if link.lower().endswith(".pdf"):
-                return self._extract_pdf(link)
-            return self._extract_html(link)
+            return self.extract(link, self.fetch(link))
         except Exception as e:
             print(f"Błąd pobierania {link}: {e}")
             return ""
 
-    def _extract_pdf(self, link: str) -> str:
-        r = requests.get(link, timeout=20)
-        r.raise_for_status()
+    def extract_many(self, links) -> list:
+        links = list(links)
+        if not links:
+            return []
+        with ThreadPoolExecutor(min(self.workers, len(links))) as pool:
+            return list(pool.map(self.extract_text_from_link, links))
 
-        fd, path = tempfile.mkstemp(suffix=".pdf")
-        try:
-            with os.fdopen(fd, "wb") as f:
-                f.write(r.content)
-            doc = fitz.open(path)
-            text = "".join(page.get_text() for page in doc)
-            doc.close()
-            return text.strip()
-        finally:
-            try:
-                os.remove(path)
-            except:
-                pass
-
-    def _extract_html(self, link: str) -> str:
-        r = requests.get(link, timeout=20)
-        r.raise_for_status()
-        soup = BeautifulSoup(r.text, "html.parser")
-        for tag in soup(["script", "style", "noscript"]):
-            tag.extract()
-        text = soup.get_text(separator="\n")
-        return " ".join(text.split()).strip()
\ No newline at end of file
+    @timed("ingest.fetch")
+    def fetch(self, link: str):
+        return self.fetcher.fetch(link)
+
+    def _is_pdf(self, link, fetched):
+        return link.lower().endswith(".pdf") or "application/pdf" in fetched.content_type.lower()
+
+    @timed("ingest.extract")
+    def extract(self, link: str, fetched) -> str:
+        if self._is_pdf(link, fetched):
+            return self.engine.pdf_text(fetched.content)
+        return self.engine.html_text(fetched.content, fetched.encoding)
+
+    def image_url(self, link: str, fetched):
+        if self._is_pdf(link, fetched):
+            return None
+        return meta_image_url(fetched.content, fetched.url or link)
@@ -0,0 +1,171 @@
+import threading
+import time
+from collections import OrderedDict, deque
+
+CHAT_PRUNE_LOCK_ID = 724_311_003
+
+
+class PostgresConversationStore:
+    def __init__(self, pool, cfg):
+        self.pool = pool
+        self.max_messages = cfg.CHAT_HISTORY_MAX_MESSAGES
+        self.retention_days = cfg.CHAT_HISTORY_RETENTION_DAYS
+
+    def load(self, session_id):
+        with self.pool.cursor() as cur:
+            cur.execute("""
+                SELECT role, content FROM (
+                    SELECT id, role, content
+                    FROM chat_messages
+                    WHERE session_id=%s
+                    ORDER BY id DESC
+                    LIMIT %s
+                ) recent
+                ORDER BY id
+            """, (session_id, self.max_messages))
+            return [{"role": role, "content": content} for role, content in cur.fetchall()]
+
+    def append(self, session_id, role, content):
+        with self.pool.cursor() as cur:
+            cur.execute(
+                "INSERT INTO chat_messages (session_id, role, content) VALUES (%s, %s, %s)",
+                (session_id, role, content)
+            )
+
+    def clear(self, session_id):
+        with self.pool.cursor() as cur:
+            cur.execute("DELETE FROM chat_messages WHERE session_id=%s", (session_id,))
+
+    def prune(self):
+        with self.pool.cursor() as cur:
+            cur.execute("SELECT pg_try_advisory_xact_lock(%s)", (CHAT_PRUNE_LOCK_ID,))
+            if not cur.fetchone()[0]:
+                return None
+            cur.execute(
+                "DELETE FROM chat_messages WHERE created_at < NOW() - make_interval(days => %s)",
+                (self.retention_days,)
+            )
+            deleted = cur.rowcount
+            cur.execute("""
+                DELETE FROM chat_messages m
+                USING (
+                    SELECT id, row_number() OVER (PARTITION BY session_id ORDER BY id DESC) AS rn
+                    FROM chat_messages
+                ) ranked
+                WHERE m.id = ranked.id AND ranked.rn > %s
+            """, (self.max_messages,))
+            return deleted + cur.rowcount
+
+
+class InMemoryConversationStore:
+    def __init__(self, cfg):
+        self.max_messages = cfg.CHAT_HISTORY_MAX_MESSAGES
+        self.max_sessions = cfg.CHAT_HISTORY_MAX_SESSIONS
+        self.ttl = cfg.CHAT_HISTORY_RETENTION_DAYS * 86400
+
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()
+
+    def _get(self, session_id):
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        if self.ttl and time.time() - entry[0] > self.ttl:
+            del self._sessions[session_id]
+            return None
+        self._sessions.move_to_end(session_id)
+        return entry
+
+    def load(self, session_id):
+        with self._lock:
+            entry = self._get(session_id)
+            return [dict(m) for m in entry[1]] if entry else []
+
+    def append(self, session_id, role, content):
+        with self._lock:
+            entry = self._get(session_id)
+            if entry is None:
+                entry = [0.0, deque(maxlen=self.max_messages)]
+                self._sessions[session_id] = entry
+            entry[0] = time.time()
+            entry[1].append({"role": role, "content": content})
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def clear(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def prune(self):
+        with self._lock:
+            before = len(self._sessions)
+            for session_id in list(self._sessions):
+                self._get(session_id)
+            return before - len(self._sessions)
+
+
+class ConversationPruner:
+    def __init__(self, store, cfg):
+        self.store = store
+        self.interval = cfg.CHAT_HISTORY_PRUNE_INTERVAL
+
+        self._stop = threading.Event()
+        self._thread = None
+        self.runs = 0
+        self.deleted = 0
+        self.last_error = None
+
+    def run_once(self):
+        try:
+            deleted = self.store.prune()
+        except Exception as e:
+            print(f"Błąd czyszczenia historii rozmów: {e}")
+            self.last_error = str(e)
+            return None
+        if deleted is None:
+            return None
+        self.runs += 1
+        self.deleted += deleted
+        self.last_error = None
+        return deleted
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="conversation-pruner", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        return {
+            "runs": self.runs,
+            "deleted": self.deleted,
+            "last_error": self.last_error,
+        }
+
+
+def create_conversation_store(cfg, pool):
+    if cfg.CHAT_STORE == "memory":
+        return InMemoryConversationStore(cfg)
+    if cfg.CHAT_STORE == "postgres":
+        return PostgresConversationStore(pool, cfg)
+    raise ValueError(f"Nieznany magazyn rozmów: {cfg.CHAT_STORE}")
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    from config import Config
+    from connection_pool import ConnectionPool
+
+    pruner = ConversationPruner(create_conversation_store(Config, ConnectionPool(Config)), Config)
+    deleted = pruner.run_once()
+    if deleted is None:
+        raise SystemExit("Czyszczenie historii nie powiodło się lub trwa w innym procesie")
+    print(f"Usunięto wiadomości: {deleted}")
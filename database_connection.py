@@ -1,5 +1,11 @@
+import sys
+import time
+from datetime import date, timedelta
+
 import psycopg2
 
+EMBEDDING_COLUMNS = ("embedding", "embedding_alt")
+
 def get_db_connection(cfg):
     return psycopg2.connect(
         dbname=cfg.DB_NAME,
@@ -9,21 +15,65 @@ def get_db_connection(cfg):
         port=cfg.DB_PORT
     )
 
-def init_db(cfg):
-    conn = get_db_connection(cfg)
-    cur = conn.cursor()
-    cur.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+def embedding_column(column):
+    if column not in EMBEDDING_COLUMNS:
+        raise ValueError(f"Nieznana kolumna embeddingów: {column}")
+    return column
 
-    cur.execute("""
+def vector_index_name(column="embedding"):
+    return f"products_{embedding_column(column)}_idx"
+
+def stale_index_sql(column="embedding"):
+    column = embedding_column(column)
+    return f"""
+        CREATE INDEX IF NOT EXISTS products_{column}_stale_idx ON products (id)
+        WHERE {column} IS NULL OR {column}_hash IS DISTINCT FROM content_hash;
+    """
+
+def vector_index_sql(cfg, concurrently=False, column="embedding"):
+    concurrent = "CONCURRENTLY " if concurrently else ""
+    if cfg.VECTOR_INDEX_TYPE == "ivfflat":
+        method = "ivfflat"
+        params = f"lists = {int(cfg.VECTOR_IVFFLAT_LISTS)}"
+    elif cfg.VECTOR_INDEX_TYPE == "hnsw":
+        method = "hnsw"
+        params = f"m = {int(cfg.VECTOR_HNSW_M)}, ef_construction = {int(cfg.VECTOR_HNSW_EF_CONSTRUCTION)}"
+    else:
+        raise ValueError(f"Nieznany typ indeksu wektorowego: {cfg.VECTOR_INDEX_TYPE}")
+
+    return f"""
+        CREATE INDEX {concurrent}IF NOT EXISTS {vector_index_name(column)}
+        ON products USING {method} ({column} vector_ip_ops)
+        WITH ({params});
+    """
+
+LOG_DEFAULT_PARTITION = "logs_default"
+
+def log_partition_name(day):
+    return f"logs_p{day:%Y%m%d}"
+
+def log_partition_sql(day):
+    return f"""
+        CREATE TABLE IF NOT EXISTS {log_partition_name(day)} PARTITION OF logs
+        FOR VALUES FROM ('{day:%Y-%m-%d}') TO ('{day + timedelta(days=1):%Y-%m-%d}');
+    """
+
+def ts_config(cfg):
+    if not cfg.SEARCH_TS_CONFIG.replace("_", "").isalnum():
+        raise ValueError(f"Niepoprawna konfiguracja wyszukiwania: {cfg.SEARCH_TS_CONFIG}")
+    return cfg.SEARCH_TS_CONFIG
+
+def _m001_initial_schema(cur, cfg):
+    cur.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+    cur.execute(f"""
         CREATE TABLE IF NOT EXISTS products (
             id SERIAL PRIMARY KEY,
             name TEXT,
             description TEXT,
             link TEXT,
-            embedding vector(384)
+            embedding vector({int(cfg.EMBEDDING_DIM)})
         );
     """)
-
     cur.execute("""
         CREATE TABLE IF NOT EXISTS logs (
             id SERIAL PRIMARY KEY,
@@ -32,8 +82,6 @@ def init_db(cfg):
             created_at TIMESTAMP DEFAULT NOW()
         );
     """)
-
-
     cur.execute("""
         CREATE TABLE IF NOT EXISTS reviews (
             id SERIAL PRIMARY KEY,
@@ -43,6 +91,302 @@ def init_db(cfg):
         );
     """)
 
-    conn.commit()
+def _m002_product_version(cur, cfg):
+    cur.execute("ALTER TABLE products ADD COLUMN IF NOT EXISTS version INT NOT NULL DEFAULT 1;")
+
+def _m003_ingestion_jobs(cur, cfg):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS ingestion_jobs (
+            id SERIAL PRIMARY KEY,
+            kind TEXT NOT NULL,
+            product_id INT REFERENCES products(id) ON DELETE CASCADE,
+            name TEXT,
+            link TEXT,
+            description TEXT,
+            status TEXT NOT NULL DEFAULT 'queued',
+            stage TEXT,
+            progress INT NOT NULL DEFAULT 0,
+            attempts INT NOT NULL DEFAULT 0,
+            error TEXT,
+            run_after TIMESTAMP DEFAULT NOW(),
+            created_at TIMESTAMP DEFAULT NOW(),
+            updated_at TIMESTAMP DEFAULT NOW()
+        );
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS ingestion_jobs_queue_idx ON ingestion_jobs (status, run_after);")
+
+def _m004_import_runs(cur, cfg):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS import_runs (
+            source TEXT PRIMARY KEY,
+            status TEXT NOT NULL DEFAULT 'running',
+            rows_done INT NOT NULL DEFAULT 0,
+            rows_imported INT NOT NULL DEFAULT 0,
+            rows_failed INT NOT NULL DEFAULT 0,
+            error TEXT,
+            started_at TIMESTAMP DEFAULT NOW(),
+            updated_at TIMESTAMP DEFAULT NOW()
+        );
+    """)
+
+def _m005_chat_messages(cur, cfg):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS chat_messages (
+            id BIGSERIAL PRIMARY KEY,
+            session_id TEXT NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT NOW()
+        );
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS chat_messages_session_idx ON chat_messages (session_id, id DESC);")
+    cur.execute("CREATE INDEX IF NOT EXISTS chat_messages_created_idx ON chat_messages (created_at);")
+
+def _m006_product_search(cur, cfg):
+    cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+    cur.execute(f"""
+        ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('{ts_config(cfg)}', coalesce(name, '')), 'A') ||
+            setweight(to_tsvector('{ts_config(cfg)}', coalesce(description, '')), 'B')
+        ) STORED;
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS products_search_vector_idx ON products USING gin (search_vector);")
+    cur.execute("CREATE INDEX IF NOT EXISTS products_name_trgm_idx ON products USING gin (name gin_trgm_ops);")
+
+def _m007_reviews_recent_idx(cur, cfg):
+    cur.execute("DROP INDEX IF EXISTS reviews_product_id_idx;")
+    cur.execute("CREATE INDEX IF NOT EXISTS reviews_product_recent_idx ON reviews (product_id, id DESC);")
+
+def _m008_product_card_fields(cur, cfg):
+    cur.execute("ALTER TABLE products ADD COLUMN IF NOT EXISTS capacity TEXT;")
+    cur.execute("ALTER TABLE products ADD COLUMN IF NOT EXISTS image_url TEXT;")
+    cur.execute("ALTER TABLE ingestion_jobs ADD COLUMN IF NOT EXISTS image_url TEXT;")
+
+def _m009_vector_index(cur, cfg):
+    cur.execute(vector_index_sql(cfg))
+
+def _m010_embedding_versions(cur, cfg):
+    cur.execute("""
+        ALTER TABLE products ADD COLUMN IF NOT EXISTS content_hash TEXT
+        GENERATED ALWAYS AS (md5(coalesce(description, ''))) STORED;
+    """)
+    cur.execute("ALTER TABLE products ADD COLUMN IF NOT EXISTS source_hash TEXT;")
+    cur.execute("ALTER TABLE products ADD COLUMN IF NOT EXISTS embedding_hash TEXT;")
+    cur.execute("ALTER TABLE products ADD COLUMN IF NOT EXISTS embedding_alt vector;")
+    cur.execute("ALTER TABLE products ADD COLUMN IF NOT EXISTS embedding_alt_hash TEXT;")
+    cur.execute("ALTER TABLE ingestion_jobs ADD COLUMN IF NOT EXISTS source_hash TEXT;")
+    cur.execute("UPDATE products SET embedding_hash = content_hash WHERE embedding IS NOT NULL;")
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS embedding_columns (
+            column_name TEXT PRIMARY KEY,
+            model TEXT,
+            dim INT,
+            state TEXT NOT NULL DEFAULT 'retired',
+            updated_at TIMESTAMP DEFAULT NOW()
+        );
+    """)
+    cur.execute("""
+        SELECT atttypmod FROM pg_attribute
+        WHERE attrelid = 'products'::regclass AND attname = 'embedding'
+    """)
+    dim = cur.fetchone()[0]
+    cur.execute("""
+        INSERT INTO embedding_columns (column_name, model, dim, state) VALUES
+            ('embedding', %s, %s, 'active'),
+            ('embedding_alt', NULL, NULL, 'retired')
+        ON CONFLICT (column_name) DO NOTHING;
+    """, (cfg.EMBEDDING_MODEL, dim if dim > 0 else None))
+
+def _m011_logs_partitioned(cur, cfg):
+    first_day = date.today() + timedelta(days=1)
+    cur.execute("ALTER TABLE logs RENAME TO logs_legacy;")
+    cur.execute("ALTER INDEX logs_pkey RENAME TO logs_legacy_pkey;")
+    cur.execute("ALTER SEQUENCE logs_id_seq OWNED BY NONE;")
+    cur.execute("UPDATE logs_legacy SET created_at = 'epoch' WHERE created_at IS NULL;")
+    cur.execute("ALTER TABLE logs_legacy ALTER COLUMN created_at SET NOT NULL;")
+    cur.execute("""
+        CREATE TABLE logs (
+            id INT NOT NULL DEFAULT nextval('logs_id_seq'),
+            action TEXT NOT NULL,
+            details TEXT,
+            created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at);
+    """)
+    cur.execute(f"ALTER TABLE logs ATTACH PARTITION logs_legacy FOR VALUES FROM (MINVALUE) TO ('{first_day:%Y-%m-%d}');")
+    for offset in range(cfg.LOG_PARTITION_PREMAKE_DAYS + 1):
+        cur.execute(log_partition_sql(first_day + timedelta(days=offset)))
+    cur.execute("CREATE INDEX IF NOT EXISTS logs_action_created_idx ON logs (action, created_at DESC);")
+    cur.execute("CREATE INDEX IF NOT EXISTS logs_created_idx ON logs (created_at DESC, id DESC);")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS log_rollups (
+            day DATE NOT NULL,
+            action TEXT NOT NULL,
+            events BIGINT NOT NULL,
+            PRIMARY KEY (day, action)
+        );
+    """)
+
+def _m012_review_digests(cur, cfg):
+    cur.execute("ALTER TABLE reviews ADD COLUMN IF NOT EXISTS embedding vector;")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS review_digests (
+            product_id INT PRIMARY KEY REFERENCES products(id) ON DELETE CASCADE,
+            review_count INT NOT NULL DEFAULT 0,
+            summary TEXT,
+            snippets TEXT[] NOT NULL DEFAULT '{}',
+            snippet_embeddings BYTEA,
+            revision INT NOT NULL DEFAULT 0,
+            dirty_since TIMESTAMP,
+            claimed_until TIMESTAMP,
+            refreshed_at TIMESTAMP
+        );
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS review_digests_dirty_idx
+        ON review_digests (dirty_since) WHERE dirty_since IS NOT NULL;
+    """)
+    cur.execute("""
+        INSERT INTO review_digests (product_id, review_count, dirty_since)
+        SELECT product_id, COUNT(*), NOW() FROM reviews GROUP BY product_id
+        ON CONFLICT (product_id) DO NOTHING;
+    """)
+
+def _m013_review_embedding_model(cur, cfg):
+    cur.execute("ALTER TABLE reviews ADD COLUMN IF NOT EXISTS embedding_model TEXT;")
+    cur.execute("""
+        ALTER TABLE review_digests
+            ADD COLUMN IF NOT EXISTS embedding_model TEXT,
+            ADD COLUMN IF NOT EXISTS embedding_dim INT;
+    """)
+    cur.execute("UPDATE reviews SET embedding_model=%s WHERE embedding IS NOT NULL;", (cfg.EMBEDDING_MODEL,))
+    cur.execute("""
+        UPDATE review_digests
+        SET embedding_model=%s,
+            embedding_dim = octet_length(snippet_embeddings) / 4 / cardinality(snippets)
+        WHERE snippet_embeddings IS NOT NULL AND cardinality(snippets) > 0;
+    """, (cfg.EMBEDDING_MODEL,))
+
+def _m014_import_failures(cur, cfg):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS import_failures (
+            source TEXT NOT NULL REFERENCES import_runs(source) ON DELETE CASCADE,
+            row_number INT NOT NULL,
+            error TEXT,
+            failed_at TIMESTAMP DEFAULT NOW(),
+            PRIMARY KEY (source, row_number)
+        );
+    """)
+
+def _m015_embedding_stale_idx(cur, cfg):
+    for column in EMBEDDING_COLUMNS:
+        cur.execute(stale_index_sql(column))
+
+def _m016_logs_default_partition(cur, cfg):
+    cur.execute(f"CREATE TABLE IF NOT EXISTS {LOG_DEFAULT_PARTITION} PARTITION OF logs DEFAULT;")
+
+MIGRATIONS = [
+    (1, "initial_schema", _m001_initial_schema),
+    (2, "product_version", _m002_product_version),
+    (3, "ingestion_jobs", _m003_ingestion_jobs),
+    (4, "import_runs", _m004_import_runs),
+    (5, "chat_messages", _m005_chat_messages),
+    (6, "product_search", _m006_product_search),
+    (7, "reviews_recent_idx", _m007_reviews_recent_idx),
+    (8, "product_card_fields", _m008_product_card_fields),
+    (9, "vector_index", _m009_vector_index),
+    (10, "embedding_versions", _m010_embedding_versions),
+    (11, "logs_partitioned", _m011_logs_partitioned),
+    (12, "review_digests", _m012_review_digests),
+    (13, "review_embedding_model", _m013_review_embedding_model),
+    (14, "import_failures", _m014_import_failures),
+    (15, "embedding_stale_idx", _m015_embedding_stale_idx),
+    (16, "logs_default_partition", _m016_logs_default_partition),
+]
+
+MIGRATIONS_LOCK_ID = 724_311_001
+
+def _applied_versions(cur):
+    cur.execute("SELECT to_regclass('schema_migrations');")
+    if cur.fetchone()[0] is None:
+        return set()
+    cur.execute("SELECT version FROM schema_migrations;")
+    return {row[0] for row in cur.fetchall()}
+
+def pending_migrations(cfg):
+    conn = get_db_connection(cfg)
+    try:
+        with conn.cursor() as cur:
+            applied = _applied_versions(cur)
+        return [(version, name) for version, name, _ in MIGRATIONS if version not in applied]
+    finally:
+        conn.close()
+
+def migrate(cfg, report=print):
+    conn = get_db_connection(cfg)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_lock(%s);", (MIGRATIONS_LOCK_ID,))
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    applied_at TIMESTAMP DEFAULT NOW()
+                );
+            """)
+            conn.commit()
+
+            applied = _applied_versions(cur)
+            done = []
+            for version, name, apply in MIGRATIONS:
+                if version in applied:
+                    continue
+                started = time.perf_counter()
+                apply(cur, cfg)
+                cur.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s);", (version, name))
+                conn.commit()
+                done.append(version)
+                report(f"Migracja {version:03d} {name}: {time.perf_counter() - started:.2f}s")
+
+            cur.execute("SELECT pg_advisory_unlock(%s);", (MIGRATIONS_LOCK_ID,))
+            conn.commit()
+        return done
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def rebuild_vector_index(cfg, column="embedding"):
+    conn = get_db_connection(cfg)
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {vector_index_name(column)};")
+    cur.execute(vector_index_sql(cfg, concurrently=True, column=column))
+    cur.execute("ANALYZE products;")
     cur.close()
-    conn.close()
\ No newline at end of file
+    conn.close()
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    from config import Config
+
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command in ("migrate", "init"):
+        applied = migrate(Config)
+        print(f"Zastosowano migracji: {len(applied)}")
+    elif command == "status":
+        pending = pending_migrations(Config)
+        for version, name in pending:
+            print(f"oczekuje: {version:03d} {name}")
+        print(f"Oczekujących migracji: {len(pending)}")
+    elif command == "rebuild-index":
+        column = sys.argv[2] if len(sys.argv) > 2 else "embedding"
+        rebuild_vector_index(Config, column)
+        print(f"Przebudowano indeks {vector_index_name(column)} ({Config.VECTOR_INDEX_TYPE})")
+    else:
+        print("Użycie: python database_connection.py [migrate|status|rebuild-index [kolumna]]")
+        sys.exit(1)
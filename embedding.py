@@ -1,7 +1,62 @@
-from sentence_transformers import SentenceTransformer
+import threading
+import time
 
-def create_embedding_model(cfg):
-    return SentenceTransformer(cfg.EMBEDDING_MODEL)
+EMBEDDING_BACKENDS = ("torch", "onnx", "openvino")
+
+_models = {}
+_lock = threading.Lock()
+load_seconds = {}
+
+def model_spec(cfg):
+    if cfg.EMBEDDING_BACKEND not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Nieznany backend embeddingów: {cfg.EMBEDDING_BACKEND}")
+    return cfg.EMBEDDING_MODEL, cfg.EMBEDDING_BACKEND, cfg.EMBEDDING_MODEL_FILE or None
+
+def load_model(name, backend="torch", model_file=None):
+    key = (name, backend, model_file)
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            from sentence_transformers import SentenceTransformer
+            started = time.perf_counter()
+            if backend == "torch":
+                model = SentenceTransformer(name)
+            else:
+                model_kwargs = {"file_name": model_file} if model_file else None
+                model = SentenceTransformer(name, backend=backend, model_kwargs=model_kwargs)
+            _models[key] = model
+            load_seconds["/".join(part for part in key if part)] = round(time.perf_counter() - started, 3)
+        return model
+
+def preload(cfg):
+    return load_model(*model_spec(cfg))
+
+class LazyEmbeddingModel:
+    def __init__(self, name, backend="torch", model_file=None):
+        self.spec = (name, backend, model_file)
+        self._model = None
+
+    def load(self):
+        if self._model is None:
+            self._model = load_model(*self.spec)
+        return self._model
+
+    @property
+    def loaded(self):
+        return self._model is not None or self.spec in _models
+
+    def encode(self, *args, **kwargs):
+        return self.load().encode(*args, **kwargs)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.load(), name)
+
+def create_embedding_model(cfg, lazy=False):
+    if lazy:
+        return LazyEmbeddingModel(*model_spec(cfg))
+    return load_model(*model_spec(cfg))
 
 def embed_text(embedder, text: str):
-    return embedder.encode(text).tolist()
\ No newline at end of file
+    return embedder.encode(text).tolist()
@@ -0,0 +1,128 @@
+import queue
+import threading
+import time
+
+import numpy as np
+
+
+class _Request:
+    __slots__ = ("texts", "enqueued_at", "done", "result", "error")
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.enqueued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class BatchingEmbedder:
+    def __init__(self, model, cfg):
+        self.model = model
+        self.max_batch = cfg.EMBEDDING_BATCH_SIZE
+        self.max_wait = cfg.EMBEDDING_BATCH_WAIT_MS / 1000
+
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.texts = 0
+        self.batches = 0
+        self.direct = 0
+        self.max_batch_seen = 0
+        self.wait_seconds = 0.0
+        self.encode_seconds = 0.0
+
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+    def encode(self, sentences, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        if not texts or len(texts) >= self.max_batch or set(kwargs) - {"batch_size"}:
+            with self._stats_lock:
+                self.direct += 1
+            return self.model.encode(sentences, **kwargs)
+
+        request = _Request(texts)
+        self._queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result[0] if single else request.result
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        size = len(first.texts)
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch:
+            try:
+                remaining = deadline - time.perf_counter()
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                self._queue.put(None)
+                break
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+    def _encode(self, batch):
+        texts = [t for request in batch for t in request.texts]
+        started = time.perf_counter()
+        try:
+            vectors = np.asarray(self.model.encode(texts, batch_size=len(texts)))
+        except Exception as e:
+            for request in batch:
+                request.error = e
+                request.done.set()
+            return
+        finished = time.perf_counter()
+
+        offset = 0
+        for request in batch:
+            request.result = vectors[offset:offset + len(request.texts)]
+            offset += len(request.texts)
+            request.done.set()
+
+        with self._stats_lock:
+            self.requests += len(batch)
+            self.texts += len(texts)
+            self.batches += 1
+            self.max_batch_seen = max(self.max_batch_seen, len(texts))
+            self.wait_seconds += sum(started - request.enqueued_at for request in batch)
+            self.encode_seconds += finished - started
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            self._encode(batch)
+
+    def close(self, timeout=5):
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "requests": self.requests,
+                "texts": self.texts,
+                "batches": self.batches,
+                "direct_calls": self.direct,
+                "avg_batch_size": round(self.texts / self.batches, 2) if self.batches else 0.0,
+                "max_batch_size": self.max_batch_seen,
+                "avg_wait_ms": round(self.wait_seconds / self.requests * 1000, 2) if self.requests else 0.0,
+                "avg_encode_ms": round(self.encode_seconds / self.batches * 1000, 2) if self.batches else 0.0,
+            }
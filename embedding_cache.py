@@ -0,0 +1,134 @@
+import atexit
+import os
+import pickle
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+
+def normalize_query(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = " ".join(text.split())
+    return re.sub(r"[\s?!.,;:]+$", "", text)
+
+
+class CachedEmbedder:
+    def __init__(self, model, cfg):
+        self.model = model
+        self.max_size = cfg.EMBEDDING_CACHE_SIZE
+        self.ttl = cfg.EMBEDDING_CACHE_TTL
+        self.path = cfg.EMBEDDING_CACHE_PATH
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.path:
+            self.load()
+            atexit.register(self.save)
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def _expired(self, stored_at):
+        return self.ttl and time.time() - stored_at > self.ttl
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._expired(entry[0]):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def _store(self, key, vector):
+        with self._lock:
+            self._entries[key] = (time.time(), vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def encode(self, text, **kwargs):
+        if not isinstance(text, str):
+            return self.encode_many(list(text), **kwargs)
+
+        key = normalize_query(text)
+        vector = self._lookup(key)
+        if vector is None:
+            vector = np.asarray(self.model.encode(text, **kwargs))
+            self._store(key, vector)
+        return vector.copy()
+
+    def encode_many(self, texts, **kwargs):
+        keys = [normalize_query(t) for t in texts]
+        vectors = [self._lookup(k) for k in keys]
+        missing = [i for i, v in enumerate(vectors) if v is None]
+
+        if missing:
+            encoded = self.model.encode([texts[i] for i in missing], **kwargs)
+            for i, vector in zip(missing, encoded):
+                vectors[i] = np.asarray(vector)
+                self._store(keys[i], vectors[i])
+
+        if not vectors:
+            return np.empty((0, self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+        return np.stack(vectors)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "rb") as f:
+                entries = pickle.load(f)
+        except Exception as e:
+            print(f"Błąd wczytywania cache embeddingów: {e}")
+            return
+
+        with self._lock:
+            for key, (stored_at, vector) in entries:
+                if not self._expired(stored_at):
+                    self._entries[key] = (stored_at, np.asarray(vector))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            entries = [
+                (key, (stored_at, vector))
+                for key, (stored_at, vector) in self._entries.items()
+                if not self._expired(stored_at)
+            ]
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(entries, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Błąd zapisu cache embeddingów: {e}")
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
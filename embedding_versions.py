@@ -0,0 +1,263 @@
+import argparse
+import hashlib
+import threading
+import time
+
+from psycopg2.extras import execute_values
+
+from database_connection import EMBEDDING_COLUMNS, embedding_column, rebuild_vector_index, stale_index_sql
+
+REGISTRY_FIELDS = ("column", "model", "dim", "state", "updated_at")
+EMBEDDING_SWEEP_LOCK_ID = 724_311_004
+
+
+def content_hash(text) -> str:
+    return hashlib.md5((text or "").encode("utf-8")).hexdigest()
+
+
+def stale_predicate(column):
+    column = embedding_column(column)
+    return f"({column} IS NULL OR {column}_hash IS DISTINCT FROM content_hash)"
+
+
+class EmbeddingRegistry:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def columns(self):
+        with self.pool.cursor() as cur:
+            cur.execute("SELECT to_regclass('embedding_columns')")
+            if cur.fetchone()[0] is None:
+                return []
+            cur.execute("""
+                SELECT column_name, model, dim, state, to_char(updated_at, 'YYYY-MM-DD HH24:MI:SS')
+                FROM embedding_columns ORDER BY column_name
+            """)
+            return [dict(zip(REGISTRY_FIELDS, row)) for row in cur.fetchall()]
+
+    def column_for(self, model):
+        found = {c["state"]: c["column"] for c in self.columns() if c["model"] == model}
+        return found.get("active") or found.get("building")
+
+    def get(self, column):
+        return next((c for c in self.columns() if c["column"] == column), None)
+
+    def stale_count(self, column):
+        with self.pool.cursor() as cur:
+            cur.execute(f"SELECT COUNT(*) FROM products WHERE {stale_predicate(column)}")
+            return cur.fetchone()[0]
+
+    def start(self, model, dim):
+        with self.pool.cursor() as cur:
+            cur.execute("SELECT column_name FROM embedding_columns WHERE model=%s AND state='building'", (model,))
+            row = cur.fetchone()
+            if row:
+                return row[0]
+
+            cur.execute("""
+                SELECT column_name FROM embedding_columns
+                WHERE state <> 'active'
+                ORDER BY column_name
+                LIMIT 1
+                FOR UPDATE
+            """)
+            row = cur.fetchone()
+            if row is None:
+                raise RuntimeError("Brak wolnej kolumny embeddingów")
+            column = embedding_column(row[0])
+
+            cur.execute(f"""
+                ALTER TABLE products
+                    DROP COLUMN IF EXISTS {column},
+                    DROP COLUMN IF EXISTS {column}_hash,
+                    ADD COLUMN {column} vector({int(dim)}),
+                    ADD COLUMN {column}_hash TEXT
+            """)
+            cur.execute(stale_index_sql(column))
+            cur.execute("""
+                UPDATE embedding_columns SET model=%s, dim=%s, state='building', updated_at=NOW()
+                WHERE column_name=%s
+            """, (model, dim, column))
+        return column
+
+    def activate(self, column):
+        with self.pool.cursor() as cur:
+            cur.execute("""
+                UPDATE embedding_columns
+                SET state = CASE WHEN column_name=%s THEN 'active' ELSE 'retired' END, updated_at=NOW()
+                WHERE column_name=%s OR state='active'
+            """, (embedding_column(column), column))
+
+
+class ReEmbedder:
+    def __init__(self, pool, embedder, cfg):
+        self.pool = pool
+        self.embedder = embedder
+        self.cfg = cfg
+        self.batch_size = cfg.REEMBED_BATCH_SIZE
+
+    def _next_batch(self, column, after_id):
+        with self.pool.cursor() as cur:
+            cur.execute(f"""
+                SELECT id, description, content_hash
+                FROM products
+                WHERE id > %s AND {stale_predicate(column)}
+                ORDER BY id
+                LIMIT %s
+            """, (after_id, self.batch_size))
+            return cur.fetchall()
+
+    def _write(self, column, rows, vectors):
+        column = embedding_column(column)
+        with self.pool.cursor() as cur:
+            execute_values(
+                cur,
+                f"""
+                    UPDATE products p SET {column} = v.embedding, {column}_hash = v.hash
+                    FROM (VALUES %s) AS v(id, embedding, hash)
+                    WHERE p.id = v.id AND p.content_hash = v.hash
+                """,
+                [(pid, vector.tolist(), digest) for (pid, _, digest), vector in zip(rows, vectors)],
+                template="(%s, %s::vector, %s)",
+                page_size=len(rows),
+            )
+            return cur.rowcount
+
+    def run(self, column, report=print):
+        after_id = 0
+        done = 0
+        started = time.perf_counter()
+        while True:
+            rows = self._next_batch(column, after_id)
+            if not rows:
+                break
+            vectors = self.embedder.encode([description or "" for _, description, _ in rows],
+                                           batch_size=self.batch_size)
+            done += self._write(column, rows, vectors)
+            after_id = rows[-1][0]
+            elapsed = time.perf_counter() - started
+            report(f"[{column}] {done} wierszy, do id {after_id}, {done / elapsed:.1f} wierszy/s")
+        return done
+
+
+class EmbeddingSweeper:
+    def __init__(self, registry, embedder, cfg, column):
+        self.registry = registry
+        self.reembedder = ReEmbedder(registry.pool, embedder, cfg)
+        self.model = cfg.EMBEDDING_MODEL
+        self.column = embedding_column(column)
+        self.interval = cfg.EMBEDDING_SWEEP_INTERVAL
+
+        self._stop = threading.Event()
+        self._thread = None
+        self.runs = 0
+        self.swept = 0
+        self.last_error = None
+
+    def run_once(self):
+        target = self.registry.get(self.column)
+        if target is None or target["state"] != "active" or target["model"] != self.model:
+            return 0
+        try:
+            with self.registry.pool.cursor() as cur:
+                cur.execute("SELECT pg_try_advisory_xact_lock(%s)", (EMBEDDING_SWEEP_LOCK_ID,))
+                if not cur.fetchone()[0]:
+                    return 0
+                done = self.reembedder.run(self.column, report=lambda *_: None)
+        except Exception as e:
+            print(f"Błąd przeliczania nieaktualnych embeddingów: {e}")
+            self.last_error = str(e)
+            return 0
+        self.runs += 1
+        self.last_error = None
+        if done:
+            self.swept += done
+            print(f"Przeliczono nieaktualne embeddingi w {self.column}: {done}")
+        return done
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Błąd pętli przeliczania embeddingów: {e}")
+
+    def start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="embedding-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        return {
+            "column": self.column,
+            "runs": self.runs,
+            "swept": self.swept,
+            "last_error": self.last_error,
+        }
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    from config import Config
+    from connection_pool import ConnectionPool
+    from embedding import load_model
+    from review_digest_repo import ReviewDigestRepository
+
+    parser = argparse.ArgumentParser(description="Wersjonowanie i przeliczanie embeddingów produktów")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status")
+    start = sub.add_parser("start", help="przygotuj kolumnę cienia dla nowego modelu")
+    start.add_argument("model")
+    run = sub.add_parser("run", help="przelicz nieaktualne embeddingi (wznawialne)")
+    run.add_argument("--column", choices=EMBEDDING_COLUMNS)
+    run.add_argument("--skip-index", action="store_true")
+    activate = sub.add_parser("activate", help="przełącz aktywną kolumnę na zbudowaną")
+    activate.add_argument("--column", choices=EMBEDDING_COLUMNS)
+    activate.add_argument("--force", action="store_true")
+    args = parser.parse_args()
+
+    registry = EmbeddingRegistry(ConnectionPool(Config))
+
+    def load(model):
+        return load_model(model, Config.EMBEDDING_BACKEND, Config.EMBEDDING_MODEL_FILE or None)
+
+    def pick(column):
+        if column:
+            return registry.get(column)
+        columns = registry.columns()
+        return (next((c for c in columns if c["state"] == "building"), None)
+                or next((c for c in columns if c["state"] == "active"), None))
+
+    if args.command == "status":
+        for c in registry.columns():
+            stale = registry.stale_count(c["column"]) if c["model"] else "-"
+            print(f"{c['column']:<14} {c['state']:<9} {c['model'] or '-'} (dim {c['dim'] or '-'}), nieaktualne: {stale}")
+    elif args.command == "start":
+        dim = load(args.model).get_sentence_embedding_dimension()
+        column = registry.start(args.model, dim)
+        print(f"Kolumna {column} przygotowana dla {args.model} (dim {dim}), uruchom: python embedding_versions.py run")
+    elif args.command == "run":
+        target = pick(args.column)
+        if target is None or not target["model"]:
+            raise SystemExit("Brak kolumny do przeliczenia")
+        reembedder = ReEmbedder(registry.pool, load(target["model"]), Config)
+        reembedder.run(target["column"])
+        if not args.skip_index:
+            rebuild_vector_index(Config, target["column"])
+            print(f"Zbudowano indeks dla {target['column']}")
+    elif args.command == "activate":
+        target = pick(args.column)
+        if target is None or target["state"] != "building":
+            raise SystemExit("Brak budowanej kolumny do aktywacji")
+        stale = registry.stale_count(target["column"])
+        if stale and not args.force:
+            raise SystemExit(f"{stale} nieaktualnych wierszy, uruchom najpierw: python embedding_versions.py run")
+        registry.activate(target["column"])
+        print(f"Aktywna kolumna: {target['column']} ({target['model']})")
+        marked = ReviewDigestRepository(registry.pool).mark_all_dirty(reembed=True)
+        print(f"Podsumowania opinii do przeliczenia z nowym modelem: {marked}")
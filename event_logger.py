@@ -1,9 +1,100 @@
+import atexit
+import queue
+import threading
+from datetime import datetime
+
+
 class EventLogger:
-    def __init__(self, log_repo):
+    def __init__(self, log_repo, cfg):
         self.log_repo = log_repo
+        self.batch_size = cfg.LOG_BATCH_SIZE
+        self.flush_interval = cfg.LOG_FLUSH_INTERVAL
+        self.overflow = cfg.LOG_QUEUE_OVERFLOW
+        self.block_timeout = cfg.LOG_QUEUE_BLOCK_TIMEOUT
+        self.details_max_chars = cfg.LOG_DETAILS_MAX_CHARS
+
+        self._queue = queue.Queue(maxsize=cfg.LOG_QUEUE_SIZE)
+        self._stop = threading.Event()
+        self._flush_now = threading.Event()
+        self._stats_lock = threading.Lock()
+        self.enqueued = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+        self._thread = threading.Thread(target=self._run, name="event-logger", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
 
     def log(self, action: str, details: str = ""):
+        if details and self.details_max_chars and len(details) > self.details_max_chars:
+            details = details[:self.details_max_chars] + "…"
+        event = (action, details, datetime.now())
+        try:
+            if self.overflow == "block":
+                self._queue.put(event, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(event)
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped += 1
+            return
+
+        with self._stats_lock:
+            self.enqueued += 1
+        if self._queue.qsize() >= self.batch_size:
+            self._flush_now.set()
+
+    def _drain(self):
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
         try:
-            self.log_repo.add(action, details)
+            self.log_repo.add_many(batch)
         except Exception as e:
-            print(f"Log Error: {e}")
\ No newline at end of file
+            print(f"Log Error: {e}")
+            with self._stats_lock:
+                self.failed += len(batch)
+            return
+        with self._stats_lock:
+            self.flushed += len(batch)
+            self.batches += 1
+
+    def flush(self):
+        while True:
+            batch = self._drain()
+            if not batch:
+                return
+            self._write(batch)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._flush_now.wait(self.flush_interval)
+            self._flush_now.clear()
+            self.flush()
+
+    def close(self, timeout=5):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._flush_now.set()
+        self._thread.join(timeout)
+        self.flush()
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "queued": self._queue.qsize(),
+                "enqueued": self.enqueued,
+                "flushed": self.flushed,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "batches": self.batches,
+            }
@@ -0,0 +1,14 @@
+import gc
+
+from dotenv import load_dotenv
+load_dotenv()
+
+import embedding
+from config import Config
+
+wsgi_app = "main:create_app()"
+
+def on_starting(server):
+    if Config.PRELOAD_MODELS:
+        embedding.preload(Config)
+        gc.freeze()
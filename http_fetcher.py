@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import threading
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+FetchResult = namedtuple("FetchResult", "url content content_type encoding from_cache")
+
+
+class ContentTooLargeError(Exception):
+    pass
+
+
+def charset_from_content_type(content_type):
+    for param in content_type.split(";")[1:]:
+        key, _, value = param.partition("=")
+        if key.strip().lower() == "charset":
+            return value.strip().strip('"\'') or None
+    return None
+
+
+class HttpFetcher:
+    def __init__(self, cfg):
+        self.timeout = cfg.FETCH_TIMEOUT
+        self.max_bytes = cfg.FETCH_MAX_BYTES
+        self.cache_dir = cfg.CONTENT_CACHE_DIR
+        self.per_host = cfg.FETCH_PER_HOST_CONCURRENCY
+
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = cfg.FETCH_USER_AGENT
+        adapter = HTTPAdapter(pool_connections=cfg.FETCH_POOL_SIZE, pool_maxsize=cfg.FETCH_POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._hosts_lock = threading.Lock()
+        self._hosts = {}
+
+        self.requests = 0
+        self.not_modified = 0
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def host_slot(self, url):
+        host = urlsplit(url).netloc.lower()
+        with self._hosts_lock:
+            if host not in self._hosts:
+                self._hosts[host] = threading.BoundedSemaphore(self.per_host)
+            return self._hosts[host]
+
+    def _cache_paths(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.cache_dir, key)
+        return base + ".json", base + ".body"
+
+    def _load_cached(self, url):
+        if not self.cache_dir:
+            return None, None
+        meta_path, body_path = self._cache_paths(url)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+            return meta, body
+        except (OSError, ValueError):
+            return None, None
+
+    def _store_cached(self, url, response, body):
+        if not self.cache_dir:
+            return
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+
+        meta_path, body_path = self._cache_paths(url)
+        meta = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "content_type": response.headers.get("Content-Type", ""),
+            "encoding": charset_from_content_type(response.headers.get("Content-Type", "")),
+        }
+        try:
+            with open(body_path + ".tmp", "wb") as f:
+                f.write(body)
+            os.replace(body_path + ".tmp", body_path)
+            with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(meta_path + ".tmp", meta_path)
+        except OSError as e:
+            print(f"Błąd zapisu cache treści {url}: {e}")
+
+    def _read_limited(self, response):
+        length = response.headers.get("Content-Length")
+        if length and length.isdigit() and int(length) > self.max_bytes:
+            raise ContentTooLargeError(f"Treść ma {length} B (limit {self.max_bytes} B)")
+
+        chunks = []
+        size = 0
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            size += len(chunk)
+            if size > self.max_bytes:
+                raise ContentTooLargeError(f"Treść przekracza limit {self.max_bytes} B")
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    def fetch(self, url):
+        meta, cached_body = self._load_cached(url)
+        headers = {}
+        if meta is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        with self.host_slot(url):
+            self.requests += 1
+            with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as r:
+                if r.status_code == 304 and meta is not None:
+                    self.not_modified += 1
+                    return FetchResult(url, cached_body, meta["content_type"], meta["encoding"], True)
+
+                r.raise_for_status()
+                body = self._read_limited(r)
+                self._store_cached(url, r, body)
+                content_type = r.headers.get("Content-Type", "")
+                return FetchResult(url, body, content_type, charset_from_content_type(content_type), False)
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "not_modified": self.not_modified,
+            "hosts": len(self._hosts),
+        }
@@ -0,0 +1,82 @@
+from psycopg2.extras import execute_values
+
+from database_connection import embedding_column
+from embedding_versions import content_hash
+
+IMPORT_FIELDS = (
+    "source", "status", "rows_done", "rows_imported", "rows_failed", "error", "started_at", "updated_at",
+)
+
+class ImportRepository:
+    def __init__(self, pool, cache=None, column="embedding"):
+        self.pool = pool
+        self.cache = cache
+        self.column = embedding_column(column)
+
+    def start(self, source):
+        with self.pool.cursor() as cur:
+            cur.execute("""
+                INSERT INTO import_runs (source) VALUES (%s)
+                ON CONFLICT (source) DO UPDATE SET status='running', error=NULL, updated_at=NOW()
+                RETURNING rows_done
+            """, (source,))
+            return cur.fetchone()[0]
+
+    def get(self, source):
+        with self.pool.cursor() as cur:
+            cur.execute("""
+                SELECT source, status, rows_done, rows_imported, rows_failed, error,
+                       to_char(started_at, 'YYYY-MM-DD HH24:MI:SS'),
+                       to_char(updated_at, 'YYYY-MM-DD HH24:MI:SS')
+                FROM import_runs WHERE source=%s
+            """, (source,))
+            row = cur.fetchone()
+        return dict(zip(IMPORT_FIELDS, row)) if row else None
+
+    def failed_rows(self, source):
+        with self.pool.cursor() as cur:
+            cur.execute("SELECT row_number FROM import_failures WHERE source=%s", (source,))
+            return {row[0] for row in cur.fetchall()}
+
+    def write_chunk(self, source, rows_done, products, failures=(), retried=(), page_size=500):
+        with self.pool.cursor() as cur:
+            if products:
+                execute_values(
+                    cur,
+                    f"INSERT INTO products (name, description, link, {self.column}, capacity, image_url, "
+                    f"{self.column}_hash) VALUES %s",
+                    [(*product, content_hash(product[1])) for product in products],
+                    template="(%s, %s, %s, %s::vector, %s, %s, %s)",
+                    page_size=page_size,
+                )
+            if retried:
+                cur.execute(
+                    "DELETE FROM import_failures WHERE source=%s AND row_number = ANY(%s)",
+                    (source, list(retried))
+                )
+            if failures:
+                execute_values(
+                    cur,
+                    """
+                        INSERT INTO import_failures (source, row_number, error) VALUES %s
+                        ON CONFLICT (source, row_number) DO UPDATE SET error=EXCLUDED.error, failed_at=NOW()
+                    """,
+                    [(source, row_number, error) for row_number, error in failures],
+                )
+            cur.execute("""
+                UPDATE import_runs
+                SET rows_done=%s,
+                    rows_imported=rows_imported + %s,
+                    rows_failed=(SELECT COUNT(*) FROM import_failures WHERE source=%s),
+                    updated_at=NOW()
+                WHERE source=%s
+            """, (rows_done, len(products), source, source))
+        if products and self.cache is not None:
+            self.cache.invalidate_listing()
+
+    def finish(self, source, status, error=None):
+        with self.pool.cursor() as cur:
+            cur.execute(
+                "UPDATE import_runs SET status=%s, error=%s, updated_at=NOW() WHERE source=%s",
+                (status, error, source)
+            )
@@ -0,0 +1,167 @@
+import threading
+
+import requests
+
+from http_fetcher import ContentTooLargeError
+from embedding_versions import content_hash
+from product_description_service import extract_capacity
+
+STAGES = ["fetch", "extract", "summarize", "embed", "upsert"]
+
+
+class PermanentJobError(Exception):
+    pass
+
+
+class IngestionService:
+    def __init__(self, job_repo, product_repo, extractor, summarizer, embedder, logger, cfg, answer_cache=None):
+        self.job_repo = job_repo
+        self.product_repo = product_repo
+        self.extractor = extractor
+        self.summarizer = summarizer
+        self.embedder = embedder
+        self.logger = logger
+        self.answer_cache = answer_cache
+
+        self.workers = cfg.INGESTION_WORKERS
+        self.max_attempts = cfg.INGESTION_MAX_ATTEMPTS
+        self.retry_backoff = cfg.INGESTION_RETRY_BACKOFF
+        self.poll_interval = cfg.INGESTION_POLL_INTERVAL
+        self.stale_after = cfg.INGESTION_STALE_AFTER
+        self.refresh_on_edit = cfg.INGESTION_REFRESH_ON_EDIT
+
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+
+    def submit_add(self, name, link):
+        job_id = self.job_repo.create("add", name, link)
+        self._wakeup.set()
+        return job_id
+
+    def submit_edit(self, product_id, name, link):
+        job_id = self.job_repo.create("edit", name, link, product_id=product_id)
+        self._wakeup.set()
+        return job_id
+
+    def start(self):
+        requeued = self.job_repo.requeue_stale(self.stale_after)
+        if requeued:
+            self.logger.log("INGEST_REQUEUE", f"Requeued {requeued} stale jobs")
+
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, name=f"ingestion-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        self._wakeup.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                job = self.job_repo.claim_next()
+            except Exception as e:
+                print(f"Błąd pobierania zadania: {e}")
+                job = None
+
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            try:
+                self._process(job)
+            except Exception as e:
+                print(f"Błąd obsługi zadania {job['id']}: {e}")
+
+    def _stage(self, job, stage):
+        self.job_repo.set_stage(job["id"], stage, STAGES.index(stage) * 100 // len(STAGES))
+
+    def _process(self, job):
+        try:
+            product_id = self._run_pipeline(job)
+        except PermanentJobError as e:
+            self.job_repo.fail(job["id"], str(e))
+            self.logger.log("INGEST_FAIL", f"Job {job['id']} ({job['link']}): {e}")
+            return
+        except Exception as e:
+            if job["attempts"] >= self.max_attempts:
+                self.job_repo.fail(job["id"], str(e))
+                self.logger.log("INGEST_FAIL", f"Job {job['id']} ({job['link']}): {e}")
+            else:
+                delay = self.retry_backoff * 2 ** (job["attempts"] - 1)
+                self.job_repo.retry_later(job["id"], str(e), delay)
+            return
+
+        self.job_repo.complete(job["id"], product_id)
+
+    def _run_pipeline(self, job):
+        description = job["description"]
+        image_url = job["image_url"]
+        source_hash = job["source_hash"]
+
+        state = None
+        if job["kind"] == "edit" and job["product_id"] is not None:
+            state = self.product_repo.ingestion_state(job["product_id"])
+        same_link = state is not None and state["link"] == job["link"]
+
+        if description is None and same_link and state["description"] and not self.refresh_on_edit:
+            description = state["description"]
+            image_url = state["image_url"]
+            source_hash = state["source_hash"]
+            self.logger.log("INGEST_REUSE", f"Job {job['id']}: link unchanged, reusing description")
+
+        if description is None:
+            text = ""
+            if job["link"]:
+                self._stage(job, "fetch")
+                try:
+                    fetched = self.extractor.fetch(job["link"])
+                except ContentTooLargeError as e:
+                    raise PermanentJobError(str(e))
+                except requests.HTTPError as e:
+                    if e.response is not None and 400 <= e.response.status_code < 500:
+                        raise PermanentJobError(f"HTTP {e.response.status_code}")
+                    raise
+
+                self._stage(job, "extract")
+                text = self.extractor.extract(job["link"], fetched)
+                image_url = self.extractor.image_url(job["link"], fetched)
+            source_hash = content_hash(text)
+
+            if same_link and state["description"] and state["source_hash"] == source_hash:
+                description = state["description"]
+            else:
+                self._stage(job, "summarize")
+                description = self.summarizer.summarize_markdown(text, raise_errors=True)
+            self.job_repo.save_description(job["id"], description, image_url, source_hash)
+
+        capacity = extract_capacity(description)
+
+        embedding = None
+        if state is None or not state["embedding_fresh"] or state["description"] != description:
+            self._stage(job, "embed")
+            embedding = self.embedder.encode(description).tolist()
+
+        self._stage(job, "upsert")
+        if job["kind"] == "edit":
+            product_id = job["product_id"]
+            if product_id is None or state is None:
+                raise PermanentJobError("Produkt nie istnieje")
+            self.product_repo.update(
+                product_id, job["name"], job["link"], description, embedding, capacity, image_url, source_hash
+            )
+            if self.answer_cache is not None:
+                self.answer_cache.invalidate_products([product_id])
+            self.logger.log("EDIT_PRODUCT", f"Updated product {product_id} -> {job['name']}")
+        else:
+            product_id = self.product_repo.insert(
+                job["name"], description, job["link"], embedding, capacity, image_url, source_hash
+            )
+            self.logger.log("ADD_PRODUCT", f"Added product '{job['name']}'")
+        return product_id
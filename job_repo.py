@@ -0,0 +1,96 @@
+JOB_COLUMNS = """
+    id, kind, product_id, name, link, description, image_url, source_hash, status, stage, progress, attempts, error,
+    to_char(created_at, 'YYYY-MM-DD HH24:MI:SS'), to_char(updated_at, 'YYYY-MM-DD HH24:MI:SS')
+"""
+
+JOB_FIELDS = (
+    "id", "kind", "product_id", "name", "link", "description", "image_url", "source_hash", "status", "stage",
+    "progress", "attempts", "error", "created_at", "updated_at",
+)
+
+class JobRepository:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def _to_dict(self, row):
+        return dict(zip(JOB_FIELDS, row)) if row else None
+
+    def create(self, kind, name, link, product_id=None):
+        with self.pool.cursor() as cur:
+            cur.execute(
+                "INSERT INTO ingestion_jobs (kind, product_id, name, link) VALUES (%s,%s,%s,%s) RETURNING id",
+                (kind, product_id, name, link)
+            )
+            return cur.fetchone()[0]
+
+    def get(self, job_id):
+        with self.pool.cursor() as cur:
+            cur.execute(f"SELECT {JOB_COLUMNS} FROM ingestion_jobs WHERE id=%s", (job_id,))
+            return self._to_dict(cur.fetchone())
+
+    def latest(self, limit=50):
+        with self.pool.cursor() as cur:
+            cur.execute(f"SELECT {JOB_COLUMNS} FROM ingestion_jobs ORDER BY id DESC LIMIT %s", (limit,))
+            return [self._to_dict(r) for r in cur.fetchall()]
+
+    def claim_next(self):
+        with self.pool.cursor() as cur:
+            cur.execute(f"""
+                UPDATE ingestion_jobs
+                SET status='running', attempts=attempts + 1, updated_at=NOW()
+                WHERE id = (
+                    SELECT id FROM ingestion_jobs
+                    WHERE status='queued' AND run_after <= NOW()
+                    ORDER BY id
+                    FOR UPDATE SKIP LOCKED
+                    LIMIT 1
+                )
+                RETURNING {JOB_COLUMNS}
+            """)
+            return self._to_dict(cur.fetchone())
+
+    def set_stage(self, job_id, stage, progress):
+        with self.pool.cursor() as cur:
+            cur.execute(
+                "UPDATE ingestion_jobs SET stage=%s, progress=%s, updated_at=NOW() WHERE id=%s",
+                (stage, progress, job_id)
+            )
+
+    def save_description(self, job_id, description, image_url=None, source_hash=None):
+        with self.pool.cursor() as cur:
+            cur.execute("""
+                UPDATE ingestion_jobs SET description=%s, image_url=%s, source_hash=%s, updated_at=NOW()
+                WHERE id=%s
+            """, (description, image_url, source_hash, job_id))
+
+    def complete(self, job_id, product_id):
+        with self.pool.cursor() as cur:
+            cur.execute("""
+                UPDATE ingestion_jobs
+                SET status='done', stage='done', progress=100, product_id=%s, error=NULL, updated_at=NOW()
+                WHERE id=%s
+            """, (product_id, job_id))
+
+    def retry_later(self, job_id, error, delay_seconds):
+        with self.pool.cursor() as cur:
+            cur.execute("""
+                UPDATE ingestion_jobs
+                SET status='queued', error=%s, run_after=NOW() + make_interval(secs => %s), updated_at=NOW()
+                WHERE id=%s
+            """, (error, delay_seconds, job_id))
+
+    def fail(self, job_id, error):
+        with self.pool.cursor() as cur:
+            cur.execute(
+                "UPDATE ingestion_jobs SET status='failed', error=%s, updated_at=NOW() WHERE id=%s",
+                (error, job_id)
+            )
+
+    def requeue_stale(self, older_than_seconds):
+        with self.pool.cursor() as cur:
+            cur.execute("""
+                UPDATE ingestion_jobs
+                SET status='queued', updated_at=NOW()
+                WHERE status='running' AND updated_at < NOW() - make_interval(secs => %s)
+            """, (older_than_seconds,))
+            return cur.rowcount
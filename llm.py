@@ -1,4 +1,32 @@
-from openai import OpenAI
+import threading
 
-def create_openai_client(cfg):
-    return OpenAI(api_key=cfg.OPENAI_API_KEY)
\ No newline at end of file
+class LazyOpenAIClient:
+    def __init__(self, cfg, max_retries=None):
+        self.cfg = cfg
+        self.max_retries = max_retries
+        self._client = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            if self._client is None:
+                self._client = create_openai_client(self.cfg, max_retries=self.max_retries)
+            return self._client
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.load(), name)
+
+def create_openai_client(cfg, lazy=False, max_retries=None):
+    if lazy:
+        return LazyOpenAIClient(cfg, max_retries)
+    from openai import OpenAI
+    kwargs = {} if max_retries is None else {"max_retries": max_retries}
+    return OpenAI(api_key=cfg.OPENAI_API_KEY, base_url=cfg.OPENAI_BASE_URL, **kwargs)
+
+def create_async_openai_client(cfg, max_retries=None):
+    from openai import AsyncOpenAI
+    kwargs = {} if max_retries is None else {"max_retries": max_retries}
+    return AsyncOpenAI(api_key=cfg.OPENAI_API_KEY, base_url=cfg.OPENAI_BASE_URL, timeout=cfg.ASYNC_CHAT_TIMEOUT,
+                       **kwargs)
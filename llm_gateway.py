@@ -0,0 +1,511 @@
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import deque
+from types import SimpleNamespace
+
+from llm import create_openai_client
+
+RETRYABLE_STATUS = {408, 409, 429}
+RETRYABLE_ERRORS = {"APITimeoutError", "APIConnectionError", "Timeout", "ConnectionError"}
+LATENCY_WINDOW = 512
+
+
+class LLMUnavailableError(Exception):
+    pass
+
+
+class LLMOverloadedError(LLMUnavailableError):
+    pass
+
+
+def is_retryable(error):
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS or status >= 500
+    return type(error).__name__ in RETRYABLE_ERRORS
+
+
+def parse_model_limits(value):
+    limits = {}
+    for item in (value or "").split(","):
+        model, _, limit = item.partition("=")
+        if model.strip() and limit.strip().isdigit():
+            limits[model.strip()] = int(limit)
+    return limits
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold, cooldown):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opened = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def abandon(self):
+        with self._lock:
+            self._probing = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.opened += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+
+class _ModelLane:
+    def __init__(self, limit, max_queue, breaker):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.breaker = breaker
+        self.cond = threading.Condition()
+        self.inflight = 0
+        self.queued = 0
+        self.async_inflight = 0
+        self.async_queued = 0
+        self._semaphore = None
+
+        self.requests = 0
+        self.coalesced = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected = 0
+        self.queue_timeouts = 0
+        self.max_queued = 0
+        self.queue_wait_total = 0.0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def acquire(self, deadline):
+        with self.cond:
+            if self.inflight < self.limit and not self.queued:
+                self.inflight += 1
+                return 0.0
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise LLMOverloadedError("Kolejka zapytań do modelu jest pełna")
+            started = time.monotonic()
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+            try:
+                while self.inflight >= self.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.queue_timeouts += 1
+                        raise LLMOverloadedError("Przekroczono czas oczekiwania na model")
+                    self.cond.wait(remaining)
+                self.inflight += 1
+            finally:
+                self.queued -= 1
+            waited = time.monotonic() - started
+            self.queue_wait_total += waited
+            return waited
+
+    def release(self):
+        with self.cond:
+            self.inflight -= 1
+            self.cond.notify()
+
+    async def acquire_async(self, deadline):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        with self.cond:
+            if self.async_queued >= self.max_queue:
+                self.rejected += 1
+                raise LLMOverloadedError("Kolejka zapytań do modelu jest pełna")
+            self.async_queued += 1
+            self.max_queued = max(self.max_queued, self.async_queued)
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), max(0.0, deadline - started))
+        except asyncio.TimeoutError:
+            with self.cond:
+                self.queue_timeouts += 1
+            raise LLMOverloadedError("Przekroczono czas oczekiwania na model") from None
+        finally:
+            with self.cond:
+                self.async_queued -= 1
+        waited = time.monotonic() - started
+        with self.cond:
+            self.async_inflight += 1
+            self.queue_wait_total += waited
+        return waited
+
+    def release_async(self):
+        with self.cond:
+            self.async_inflight -= 1
+        self._semaphore.release()
+
+    def stats(self):
+        with self.cond:
+            latencies = sorted(self.latencies)
+            requests = self.requests
+            return {
+                "limit": self.limit,
+                "inflight": self.inflight,
+                "queued": self.queued,
+                "async_inflight": self.async_inflight,
+                "async_queued": self.async_queued,
+                "max_queued": self.max_queued,
+                "requests": requests,
+                "coalesced": self.coalesced,
+                "retries": self.retries,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "queue_timeouts": self.queue_timeouts,
+                "avg_queue_wait_ms": round(self.queue_wait_total / requests * 1000, 2) if requests else 0.0,
+                "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else 0.0,
+                "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 1) if latencies else 0.0,
+                "breaker": self.breaker.state,
+                "breaker_open": self.breaker.state != "closed",
+                "breaker_opened": self.breaker.opened,
+            }
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _GuardedStream:
+    def __init__(self, stream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+        self._closed = False
+
+    def __iter__(self):
+        ok = False
+        try:
+            yield from self._stream
+            ok = True
+        finally:
+            self._finish(ok)
+
+    def _finish(self, ok):
+        if not self._closed:
+            self._closed = True
+            self._on_close(ok)
+
+    def close(self):
+        try:
+            close = getattr(self._stream, "close", None)
+            if close is not None:
+                close()
+        finally:
+            self._finish(False)
+
+
+class _AsyncGuardedStream:
+    def __init__(self, stream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+        self._closed = False
+
+    async def __aiter__(self):
+        ok = False
+        try:
+            async for chunk in self._stream:
+                yield chunk
+            ok = True
+        finally:
+            self._finish(ok)
+
+    def _finish(self, ok):
+        if not self._closed:
+            self._closed = True
+            self._on_close(ok)
+
+    async def close(self):
+        try:
+            close = getattr(self._stream, "close", None)
+            if close is not None:
+                await close()
+        finally:
+            self._finish(False)
+
+
+class _AsyncLane:
+    def __init__(self, gateway, client):
+        self.gateway = gateway
+        self.client = client
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+        self._flights = {}
+
+    async def _call(self, lane, kwargs, deadline):
+        gateway = self.gateway
+        attempt = 0
+        while True:
+            try:
+                return await self.client.chat.completions.create(**kwargs)
+            except Exception as e:
+                if attempt >= gateway.max_retries or not is_retryable(e) or time.monotonic() >= deadline:
+                    raise
+                attempt += 1
+                with lane.cond:
+                    lane.retries += 1
+                await asyncio.sleep(gateway.retry_delay(attempt))
+
+    async def _execute(self, model, kwargs):
+        gateway = self.gateway
+        lane = gateway._lane(model)
+        if not lane.breaker.allow():
+            with lane.cond:
+                lane.rejected += 1
+            raise LLMUnavailableError(f"Model {model} jest chwilowo niedostępny")
+
+        started = time.monotonic()
+        try:
+            await lane.acquire_async(started + gateway.queue_timeout)
+        except BaseException:
+            lane.breaker.abandon()
+            raise
+        with lane.cond:
+            lane.requests += 1
+
+        released = False
+        try:
+            try:
+                result = await self._call(lane, kwargs, started + gateway.request_timeout)
+            except asyncio.CancelledError:
+                lane.breaker.abandon()
+                raise
+            except Exception as e:
+                with lane.cond:
+                    lane.failures += 1
+                if not is_retryable(e):
+                    lane.breaker.success()
+                    raise
+                lane.breaker.failure()
+                raise LLMUnavailableError(f"Model {model} nie odpowiada: {e}") from e
+
+            if not kwargs.get("stream", False):
+                lane.breaker.success()
+                with lane.cond:
+                    lane.latencies.append(time.monotonic() - started)
+                return result
+
+            def on_close(ok):
+                if ok:
+                    lane.breaker.success()
+                else:
+                    lane.breaker.abandon()
+                with lane.cond:
+                    lane.latencies.append(time.monotonic() - started)
+                lane.release_async()
+
+            released = True
+            return _AsyncGuardedStream(result, on_close)
+        finally:
+            if not released:
+                lane.release_async()
+
+    async def create(self, **kwargs):
+        model = kwargs.get("model", "")
+        kwargs.setdefault("timeout", self.gateway.request_timeout)
+        if kwargs.get("stream"):
+            return await self._execute(model, kwargs)
+
+        key = self.gateway._flight_key(kwargs)
+        flight = self._flights.get(key)
+        if flight is not None:
+            lane = self.gateway._lane(model)
+            with lane.cond:
+                lane.coalesced += 1
+            return await asyncio.shield(flight)
+
+        flight = self._flights[key] = asyncio.ensure_future(self._execute(model, kwargs))
+        try:
+            return await asyncio.shield(flight)
+        finally:
+            if flight.done():
+                self._flights.pop(key, None)
+            else:
+                flight.add_done_callback(lambda _: self._flights.pop(key, None))
+
+
+class LLMGateway:
+    def __init__(self, client, cfg):
+        self.client = client
+        self.default_limit = cfg.LLM_MAX_CONCURRENCY
+        self.model_limits = parse_model_limits(cfg.LLM_MODEL_CONCURRENCY)
+        self.max_queue = cfg.LLM_MAX_QUEUE
+        self.queue_timeout = cfg.LLM_QUEUE_TIMEOUT
+        self.request_timeout = cfg.LLM_REQUEST_TIMEOUT
+        self.max_retries = cfg.LLM_MAX_RETRIES
+        self.backoff = cfg.LLM_RETRY_BACKOFF
+        self.backoff_max = cfg.LLM_RETRY_BACKOFF_MAX
+        self.breaker_failures = cfg.LLM_BREAKER_FAILURES
+        self.breaker_cooldown = cfg.LLM_BREAKER_COOLDOWN
+
+        self._lanes = {}
+        self._lanes_lock = threading.Lock()
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _lane(self, model):
+        with self._lanes_lock:
+            lane = self._lanes.get(model)
+            if lane is None:
+                lane = self._lanes[model] = _ModelLane(
+                    self.model_limits.get(model, self.default_limit),
+                    self.max_queue,
+                    CircuitBreaker(self.breaker_failures, self.breaker_cooldown),
+                )
+            return lane
+
+    @staticmethod
+    def _flight_key(kwargs):
+        payload = json.dumps(kwargs, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def retry_delay(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt))
+
+    def _call(self, lane, kwargs, deadline):
+        attempt = 0
+        while True:
+            try:
+                return self.client.chat.completions.create(**kwargs)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e) or time.monotonic() >= deadline:
+                    raise
+                attempt += 1
+                with lane.cond:
+                    lane.retries += 1
+                time.sleep(self.retry_delay(attempt))
+
+    def _execute(self, model, kwargs):
+        lane = self._lane(model)
+        if not lane.breaker.allow():
+            with lane.cond:
+                lane.rejected += 1
+            raise LLMUnavailableError(f"Model {model} jest chwilowo niedostępny")
+
+        started = time.monotonic()
+        try:
+            lane.acquire(started + self.queue_timeout)
+        except LLMOverloadedError:
+            lane.breaker.abandon()
+            raise
+        with lane.cond:
+            lane.requests += 1
+
+        stream = kwargs.get("stream", False)
+        released = False
+        try:
+            try:
+                result = self._call(lane, kwargs, started + self.request_timeout)
+            except Exception as e:
+                with lane.cond:
+                    lane.failures += 1
+                if not is_retryable(e):
+                    lane.breaker.success()
+                    raise
+                lane.breaker.failure()
+                raise LLMUnavailableError(f"Model {model} nie odpowiada: {e}") from e
+
+            if not stream:
+                lane.breaker.success()
+                with lane.cond:
+                    lane.latencies.append(time.monotonic() - started)
+                return result
+
+            def on_close(ok):
+                if ok:
+                    lane.breaker.success()
+                else:
+                    lane.breaker.abandon()
+                with lane.cond:
+                    lane.latencies.append(time.monotonic() - started)
+                lane.release()
+
+            released = True
+            return _GuardedStream(result, on_close)
+        finally:
+            if not released:
+                lane.release()
+
+    def create(self, **kwargs):
+        model = kwargs.get("model", "")
+        kwargs.setdefault("timeout", self.request_timeout)
+        if kwargs.get("stream"):
+            return self._execute(model, kwargs)
+
+        key = self._flight_key(kwargs)
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            lane = self._lane(model)
+            with lane.cond:
+                lane.coalesced += 1
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = self._execute(model, kwargs)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._flights_lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def async_client(self, client):
+        return _AsyncLane(self, client)
+
+    def stats(self):
+        with self._lanes_lock:
+            lanes = dict(self._lanes)
+        with self._flights_lock:
+            inflight_keys = len(self._flights)
+        return {
+            "single_flight_keys": inflight_keys,
+            "models": {model: lane.stats() for model, lane in lanes.items()},
+        }
+
+
+def create_llm_client(cfg, lazy=True):
+    if not cfg.LLM_GATEWAY_ENABLED:
+        return create_openai_client(cfg, lazy=lazy)
+    return LLMGateway(create_openai_client(cfg, lazy=lazy, max_retries=0), cfg)
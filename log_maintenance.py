@@ -0,0 +1,76 @@
+import threading
+
+
+class LogMaintenance:
+    def __init__(self, log_repo, cfg):
+        self.log_repo = log_repo
+        self.retention_days = cfg.LOG_RETENTION_DAYS
+        self.premake_days = cfg.LOG_PARTITION_PREMAKE_DAYS
+        self.interval = cfg.LOG_MAINTENANCE_INTERVAL
+
+        self._stop = threading.Event()
+        self._thread = None
+        self.runs = 0
+        self.dropped = []
+        self.moved = 0
+        self.last_error = None
+
+    def run_once(self):
+        try:
+            dropped, moved = self.log_repo.maintain(self.retention_days, self.premake_days)
+        except Exception as e:
+            print(f"Błąd utrzymania logów: {e}")
+            self.last_error = str(e)
+            return None
+        if dropped is None:
+            return None
+        self.runs += 1
+        if moved:
+            self.moved += moved
+            print(f"Przeniesiono {moved} wpisów logów z partycji domyślnej")
+        self.last_error = None
+        if dropped:
+            self.dropped.extend(dropped)
+            print(f"Usunięto partycje logów: {', '.join(dropped)}")
+        return dropped
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self.interval <= 0:
+            print("Uwaga: utrzymanie logów wyłączone (LOG_MAINTENANCE_INTERVAL<=0), nowe wpisy trafią do "
+                  "partycji domyślnej, uruchamiaj okresowo: python log_maintenance.py")
+            return
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="log-maintenance", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        return {
+            "runs": self.runs,
+            "retention_days": self.retention_days,
+            "dropped_partitions": len(self.dropped),
+            "moved_from_default": self.moved,
+            "last_error": self.last_error,
+        }
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    from config import Config
+    from connection_pool import ConnectionPool
+    from log_repo import LogRepository
+
+    maintenance = LogMaintenance(LogRepository(ConnectionPool(Config)), Config)
+    dropped = maintenance.run_once()
+    if dropped is None:
+        raise SystemExit("Utrzymanie logów nie powiodło się lub trwa w innym procesie")
+    print(f"Partycje przygotowane, usunięto: {len(dropped)}")
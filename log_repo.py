@@ -1,30 +1,167 @@
-from database_connection import get_db_connection
+import re
+from datetime import date, datetime, timedelta
+
+from psycopg2.extras import execute_values
+
+from database_connection import LOG_DEFAULT_PARTITION, log_partition_name, log_partition_sql
+
+LOG_MAINTENANCE_LOCK_ID = 724_311_002
+
+_UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+_DAILY = re.compile(r"^logs_p\d{8}$")
+
 
 class LogRepository:
-    def __init__(self, cfg):
-        self.cfg = cfg
+    def __init__(self, pool):
+        self.pool = pool
 
     def add(self, action: str, details: str = ""):
-        conn = get_db_connection(self.cfg)
-        cur = conn.cursor()
-        cur.execute("INSERT INTO logs (action, details) VALUES (%s, %s)", (action, details))
-        conn.commit()
-        cur.close()
-        conn.close()
-
-    def latest(self, limit=500):
-        conn = get_db_connection(self.cfg)
-        cur = conn.cursor()
+        with self.pool.cursor() as cur:
+            cur.execute("INSERT INTO logs (action, details) VALUES (%s, %s)", (action, details))
+
+    def add_many(self, events):
+        with self.pool.cursor() as cur:
+            execute_values(
+                cur,
+                "INSERT INTO logs (action, details, created_at) VALUES %s",
+                events,
+                page_size=len(events),
+            )
+
+    def page(self, action=None, since=None, until=None, before=None, limit=100):
+        conditions, params = [], []
+        if action:
+            conditions.append("action = %s")
+            params.append(action)
+        if since:
+            conditions.append("created_at >= %s")
+            params.append(since)
+        if until:
+            conditions.append("created_at < %s")
+            params.append(until)
+        if before:
+            conditions.append("(created_at, id) < (%s, %s)")
+            params.extend(before)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        with self.pool.cursor() as cur:
+            cur.execute(f"""
+                SELECT id,
+                       action,
+                       details,
+                       to_char(created_at, 'YYYY-MM-DD HH24:MI:SS') AS created_at,
+                       created_at AS cursor_at
+                FROM logs
+                {where}
+                ORDER BY created_at DESC, id DESC
+                LIMIT %s
+            """, (*params, limit + 1))
+            rows = cur.fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = f"{last[4].isoformat()},{last[0]}"
+        return [row[:4] for row in rows], next_cursor
+
+    def actions(self):
+        with self.pool.cursor() as cur:
+            cur.execute("""
+                WITH RECURSIVE a AS (
+                    (SELECT action FROM logs ORDER BY action LIMIT 1)
+                    UNION ALL
+                    SELECT (SELECT action FROM logs WHERE action > a.action ORDER BY action LIMIT 1)
+                    FROM a WHERE a.action IS NOT NULL
+                )
+                SELECT action FROM a WHERE action IS NOT NULL
+            """)
+            return [row[0] for row in cur.fetchall()]
+
+    def _partitions(self, cur):
         cur.execute("""
-            SELECT id,
-                   action,
-                   details,
-                   to_char(created_at, 'YYYY-MM-DD HH24:MI:SS') AS created_at
-            FROM logs
-            ORDER BY created_at DESC
-            LIMIT %s
-        """, (limit,))
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
-        return rows
\ No newline at end of file
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'logs'::regclass
+        """)
+        partitions = []
+        for name, bound in cur.fetchall():
+            match = _UPPER_BOUND.search(bound or "")
+            if match:
+                partitions.append((name, datetime.fromisoformat(match.group(1)).date()))
+        return partitions
+
+    def _move_from_default(self, cur, day):
+        name = log_partition_name(day)
+        bounds = (day, day + timedelta(days=1))
+        cur.execute(f"LOCK TABLE {LOG_DEFAULT_PARTITION} IN SHARE ROW EXCLUSIVE MODE")
+        cur.execute(f"CREATE TABLE {name} (LIKE logs INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        cur.execute(f"""
+            WITH moved AS (
+                DELETE FROM {LOG_DEFAULT_PARTITION} WHERE created_at >= %s AND created_at < %s RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved
+        """, bounds)
+        moved = cur.rowcount
+        cur.execute(f"""
+            ALTER TABLE logs ATTACH PARTITION {name}
+            FOR VALUES FROM ('{bounds[0]:%Y-%m-%d}') TO ('{bounds[1]:%Y-%m-%d}')
+        """)
+        return moved
+
+    def maintain(self, retention_days, premake_days):
+        with self.pool.cursor() as cur:
+            cur.execute("SELECT pg_try_advisory_xact_lock(%s)", (LOG_MAINTENANCE_LOCK_ID,))
+            if not cur.fetchone()[0]:
+                return None, 0
+
+            today = date.today()
+            partitions = self._partitions(cur)
+            existing = {name for name, _ in partitions}
+            floor = max([date.min] + [upper for name, upper in partitions if not _DAILY.match(name)])
+            start = max(today, floor)
+            days = {start + timedelta(days=offset)
+                    for offset in range((today + timedelta(days=premake_days) - start).days + 1)}
+
+            cur.execute("SELECT to_regclass(%s)", (LOG_DEFAULT_PARTITION,))
+            stranded = set()
+            if cur.fetchone()[0] is not None:
+                cur.execute(f"SELECT DISTINCT created_at::date FROM {LOG_DEFAULT_PARTITION}")
+                stranded = {row[0] for row in cur.fetchall() if row[0] >= floor}
+
+            moved = 0
+            for day in sorted(days | stranded):
+                if log_partition_name(day) in existing:
+                    continue
+                if day in stranded:
+                    moved += self._move_from_default(cur, day)
+                else:
+                    cur.execute(log_partition_sql(day))
+            if moved:
+                partitions = self._partitions(cur)
+
+            dropped = []
+            if retention_days > 0:
+                cutoff = today - timedelta(days=retention_days)
+                for name, upper in sorted(partitions, key=lambda p: p[1]):
+                    if upper > cutoff:
+                        continue
+                    cur.execute(f"""
+                        INSERT INTO log_rollups (day, action, events)
+                        SELECT created_at::date, action, COUNT(*) FROM {name} GROUP BY 1, 2
+                        ON CONFLICT (day, action) DO UPDATE SET events = log_rollups.events + EXCLUDED.events
+                    """)
+                    cur.execute(f"DROP TABLE {name}")
+                    dropped.append(name)
+            return dropped, moved
+
+    def rollups(self, days=30):
+        with self.pool.cursor() as cur:
+            cur.execute("""
+                SELECT to_char(day, 'YYYY-MM-DD'), action, events
+                FROM log_rollups
+                WHERE day >= CURRENT_DATE - %s
+                ORDER BY day DESC, action
+            """, (days,))
+            return cur.fetchall()
@@ -3,18 +3,37 @@ load_dotenv()
 from flask import Flask
 from config import Config
 
-from database_connection import init_db
-from llm import create_openai_client
+from database_connection import migrate, pending_migrations
+from connection_pool import ConnectionPool
+from llm_gateway import LLMGateway, create_llm_client
 from embedding import create_embedding_model
+from embedding_cache import CachedEmbedder
+from embedding_batcher import BatchingEmbedder
 
 from product_repo import ProductRepository
 from review_repo import ReviewRepository
 from log_repo import LogRepository
+from job_repo import JobRepository
+from conversation_store import ConversationPruner, create_conversation_store
+from import_repo import ImportRepository
 
 from content_extraction_service import ContentExtractionService
+from http_fetcher import HttpFetcher
+from text_extraction import TextExtractionEngine
 from product_description_service import ProductDescriptionService
 from event_logger import EventLogger
+from log_maintenance import LogMaintenance
+from review_digest_repo import ReviewDigestRepository
+from review_digest_service import ReviewDigestService
 from chat_service import ChatService
+from prompt_builder import PromptBuilder
+from ingestion_service import IngestionService
+from bulk_import import BulkImporter
+from answer_cache import AnswerCache
+from page_cache import create_page_cache
+from embedding_versions import EmbeddingRegistry, EmbeddingSweeper
+from startup import StartupReport
+from metrics import instrument_app
 
 from pages import pages_bp, register_pages
 from api import api_bp, register_api
@@ -25,38 +44,113 @@ def create_app():
     app.secret_key = app.config["SECRET_KEY"]
 
     cfg = Config
+    startup = StartupReport()
 
-    init_db(cfg)
+    with startup.phase("schema"):
+        if cfg.MIGRATE_ON_START:
+            migrate(cfg)
+        else:
+            pending = pending_migrations(cfg)
+            if pending:
+                print(f"Uwaga: {len(pending)} oczekujących migracji, uruchom: python database_connection.py migrate")
 
-    client = create_openai_client(cfg)
-    embedder = create_embedding_model(cfg)
+    with startup.phase("models"):
+        client = create_llm_client(cfg, lazy=True)
+        llm_gateway = client if isinstance(client, LLMGateway) else None
+        model = create_embedding_model(cfg, lazy=True)
+        if cfg.PRELOAD_MODELS:
+            model.load()
+        batcher = BatchingEmbedder(model, cfg) if cfg.EMBEDDING_BATCHING else None
+        embedder = batcher or model
+        query_embedder = CachedEmbedder(embedder, cfg)
 
-    product_repo = ProductRepository(cfg)
-    review_repo = ReviewRepository(cfg)
-    log_repo = LogRepository(cfg)
+    with startup.phase("db_pool"):
+        db_pool = ConnectionPool(cfg)
 
-    logger = EventLogger(log_repo)
-    extractor = ContentExtractionService()
-    summarizer = ProductDescriptionService(client)
-    chat_service = ChatService(client, embedder, product_repo, logger)
+    with startup.phase("repositories"):
+        page_cache = create_page_cache(cfg)
+
+        registry = EmbeddingRegistry(db_pool)
+        embedding_column = registry.column_for(cfg.EMBEDDING_MODEL)
+        if embedding_column is None:
+            print(f"Uwaga: brak embeddingów dla modelu {cfg.EMBEDDING_MODEL}, uruchom: python embedding_versions.py start")
+            embedding_column = "embedding"
+
+        product_repo = ProductRepository(db_pool, cfg, page_cache, embedding_column)
+        review_repo = ReviewRepository(db_pool, page_cache)
+        log_repo = LogRepository(db_pool)
+        job_repo = JobRepository(db_pool)
+        import_repo = ImportRepository(db_pool, page_cache, embedding_column)
+        conversations = create_conversation_store(cfg, db_pool)
+
+    with startup.phase("services"):
+        logger = EventLogger(log_repo, cfg)
+        log_maintenance = LogMaintenance(log_repo, cfg)
+        log_maintenance.start()
+        conversation_pruner = ConversationPruner(conversations, cfg)
+        conversation_pruner.start()
+        fetcher = HttpFetcher(cfg)
+        extractor = ContentExtractionService(fetcher, TextExtractionEngine(cfg), cfg.FETCH_WORKERS)
+        summarizer = ProductDescriptionService(client)
+        answer_cache = AnswerCache(cfg) if cfg.ANSWER_CACHE_ENABLED else None
+        prompt_builder = PromptBuilder(embedder, cfg, client)
+        chat_service = ChatService(client, query_embedder, product_repo, logger, prompt_builder, answer_cache)
+        importer = BulkImporter(import_repo, extractor, summarizer, embedder, cfg)
+        review_digests = ReviewDigestService(ReviewDigestRepository(db_pool), embedder, cfg, client)
+        embedding_sweeper = EmbeddingSweeper(registry, embedder, cfg, embedding_column)
+
+    with startup.phase("ingestion"):
+        ingestion = IngestionService(job_repo, product_repo, extractor, summarizer, embedder, logger, cfg, answer_cache)
+        ingestion.start()
+        if cfg.REVIEW_DIGEST_ENABLED:
+            review_digests.start()
+        embedding_sweeper.start()
 
     deps = {
+        "db_pool": db_pool,
         "product_repo": product_repo,
         "review_repo": review_repo,
         "log_repo": log_repo,
+        "job_repo": job_repo,
+        "import_repo": import_repo,
+        "conversations": conversations,
+        "conversation_pruner": conversation_pruner,
         "logger": logger,
+        "log_maintenance": log_maintenance,
+        "fetcher": fetcher,
         "extractor": extractor,
         "summarizer": summarizer,
         "embedder": embedder,
+        "query_embedder": query_embedder,
+        "embedding_batcher": batcher,
+        "hybrid_search": cfg.SEARCH_HYBRID,
+        "max_per_page": cfg.VIEW_MAX_PER_PAGE,
+        "log_page_size": cfg.LOG_PAGE_SIZE,
         "chat_service": chat_service,
+        "answer_cache": answer_cache,
+        "page_cache": page_cache,
+        "ingestion": ingestion,
+        "review_digests": review_digests,
+        "embedding_sweeper": embedding_sweeper,
+        "llm_gateway": llm_gateway,
+        "importer": importer,
+        "import_dir": cfg.BULK_IMPORT_DIR,
+        "startup": startup,
+        "metrics_enabled": cfg.METRICS_ENABLED,
     }
 
+    app.extensions["deps"] = deps
+
     register_pages(pages_bp, deps)
     register_api(api_bp, deps)
 
     app.register_blueprint(pages_bp)
     app.register_blueprint(api_bp)
 
+    if cfg.METRICS_ENABLED:
+        instrument_app(app, logger, cfg.SLOW_REQUEST_MS)
+
+    startup.done()
     return app
 
 if __name__ == "__main__":
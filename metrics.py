@@ -0,0 +1,242 @@
+import contextvars
+import functools
+import inspect
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + list(extra or [])
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labels, key)} {value}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self):
+        with self._lock:
+            values = {key: (list(counts), total, count) for key, (counts, total, count) in self._values.items()}
+        for key, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                yield f"{self.name}_bucket{_format_labels(self.labels, key, [('le', bound)])} {cumulative}"
+            yield f"{self.name}_bucket{_format_labels(self.labels, key, [('le', '+Inf')])} {count}"
+            yield f"{self.name}_sum{_format_labels(self.labels, key)} {round(total, 6)}"
+            yield f"{self.name}_count{_format_labels(self.labels, key)} {count}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, help_text, labels=()):
+        metric = Counter(name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help_text, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self, gauges=()):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        for prefix, stats in gauges:
+            prefix = re.sub(r"[^a-zA-Z0-9_]", "_", prefix)
+            for key, value in stats.items():
+                if isinstance(value, bool):
+                    value = int(value)
+                if isinstance(value, (int, float)):
+                    lines.append(f"# TYPE app_{prefix}_{key} gauge")
+                    lines.append(f"app_{prefix}_{key} {value}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_SECONDS = REGISTRY.histogram(
+    "app_http_request_seconds", "Czas obsługi żądania HTTP", ("endpoint", "method", "status")
+)
+STAGE_SECONDS = REGISTRY.histogram("app_stage_seconds", "Czas etapów przetwarzania", ("stage",))
+DB_QUERIES = REGISTRY.counter("app_db_queries_total", "Liczba zapytań SQL")
+DB_QUERY_SECONDS = REGISTRY.histogram("app_db_query_seconds", "Czas pojedynczego zapytania SQL")
+DB_QUERIES_PER_REQUEST = REGISTRY.histogram(
+    "app_db_queries_per_request", "Liczba zapytań SQL na żądanie HTTP", ("endpoint",), COUNT_BUCKETS
+)
+LLM_REQUESTS = REGISTRY.counter("app_llm_requests_total", "Liczba wywołań modelu językowego", ("model",))
+LLM_TOKENS = REGISTRY.counter("app_llm_tokens_total", "Tokeny modelu językowego", ("model", "kind"))
+
+
+class RequestTrace:
+    __slots__ = ("started", "spans", "db_queries", "db_seconds", "llm_tokens")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.llm_tokens = 0
+
+    def summary(self):
+        return {
+            "ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "db_queries": self.db_queries,
+            "db_ms": round(self.db_seconds * 1000, 1),
+            "llm_tokens": self.llm_tokens,
+            "spans": [[name, round(seconds * 1000, 1)] for name, seconds in self.spans],
+        }
+
+
+_trace = contextvars.ContextVar("request_trace", default=None)
+
+
+def current_trace():
+    return _trace.get()
+
+
+def observe_stage(name, seconds):
+    STAGE_SECONDS.observe(seconds, stage=name)
+    trace = _trace.get()
+    if trace is not None:
+        trace.spans.append((name, seconds))
+
+
+@contextmanager
+def span(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - started)
+
+
+def timed(name):
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_query(seconds):
+    DB_QUERIES.inc()
+    DB_QUERY_SECONDS.observe(seconds)
+    trace = _trace.get()
+    if trace is not None:
+        trace.db_queries += 1
+        trace.db_seconds += seconds
+
+
+def record_llm_usage(model, prompt, completion):
+    prompt = prompt or 0
+    completion = completion or 0
+    LLM_REQUESTS.inc(model=model)
+    LLM_TOKENS.inc(prompt, model=model, kind="prompt")
+    LLM_TOKENS.inc(completion, model=model, kind="completion")
+    trace = _trace.get()
+    if trace is not None:
+        trace.llm_tokens += prompt + completion
+
+
+def instrument_app(app, logger, slow_request_ms=0):
+    from flask import g, request
+
+    @app.before_request
+    def start_trace():
+        g.metrics_trace = RequestTrace()
+        g.metrics_token = _trace.set(g.metrics_trace)
+
+    def finish(trace, endpoint, method, path, status):
+        elapsed = time.perf_counter() - trace.started
+        HTTP_SECONDS.observe(elapsed, endpoint=endpoint, method=method, status=status)
+        DB_QUERIES_PER_REQUEST.observe(trace.db_queries, endpoint=endpoint)
+        if slow_request_ms and elapsed * 1000 >= slow_request_ms:
+            logger.log("SLOW_REQUEST", json.dumps(
+                {"method": method, "path": path, "status": status, **trace.summary()},
+                ensure_ascii=False,
+            ))
+
+    @app.after_request
+    def finish_trace(response):
+        trace = g.pop("metrics_trace", None)
+        if trace is None:
+            return response
+        args = (trace, request.url_rule.rule if request.url_rule else "unmatched", request.method, request.path,
+                response.status_code)
+        if response.is_streamed:
+            response.call_on_close(lambda: finish(*args))
+        else:
+            finish(*args)
+        return response
+
+    @app.teardown_request
+    def reset_trace(exc=None):
+        token = g.pop("metrics_token", None)
+        if token is not None:
+            _trace.reset(token)
@@ -0,0 +1,196 @@
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+LISTING = "listing"
+
+
+def product_generation(product_id):
+    return f"product:{product_id}"
+
+
+def etag_for(html: str) -> str:
+    return hashlib.sha1(html.encode("utf-8")).hexdigest()
+
+
+class InMemoryCacheBackend:
+    def __init__(self, cfg):
+        self.max_size = cfg.PAGE_CACHE_SIZE
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._generations = {}
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at and time.time() > expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl if ttl else 0, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def generations(self, names):
+        with self._lock:
+            return [self._generations.get(name, 0) for name in names]
+
+    def bump(self, names):
+        with self._lock:
+            for name in names:
+                self._generations[name] = self._generations.get(name, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            return {"backend": "memory", "size": len(self._entries), "max_size": self.max_size,
+                    "evictions": self.evictions}
+
+
+class RedisCacheBackend:
+    def __init__(self, cfg):
+        if redis is None:
+            raise RuntimeError("PAGE_CACHE_BACKEND=redis wymaga pakietu redis")
+        self.client = redis.Redis.from_url(cfg.PAGE_CACHE_REDIS_URL)
+        self.prefix = cfg.PAGE_CACHE_PREFIX
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=int(ttl) or None)
+
+    def generations(self, names):
+        values = self.client.mget([f"{self.prefix}gen:{name}" for name in names])
+        return [int(v) if v is not None else 0 for v in values]
+
+    def bump(self, names):
+        pipe = self.client.pipeline(transaction=False)
+        for name in names:
+            pipe.incr(f"{self.prefix}gen:{name}")
+        pipe.execute()
+
+    def stats(self):
+        return {"backend": "redis", "size": self.client.dbsize()}
+
+
+class PageCache:
+    def __init__(self, backend, cfg):
+        self.backend = backend
+        self.ttl = cfg.PAGE_CACHE_TTL
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.invalidations = 0
+
+    def _count(self, attr):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    def _get_or_load(self, namespace, generations, parts, loader):
+        if self.backend is None:
+            return loader()
+
+        try:
+            versions = self.backend.generations(generations)
+            digest = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+            key = f"{namespace}:{':'.join(map(str, versions))}:{digest}"
+            value = self.backend.get(key)
+        except Exception as e:
+            print(f"Błąd cache stron: {e}")
+            self._count("errors")
+            return loader()
+
+        if value is not None:
+            self._count("hits")
+            return value
+
+        self._count("misses")
+        value = loader()
+        if value is not None:
+            try:
+                self.backend.set(key, value, self.ttl)
+            except Exception as e:
+                print(f"Błąd zapisu cache stron: {e}")
+                self._count("errors")
+        return value
+
+    def _render(self, namespace, generations, parts, render):
+        def load():
+            html = render()
+            return (html, etag_for(html)) if html is not None else None
+        return self._get_or_load(namespace, generations, parts, load)
+
+    def product(self, product_id, loader):
+        return self._get_or_load("product", [product_generation(product_id)], (product_id,), loader)
+
+    def reviews(self, product_id, loader):
+        return self._get_or_load("reviews", [product_generation(product_id)], (product_id,), loader)
+
+    def product_page(self, product_id, render):
+        return self._render("product_page", [product_generation(product_id)], (product_id,), render)
+
+    def listing_page(self, params, render):
+        return self._render("listing_page", [LISTING], params, render)
+
+    def _bump(self, names):
+        if self.backend is None:
+            return
+        try:
+            self.backend.bump(names)
+        except Exception as e:
+            print(f"Błąd unieważniania cache stron: {e}")
+            self._count("errors")
+            return
+        self._count("invalidations")
+
+    def invalidate_product(self, product_id):
+        self._bump([product_generation(product_id), LISTING])
+
+    def invalidate_listing(self):
+        self._bump([LISTING])
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            stats = {
+                "enabled": self.backend is not None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "invalidations": self.invalidations,
+                "errors": self.errors,
+            }
+        if self.backend is not None:
+            stats.update(self.backend.stats())
+        return stats
+
+
+def create_page_cache(cfg):
+    if not cfg.PAGE_CACHE_ENABLED:
+        return PageCache(None, cfg)
+    if cfg.PAGE_CACHE_BACKEND == "memory":
+        return PageCache(InMemoryCacheBackend(cfg), cfg)
+    if cfg.PAGE_CACHE_BACKEND == "redis":
+        return PageCache(RedisCacheBackend(cfg), cfg)
+    raise ValueError(f"Nieznany backend cache stron: {cfg.PAGE_CACHE_BACKEND}")
@@ -1,14 +1,38 @@
-from flask import Blueprint, render_template, request, redirect, jsonify
+from datetime import datetime
+
+from flask import Blueprint, render_template, request, redirect, jsonify, make_response
 
 pages_bp = Blueprint("pages", __name__)
 
 def register_pages(pages_bp, deps):
     product_repo = deps["product_repo"]
     review_repo = deps["review_repo"]
-    extractor = deps["extractor"]
-    summarizer = deps["summarizer"]
-    embedder = deps["embedder"]
-    logger = deps["logger"]
+    ingestion = deps["ingestion"]
+    query_embedder = deps["query_embedder"]
+    hybrid_search = deps["hybrid_search"]
+    max_per_page = deps["max_per_page"]
+    page_cache = deps["page_cache"]
+    log_repo = deps["log_repo"]
+    log_page_size = deps["log_page_size"]
+
+    def parse_time(value):
+        try:
+            return datetime.fromisoformat(value) if value else None
+        except ValueError:
+            return None
+
+    def parse_cursor(value):
+        at, _, log_id = (value or "").partition(",")
+        created_at = parse_time(at)
+        if created_at is None or not log_id.isdigit():
+            return None
+        return created_at, int(log_id)
+
+    def conditional(html, etag):
+        resp = make_response(html)
+        resp.set_etag(etag)
+        resp.headers["Cache-Control"] = "no-cache"
+        return resp.make_conditional(request)
 
     @pages_bp.get("/")
     def home():
@@ -20,37 +44,50 @@ def register_pages(pages_bp, deps):
             name = request.form.get("name")
             link = request.form.get("link")
 
-            text = extractor.extract_text_from_link(link)
-            description = summarizer.summarize_markdown(text)
-            embedding = embedder.encode(description).tolist()
-
-            product_repo.insert(name, description, link, embedding)
-            logger.log("ADD_PRODUCT", f"Added product '{name}'")
-            return redirect("/view.html?page=1")
+            job_id = ingestion.submit_add(name, link)
+            return redirect(f"/view.html?page=1&job={job_id}")
 
         return render_template("add.html")
 
     @pages_bp.get("/view.html")
     def view_products():
-        page = request.args.get("page", 1, type=int)
+        page = max(1, request.args.get("page", 1, type=int))
         q = request.args.get("q", "", type=str)
-        per_page = request.args.get("per_page", 5, type=int)
-
-        products, total_pages = product_repo.list_paginated_with_reviews(page, per_page, q)
-
-        return render_template(
-            "view.html",
-            products=products,
-            page=page,
-            total_pages=total_pages,
-            q=q,
-            per_page=per_page
-        )
+        per_page = min(max(1, request.args.get("per_page", 5, type=int)), max_per_page)
+        after = request.args.get("after", type=int)
+        before = request.args.get("before", type=int)
+        job_id = request.args.get("job", type=int)
+
+        def render():
+            if q:
+                query_embedding = query_embedder.encode(q).tolist() if hybrid_search else None
+                products, total_pages = product_repo.list_paginated_with_reviews(page, per_page, q, query_embedding)
+                cursor = None
+            else:
+                products, cursor = product_repo.list_keyset_with_reviews(per_page, after=after, before=before)
+                total_pages = None
+
+            return render_template(
+                "view.html",
+                products=products,
+                page=page,
+                total_pages=total_pages,
+                cursor=cursor,
+                after=after,
+                total_estimate=None if q else product_repo.count_estimate(),
+                q=q,
+                per_page=per_page,
+                job_id=job_id
+            )
+
+        html, etag = page_cache.listing_page((page, q, per_page, after, before, job_id), render)
+        return conditional(html, etag)
 
     @pages_bp.route("/edit/<int:id>", methods=["GET", "POST"])
     def edit_product(id):
         page = request.args.get("page", 1)
         q = request.args.get("q", "")
+        after = request.args.get("after", "")
 
         product = product_repo.get(id)
         if not product:
@@ -62,32 +99,34 @@ def register_pages(pages_bp, deps):
             new_name = request.form.get("name")
             new_link = request.form.get("link")
 
-            text = extractor.extract_text_from_link(new_link)
-            new_description = summarizer.summarize_markdown(text)
-            new_embedding = embedder.encode(new_description).tolist()
-
-            product_repo.update(id, new_name, new_link, new_description, new_embedding)
-            logger.log("EDIT_PRODUCT", f"{old_name} -> {new_name}")
-            return redirect(f"/view.html?page={page}&q={q}")
+            job_id = ingestion.submit_edit(id, new_name, new_link)
+            return redirect(f"/view.html?page={page}&q={q}&after={after}&job={job_id}")
 
         return render_template("edit.html", id=id, name=old_name, link=old_link, page=page, q=q)
 
     @pages_bp.get("/product/<int:product_id>")
     def product_page(product_id):
-        product = product_repo.get(product_id)
-        if not product:
+        def render():
+            product = product_repo.get(product_id)
+            if not product:
+                return None
+            _, name, description, link = product
+            reviews = review_repo.list_for_product(product_id)
+
+            return render_template(
+                "product.html",
+                product_id=product_id,
+                name=name,
+                description=description,
+                link=link,
+                reviews=reviews
+            )
+
+        cached = page_cache.product_page(product_id, render)
+        if cached is None:
             return "Produkt nie znaleziony", 404
-        _, name, description, link = product
-        reviews = review_repo.list_for_product(product_id)
-
-        return render_template(
-            "product.html",
-            product_id=product_id,
-            name=name,
-            description=description,
-            link=link,
-            reviews=reviews
-        )
+        html, etag = cached
+        return conditional(html, etag)
 
     @pages_bp.get("/ask.html")
     def ask_page():
@@ -95,5 +134,23 @@ def register_pages(pages_bp, deps):
 
     @pages_bp.get("/logs")
     def view_logs():
-        logs = deps["log_repo"].latest(limit=500)
-        return render_template("logs.html", logs=logs)
\ No newline at end of file
+        filters = {
+            "action": request.args.get("action", ""),
+            "from": request.args.get("from", ""),
+            "to": request.args.get("to", ""),
+        }
+        logs, next_cursor = log_repo.page(
+            action=filters["action"] or None,
+            since=parse_time(filters["from"]),
+            until=parse_time(filters["to"]),
+            before=parse_cursor(request.args.get("cursor")),
+            limit=log_page_size,
+        )
+        return render_template(
+            "logs.html",
+            logs=logs,
+            actions=log_repo.actions(),
+            filters=filters,
+            next_cursor=next_cursor,
+            first_page=not request.args.get("cursor"),
+        )
\ No newline at end of file
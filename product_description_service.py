@@ -1,8 +1,26 @@
+import re
+
+from metrics import record_llm_usage, span
+
+_CAPACITY = re.compile(r"^[\s*\-•]*pojemno\w*[^:\n]*:[\s*]*(.+)$", re.IGNORECASE | re.MULTILINE)
+CAPACITY_MAX_CHARS = 60
+
+
+def extract_capacity(description: str):
+    match = _CAPACITY.search(description or "")
+    if not match:
+        return None
+    value = match.group(1).strip().strip("*").strip().rstrip(".")
+    if not value or value.lower() in ("brak", "brak danych", "nie dotyczy", "-"):
+        return None
+    return value[:CAPACITY_MAX_CHARS]
+
+
 class ProductDescriptionService:
     def __init__(self, client):
         self.client = client
 
-    def summarize_markdown(self, source_text: str) -> str:
+    def summarize_markdown(self, source_text: str, raise_errors: bool = False) -> str:
         if not source_text:
             return "Brak dostępnej treści do streszczenia."
 
@@ -21,6 +39,7 @@ WYMAGANIA:
   - Nazwa produktu
   - Typ
   - Marka
+- Jeśli produkt ma pojemność, podaj ją w sekcji "Parametry techniczne" jako punkt: - Pojemność: <wartość z jednostką>
 - Stosuj listy punktowane tam, gdzie to możliwe
 - Nie dodawaj nic poza treścią opisu
 
@@ -28,12 +47,17 @@ TEKST ŹRÓDŁOWY:
 {source_text}
 """
         try:
-            resp = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.3,
-            )
+            with span("ingest.summarize"):
+                resp = self.client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0.3,
+                )
+            if resp.usage is not None:
+                record_llm_usage("gpt-4o-mini", resp.usage.prompt_tokens, resp.usage.completion_tokens)
             return resp.choices[0].message.content.strip()
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"Błąd generowania streszczenia: {e}")
             return "Błąd podczas generowania streszczenia."
\ No newline at end of file
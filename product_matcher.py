@@ -0,0 +1,67 @@
+import re
+import threading
+from collections import Counter, OrderedDict
+
+_TOKEN = re.compile(r"\w+")
+
+PREFIX_LEN = 5
+
+STOPWORDS = {
+    "and", "the", "for", "with", "plus", "pro", "max", "mini", "new", "set",
+    "dla", "lub", "oraz", "bez", "nad", "pod", "przy", "jak", "czy", "ten", "się",
+    "zestaw", "nowy", "nowa", "nowe", "model", "seria", "series", "edition", "wersja",
+}
+
+
+def tokenize(text: str):
+    return _TOKEN.findall(text.casefold())
+
+
+def token_key(token: str) -> str:
+    return token[:PREFIX_LEN] if token.isalpha() else token
+
+
+def name_keys(name: str) -> frozenset:
+    return frozenset(
+        token_key(t) for t in tokenize(name or "")
+        if t not in STOPWORDS and (len(t) >= 3 or not t.isalpha())
+    )
+
+
+class ProductMatcher:
+    def __init__(self, max_names=4096):
+        self.max_names = max_names
+        self._lock = threading.Lock()
+        self._names = OrderedDict()
+
+    def _keys(self, name):
+        with self._lock:
+            keys = self._names.get(name)
+            if keys is not None:
+                self._names.move_to_end(name)
+                return keys
+
+        keys = name_keys(name)
+        with self._lock:
+            self._names[name] = keys
+            while len(self._names) > self.max_names:
+                self._names.popitem(last=False)
+        return keys
+
+    def match(self, rows, answer: str):
+        if not rows or not answer:
+            return []
+
+        answer_keys = {token_key(t) for t in tokenize(answer)}
+        candidates = [(row[0], self._keys(row[1])) for row in rows]
+        shared = Counter(k for _, keys in candidates for k in keys)
+
+        matched = []
+        for pid, keys in candidates:
+            if not keys:
+                continue
+            found = keys & answer_keys
+            distinctive = {k for k in found if shared[k] == 1 and not k.isdigit()}
+            if distinctive or found == keys:
+                matched.append(pid)
+        return matched
@@ -1,100 +1,313 @@
 import math
-from database_connection import get_db_connection
+import threading
+import time
+
+from database_connection import embedding_column
+from embedding_versions import content_hash
+from metrics import timed
 
 class ProductRepository:
-    def __init__(self, cfg):
+    def __init__(self, pool, cfg, cache=None, column="embedding"):
+        self.pool = pool
         self.cfg = cfg
+        self.cache = cache
+        self.column = embedding_column(column)
+        self._count_lock = threading.Lock()
+        self._count_cache = (0.0, None)
 
-    def insert(self, name, description, link, embedding):
-        conn = get_db_connection(self.cfg)
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO products (name, description, link, embedding) VALUES (%s,%s,%s,%s)",
-            (name, description, link, embedding)
-        )
-        conn.commit()
-        cur.close()
-        conn.close()
-
-    def update(self, product_id, name, link, description, embedding):
-        conn = get_db_connection(self.cfg)
-        cur = conn.cursor()
-        cur.execute("""
-            UPDATE products
-            SET name=%s, link=%s, description=%s, embedding=%s
-            WHERE id=%s
-        """, (name, link, description, embedding, product_id))
-        conn.commit()
-        cur.close()
-        conn.close()
+    @timed("db.products.insert")
+    def insert(self, name, description, link, embedding, capacity=None, image_url=None, source_hash=None):
+        with self.pool.cursor() as cur:
+            cur.execute(f"""
+                INSERT INTO products (name, description, link, {self.column}, {self.column}_hash,
+                                      capacity, image_url, source_hash)
+                VALUES (%s,%s,%s,%s,%s,%s,%s,%s) RETURNING id
+            """, (name, description, link, embedding, content_hash(description), capacity, image_url, source_hash))
+            product_id = cur.fetchone()[0]
+        if self.cache is not None:
+            self.cache.invalidate_listing()
+        return product_id
+
+    @timed("db.products.update")
+    def update(self, product_id, name, link, description, embedding, capacity=None, image_url=None,
+               source_hash=None):
+        embedding_sql = f"{self.column}=%s, {self.column}_hash=%s," if embedding is not None else ""
+        embedding_params = (embedding, content_hash(description)) if embedding is not None else ()
+        with self.pool.cursor() as cur:
+            cur.execute(f"""
+                UPDATE products
+                SET name=%s, link=%s, description=%s, {embedding_sql} capacity=%s, image_url=%s, source_hash=%s,
+                    version=version + 1
+                WHERE id=%s
+            """, (name, link, description, *embedding_params, capacity, image_url, source_hash, product_id))
+        if self.cache is not None:
+            self.cache.invalidate_product(product_id)
 
+    @timed("db.products.delete")
     def delete(self, product_id):
-        conn = get_db_connection(self.cfg)
-        cur = conn.cursor()
-        cur.execute("DELETE FROM products WHERE id=%s", (product_id,))
-        conn.commit()
-        cur.close()
-        conn.close()
+        with self.pool.cursor() as cur:
+            cur.execute("DELETE FROM products WHERE id=%s", (product_id,))
+        if self.cache is not None:
+            self.cache.invalidate_product(product_id)
+
+    @timed("db.products.ingestion_state")
+    def ingestion_state(self, product_id):
+        with self.pool.cursor() as cur:
+            cur.execute(f"""
+                SELECT link, description, source_hash, capacity, image_url,
+                       {self.column} IS NOT NULL AND {self.column}_hash = content_hash
+                FROM products WHERE id=%s
+            """, (product_id,))
+            row = cur.fetchone()
+        if not row:
+            return None
+        link, description, source_hash, capacity, image_url, embedding_fresh = row
+        return {
+            "link": link,
+            "description": description,
+            "source_hash": source_hash,
+            "capacity": capacity,
+            "image_url": image_url,
+            "embedding_fresh": embedding_fresh,
+        }
+
+    def _get(self, product_id):
+        with self.pool.cursor() as cur:
+            cur.execute("SELECT id, name, description, link FROM products WHERE id=%s", (product_id,))
+            return cur.fetchone()
 
+    @timed("db.products.get")
     def get(self, product_id):
-        conn = get_db_connection(self.cfg)
-        cur = conn.cursor()
-        cur.execute("SELECT id, name, description, link FROM products WHERE id=%s", (product_id,))
-        row = cur.fetchone()
-        cur.close()
-        conn.close()
-        return row
-
-    def list_paginated_with_reviews(self, page: int, per_page: int, q: str):
-        offset = (page - 1) * per_page
-        where_clause = ""
-        params = []
+        if self.cache is None:
+            return self._get(product_id)
+        return self.cache.product(product_id, lambda: self._get(product_id))
+
+    def _rows_for_ids(self, cur, ids):
+        if not ids:
+            return []
+        cap = self.cfg.VIEW_REVIEWS_PER_PRODUCT
+        cur.execute("""
+            SELECT p.id, p.name, p.description, p.link,
+                   (
+                       SELECT json_agg(json_build_object('id', r.id, 'text', r.review_text) ORDER BY r.id DESC)
+                       FROM (
+                           SELECT id, review_text
+                           FROM reviews
+                           WHERE product_id = p.id
+                           ORDER BY id DESC
+                           LIMIT %s
+                       ) r
+                   ) AS reviews
+            FROM products p
+            WHERE p.id = ANY(%s)
+        """, (cap + 1, ids))
+        by_id = {}
+        for pid, name, description, link, reviews in cur.fetchall():
+            reviews = reviews or []
+            by_id[pid] = (pid, name, description, link, reviews[:cap], len(reviews) > cap)
+        return [by_id[i] for i in ids if i in by_id]
 
-        if q:
-            where_clause = "WHERE p.name ILIKE %s OR p.description ILIKE %s"
-            params.extend([f"%{q}%", f"%{q}%"])
+    @timed("db.products.count_estimate")
+    def count_estimate(self):
+        with self._count_lock:
+            cached_at, count = self._count_cache
+            if count is not None and time.monotonic() - cached_at < self.cfg.VIEW_COUNT_CACHE_TTL:
+                return count
 
-        conn = get_db_connection(self.cfg)
-        cur = conn.cursor()
+        with self.pool.cursor() as cur:
+            cur.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = 'products'::regclass")
+            row = cur.fetchone()
+            count = row[0] if row else -1
+            if count < 0 or count < self.cfg.VIEW_EXACT_COUNT_BELOW:
+                cur.execute("SELECT COUNT(*) FROM products")
+                count = cur.fetchone()[0]
 
-        cur.execute(f"SELECT COUNT(*) FROM products p {where_clause}", params)
-        total_products = cur.fetchone()[0]
-        total_pages = max(1, math.ceil(total_products / per_page))
+        with self._count_lock:
+            self._count_cache = (time.monotonic(), count)
+        return count
+
+    def _search_ids(self, cur, q, query_embedding, limit, offset):
+        sources = ["SELECT id, rank FROM fts", "SELECT id, rank FROM trgm"]
+        vector_cte = ""
+        if query_embedding is not None:
+            self._set_search_params(cur)
+            vector_cte = f""",
+                vec AS (
+                    SELECT id, row_number() OVER (ORDER BY distance, id) AS rank
+                    FROM (
+                        SELECT id, {self.column} <#> %(embedding)s::vector AS distance
+                        FROM products
+                        WHERE {self.column} IS NOT NULL
+                        ORDER BY {self.column} <#> %(embedding)s::vector
+                        LIMIT %(vector_candidates)s
+                    ) nearest
+                    WHERE %(max_distance)s::float8 IS NULL OR distance <= %(max_distance)s::float8
+                )"""
+            sources.append("SELECT id, rank FROM vec")
 
+        candidates = " UNION ALL ".join(sources)
+        cur.execute("SELECT set_config('pg_trgm.similarity_threshold', %s, true)",
+                    (str(self.cfg.SEARCH_TRGM_THRESHOLD),))
         cur.execute(f"""
-            SELECT p.id, p.name, p.description, p.link,
-                   json_agg(
-                       json_build_object(
-                           'id', r.id,
-                           'text', r.review_text
-                       )
-                   ) FILTER (WHERE r.id IS NOT NULL) AS reviews
-            FROM products p
-            LEFT JOIN reviews r ON r.product_id = p.id
-            {where_clause}
-            GROUP BY p.id
-            ORDER BY p.id
-            LIMIT %s OFFSET %s
-        """, params + [per_page, offset])
-
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
+            WITH fts AS (
+                SELECT p.id, row_number() OVER (
+                    ORDER BY ts_rank_cd(p.search_vector, query) DESC, p.id
+                ) AS rank
+                FROM products p, websearch_to_tsquery(%(ts_config)s::regconfig, %(q)s) query
+                WHERE p.search_vector @@ query
+                ORDER BY rank
+                LIMIT %(candidates)s
+            ),
+            trgm AS (
+                SELECT p.id, row_number() OVER (
+                    ORDER BY similarity(p.name, %(q)s) DESC, p.id
+                ) AS rank
+                FROM products p
+                WHERE p.name %% %(q)s
+                ORDER BY rank
+                LIMIT %(candidates)s
+            ){vector_cte},
+            fused AS (
+                SELECT id, SUM(1.0 / (%(rrf_k)s + rank)) AS score
+                FROM ({candidates}) candidates
+                GROUP BY id
+            )
+            SELECT id, COUNT(*) OVER () AS total
+            FROM fused
+            ORDER BY score DESC, id
+            LIMIT %(limit)s OFFSET %(offset)s
+        """, {
+            "q": q,
+            "ts_config": self.cfg.SEARCH_TS_CONFIG,
+            "candidates": self.cfg.SEARCH_TEXT_CANDIDATES,
+            "vector_candidates": self.cfg.SEARCH_HYBRID_VECTOR_CANDIDATES,
+            "max_distance": self.cfg.SEARCH_MAX_DISTANCE,
+            "embedding": query_embedding,
+            "rrf_k": self.cfg.SEARCH_RRF_K,
+            "limit": limit,
+            "offset": offset,
+        })
+        found = cur.fetchall()
+        return [row[0] for row in found], (found[0][1] if found else 0)
+
+    @timed("db.products.list_paginated_with_reviews")
+    def list_paginated_with_reviews(self, page: int, per_page: int, q: str, query_embedding=None):
+        offset = (page - 1) * per_page
+
+        with self.pool.cursor() as cur:
+            ids, total_products = self._search_ids(cur, q, query_embedding, per_page, offset)
+            rows = self._rows_for_ids(cur, ids)
+
+        total_pages = max(1, math.ceil(total_products / per_page))
         return rows, total_pages
 
-    def semantic_search_top5(self, query_embedding):
-        conn = get_db_connection(self.cfg)
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT p.id, p.name, p.description, p.link,
-                   COALESCE(string_agg(r.review_text, '\n'), '') as reviews
-            FROM products p
-            LEFT JOIN reviews r ON r.product_id = p.id
-            GROUP BY p.id, p.name, p.description, p.link
-            ORDER BY p.embedding <#> %s::vector
-            LIMIT 5
-        """, (query_embedding,))
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
-        return rows
\ No newline at end of file
+    @timed("db.products.list_keyset_with_reviews")
+    def list_keyset_with_reviews(self, per_page: int, after=None, before=None):
+        with self.pool.cursor() as cur:
+            if before is not None:
+                cur.execute(
+                    "SELECT id FROM products WHERE id < %s ORDER BY id DESC LIMIT %s",
+                    (before, per_page + 1)
+                )
+                ids = [row[0] for row in cur.fetchall()]
+                has_prev, has_next = len(ids) > per_page, True
+                ids = list(reversed(ids[:per_page]))
+            else:
+                cur.execute(
+                    "SELECT id FROM products WHERE id > %s ORDER BY id LIMIT %s",
+                    (after or 0, per_page + 1)
+                )
+                ids = [row[0] for row in cur.fetchall()]
+                has_prev, has_next = bool(after), len(ids) > per_page
+                ids = ids[:per_page]
+            rows = self._rows_for_ids(cur, ids)
+
+        return rows, {
+            "has_prev": has_prev and bool(ids),
+            "has_next": has_next and bool(ids),
+            "first_id": ids[0] if ids else None,
+            "last_id": ids[-1] if ids else None,
+        }
+
+    def _set_search_params(self, cur):
+        cur.execute(*search_params_query(self.cfg))
+
+    @timed("db.products.semantic_search")
+    def semantic_search(self, query_embedding, k=None, max_distance=None, review_limit=None):
+        with self.pool.cursor() as cur:
+            self._set_search_params(cur)
+            cur.execute(
+                semantic_search_sql(self.column),
+                semantic_search_params(self.cfg, query_embedding, k, max_distance, review_limit)
+            )
+            return cur.fetchall()
+
+
+class AsyncProductRepository:
+    def __init__(self, pool, cfg, column="embedding"):
+        self.pool = pool
+        self.cfg = cfg
+        self.column = embedding_column(column)
+
+    @timed("db.products.semantic_search")
+    async def semantic_search(self, query_embedding, k=None, max_distance=None, review_limit=None):
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(*search_params_query(self.cfg))
+                await cur.execute(
+                    semantic_search_sql(self.column),
+                    semantic_search_params(self.cfg, query_embedding, k, max_distance, review_limit)
+                )
+                return await cur.fetchall()
+
+
+def semantic_search_sql(column):
+    column = embedding_column(column)
+    return f"""
+    WITH top AS (
+        SELECT id, name, description, link, version, capacity, image_url,
+               {column} <#> %(q)s::vector AS distance
+        FROM products
+        WHERE {column} IS NOT NULL
+        ORDER BY {column} <#> %(q)s::vector
+        LIMIT %(k)s
+    )
+    SELECT t.id, t.name, t.description, t.link,
+           CASE WHEN d.refreshed_at IS NULL OR d.dirty_since IS NOT NULL THEN ARRAY(
+               SELECT r.review_text
+               FROM reviews r
+               WHERE r.product_id = t.id
+               ORDER BY r.id DESC
+               LIMIT %(review_limit)s
+           ) ELSE d.snippets[1:%(review_limit)s] END AS reviews,
+           t.version, t.capacity, t.image_url,
+           d.review_count,
+           CASE WHEN d.dirty_since IS NULL THEN d.summary END AS summary,
+           CASE WHEN d.refreshed_at IS NOT NULL
+                     AND d.dirty_since IS NULL
+                     AND d.embedding_model = %(model)s
+                     AND d.embedding_dim = vector_dims(%(q)s::vector)
+                THEN d.snippet_embeddings END AS review_embeddings
+    FROM top t
+    LEFT JOIN review_digests d ON d.product_id = t.id
+    WHERE %(max_distance)s::float8 IS NULL OR t.distance <= %(max_distance)s::float8
+    ORDER BY t.distance
+"""
+
+
+def search_params_query(cfg):
+    if cfg.VECTOR_INDEX_TYPE == "ivfflat":
+        return "SELECT set_config('ivfflat.probes', %s, true)", (str(cfg.VECTOR_IVFFLAT_PROBES),)
+    return "SELECT set_config('hnsw.ef_search', %s, true)", (str(cfg.VECTOR_HNSW_EF_SEARCH),)
+
+
+def semantic_search_params(cfg, query_embedding, k=None, max_distance=None, review_limit=None):
+    if max_distance is None:
+        max_distance = cfg.SEARCH_MAX_DISTANCE
+    return {
+        "q": query_embedding,
+        "model": cfg.EMBEDDING_MODEL,
+        "k": k or cfg.SEARCH_TOP_K,
+        "max_distance": max_distance,
+        "review_limit": review_limit or cfg.PROMPT_REVIEW_CANDIDATES,
+    }
@@ -0,0 +1,217 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from review_digest_service import decode_snippet_embeddings
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+SYSTEM_PROMPT = "Jesteś inteligentnym asystentem produktowym. Odpowiadasz po polsku."
+
+QUESTION_TEMPLATE = """
+Użytkownik pyta: {question}
+
+Oto produkty z bazy, które mogą pasować (używaj tylko tych!):
+{context}
+
+Zasady odpowiedzi:
+- opisuj wyłącznie produkty z listy powyżej
+- uwzględniaj opinie użytkowników w rekomendacjach
+- nie wymyślaj nowych produktów
+- jeśli żaden produkt nie pasuje, napisz to
+- odpowiedź krótka i konkretna
+"""
+
+HISTORY_SUMMARY_PROMPT = """
+Streść poniższy fragment rozmowy użytkownika z asystentem produktowym w maksymalnie 3 zdaniach.
+Zachowaj nazwy produktów, budżet i wymagania użytkownika.
+
+{dialog}
+"""
+
+MIN_DESCRIPTION_CHARS = 150
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+class TokenCounter:
+    def __init__(self, encoding_name):
+        self.encoding = None
+        if tiktoken is not None:
+            try:
+                self.encoding = tiktoken.get_encoding(encoding_name)
+            except Exception as e:
+                print(f"Brak kodowania {encoding_name}, liczę tokeny szacunkowo: {e}")
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.encoding is not None:
+            return len(self.encoding.encode(text))
+        return len(text) // 3 + 1
+
+    def count_messages(self, messages) -> int:
+        return sum(self.count(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+
+class PromptBuilder:
+    def __init__(self, embedder, cfg, client=None):
+        self.embedder = embedder
+        self.client = client
+        self.counter = TokenCounter(cfg.PROMPT_TOKEN_ENCODING)
+
+        self.token_budget = cfg.PROMPT_TOKEN_BUDGET
+        self.history_budget = cfg.PROMPT_HISTORY_BUDGET
+        self.description_chars = cfg.PROMPT_DESCRIPTION_CHARS
+        self.reviews_per_product = cfg.PROMPT_REVIEWS_PER_PRODUCT
+        self.summarize_history = cfg.PROMPT_SUMMARIZE_HISTORY and client is not None
+
+        self._summaries = OrderedDict()
+        self._summaries_lock = threading.Lock()
+
+    def _rank_reviews(self, query_embedding, rows):
+        ranked = {}
+        precomputed = {}
+        texts = []
+        dim = len(query_embedding)
+        for row in rows:
+            reviews = row[4] or []
+            vectors = decode_snippet_embeddings(row[10], dim, len(reviews)) if len(row) > 10 else None
+            if vectors is not None:
+                precomputed[row[0]] = vectors
+            else:
+                texts.extend(reviews)
+        if not texts and not precomputed:
+            return ranked
+
+        encoded = None
+        if texts:
+            encoded = np.asarray(self.embedder.encode(texts), dtype=np.float32)
+            encoded /= np.linalg.norm(encoded, axis=1, keepdims=True) + 1e-8
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) + 1e-8
+
+        offset = 0
+        for row in rows:
+            reviews = row[4] or []
+            if not reviews:
+                continue
+            if row[0] in precomputed:
+                scores = precomputed[row[0]] @ query
+            else:
+                scores = encoded[offset:offset + len(reviews)] @ query
+                offset += len(reviews)
+            ranked[row[0]] = [reviews[i] for i in np.argsort(-scores)]
+        return ranked
+
+    def _context(self, rows, ranked, reviews_per_product, description_chars):
+        parts = []
+        used = 0
+        for pid, name, desc, link, reviews, *rest in rows:
+            review_count, summary = (rest[3], rest[4]) if len(rest) > 4 else (None, None)
+            selected = ranked.get(pid, [])[:reviews_per_product]
+            used += len(selected)
+            opinions = "\n".join(f"- {r}" for r in selected)
+            if summary:
+                opinions = f"Podsumowanie {review_count} opinii: {summary}" + (f"\n{opinions}" if opinions else "")
+            parts.append(
+                f"{name}: {(desc or '')[:description_chars]}\nOpinie użytkowników:\n{opinions or 'Brak opinii'}"
+            )
+        return "\n\n".join(parts), used
+
+    def _summarize(self, turns):
+        dialog = "\n".join(f"{t['role']}: {t['content']}" for t in turns)
+        key = hashlib.sha1(dialog.encode("utf-8")).hexdigest()
+        with self._summaries_lock:
+            if key in self._summaries:
+                self._summaries.move_to_end(key)
+                return self._summaries[key]
+
+        try:
+            resp = self.client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": HISTORY_SUMMARY_PROMPT.format(dialog=dialog)}],
+                temperature=0.2,
+            )
+            summary = resp.choices[0].message.content.strip()
+        except Exception as e:
+            print(f"Błąd streszczania historii: {e}")
+            return None
+
+        with self._summaries_lock:
+            self._summaries[key] = summary
+            while len(self._summaries) > 256:
+                self._summaries.popitem(last=False)
+        return summary
+
+    def _fit_history(self, history, budget):
+        kept = []
+        used = 0
+        for turn in reversed(history):
+            cost = self.counter.count(turn["content"]) + MESSAGE_OVERHEAD_TOKENS
+            if used + cost > budget:
+                break
+            kept.append(turn)
+            used += cost
+        kept.reverse()
+        dropped = history[:len(history) - len(kept)]
+
+        if dropped and self.summarize_history:
+            summary = self._summarize(dropped)
+            if summary:
+                note = {"role": "system", "content": f"Streszczenie wcześniejszej rozmowy: {summary}"}
+                cost = self.counter.count(note["content"]) + MESSAGE_OVERHEAD_TOKENS
+                while kept and used + cost > budget:
+                    used -= self.counter.count(kept[0]["content"]) + MESSAGE_OVERHEAD_TOKENS
+                    dropped = history[:len(dropped) + 1]
+                    kept = kept[1:]
+                if used + cost <= budget:
+                    kept = [note] + kept
+        return kept, len(dropped)
+
+    def build(self, question: str, history: list, rows, query_embedding):
+        ranked = self._rank_reviews(query_embedding, rows)
+
+        reviews_per_product = self.reviews_per_product
+        description_chars = self.description_chars
+        while True:
+            context, reviews_used = self._context(rows, ranked, reviews_per_product, description_chars)
+            prompt = QUESTION_TEMPLATE.format(question=question, context=context)
+            base_tokens = self.counter.count_messages([
+                {"content": SYSTEM_PROMPT}, {"content": prompt},
+            ])
+            if base_tokens <= self.token_budget:
+                break
+            if reviews_per_product > 0:
+                reviews_per_product -= 1
+            elif description_chars > MIN_DESCRIPTION_CHARS:
+                description_chars = max(MIN_DESCRIPTION_CHARS, description_chars // 2)
+            else:
+                break
+
+        history_budget = max(0, min(self.history_budget, self.token_budget - base_tokens))
+        kept, dropped = self._fit_history(history, history_budget)
+
+        messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+        messages.extend(kept)
+        messages.append({"role": "user", "content": prompt})
+
+        usage = {
+            "estimated_prompt_tokens": self.counter.count_messages(messages),
+            "token_budget": self.token_budget,
+            "history_turns_kept": len(kept),
+            "history_turns_dropped": dropped,
+            "reviews_used": reviews_used,
+        }
+        return messages, usage
+
+
+def usage_from_response(usage, resp_usage):
+    if resp_usage is not None:
+        usage["prompt_tokens"] = resp_usage.prompt_tokens
+        usage["completion_tokens"] = resp_usage.completion_tokens
+    return usage
@@ -0,0 +1,108 @@
+from psycopg2.extras import execute_values
+
+
+class ReviewDigestRepository:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def claim(self, debounce_seconds, lease_seconds, limit):
+        with self.pool.cursor() as cur:
+            cur.execute("""
+                UPDATE review_digests d
+                SET claimed_until = NOW() + make_interval(secs => %s)
+                FROM (
+                    SELECT product_id
+                    FROM review_digests
+                    WHERE dirty_since <= NOW() - make_interval(secs => %s)
+                      AND (claimed_until IS NULL OR claimed_until < NOW())
+                    ORDER BY dirty_since
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                ) c
+                WHERE d.product_id = c.product_id
+                RETURNING d.product_id, d.revision
+            """, (lease_seconds, debounce_seconds, limit))
+            return cur.fetchall()
+
+    def reviews_for(self, product_id, limit):
+        with self.pool.cursor() as cur:
+            cur.execute("""
+                SELECT id, review_text, embedding::real[], embedding_model
+                FROM reviews
+                WHERE product_id=%s
+                ORDER BY id DESC
+                LIMIT %s
+            """, (product_id, limit))
+            reviews = cur.fetchall()
+            cur.execute("SELECT COUNT(*) FROM reviews WHERE product_id=%s", (product_id,))
+            return reviews, cur.fetchone()[0]
+
+    def save_review_embeddings(self, items, model):
+        with self.pool.cursor() as cur:
+            execute_values(
+                cur,
+                """
+                    UPDATE reviews r SET embedding = v.embedding, embedding_model = v.model
+                    FROM (VALUES %s) AS v(id, embedding, model) WHERE r.id = v.id
+                """,
+                [(review_id, embedding, model) for review_id, embedding in items],
+                template="(%s, %s::vector, %s)",
+                page_size=len(items),
+            )
+
+    def save(self, product_id, revision, review_count, summary, snippets, snippet_embeddings,
+             embedding_model=None, embedding_dim=None):
+        with self.pool.cursor() as cur:
+            cur.execute("""
+                UPDATE review_digests
+                SET review_count=%s,
+                    summary=%s,
+                    snippets=%s,
+                    snippet_embeddings=%s,
+                    embedding_model=%s,
+                    embedding_dim=%s,
+                    claimed_until=NULL,
+                    refreshed_at=NOW(),
+                    dirty_since = CASE WHEN revision = %s THEN NULL ELSE dirty_since END
+                WHERE product_id=%s
+            """, (review_count, summary, snippets, snippet_embeddings, embedding_model, embedding_dim, revision,
+                  product_id))
+
+    def release(self, product_id, retry_after=0):
+        with self.pool.cursor() as cur:
+            cur.execute("""
+                UPDATE review_digests
+                SET claimed_until = CASE WHEN %s > 0 THEN NOW() + make_interval(secs => %s) END
+                WHERE product_id=%s
+            """, (retry_after, retry_after, product_id))
+
+    def mark_all_dirty(self, reembed=False):
+        with self.pool.cursor() as cur:
+            if reembed:
+                cur.execute("UPDATE reviews SET embedding=NULL, embedding_model=NULL WHERE embedding IS NOT NULL")
+            cur.execute("""
+                INSERT INTO review_digests (product_id, review_count, dirty_since)
+                SELECT product_id, COUNT(*), NOW() - INTERVAL '1 day' FROM reviews GROUP BY product_id
+                ON CONFLICT (product_id) DO UPDATE
+                SET review_count = EXCLUDED.review_count,
+                    revision = review_digests.revision + 1,
+                    dirty_since = EXCLUDED.dirty_since
+            """)
+            return cur.rowcount
+
+    def stats(self):
+        with self.pool.cursor() as cur:
+            cur.execute("""
+                SELECT COUNT(*),
+                       COUNT(*) FILTER (WHERE dirty_since IS NOT NULL),
+                       COUNT(*) FILTER (WHERE refreshed_at IS NULL),
+                       COALESCE(EXTRACT(EPOCH FROM NOW() - MIN(dirty_since)), 0)
+                FROM review_digests
+            """)
+            total, dirty, never_refreshed, oldest_dirty = cur.fetchone()
+        return {
+            "digests": total,
+            "dirty": dirty,
+            "never_refreshed": never_refreshed,
+            "oldest_dirty_seconds": round(float(oldest_dirty), 1),
+        }
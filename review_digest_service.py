@@ -0,0 +1,220 @@
+import threading
+
+import numpy as np
+
+from metrics import record_llm_usage, span
+
+DIGEST_MODES = ("extractive", "llm")
+DUPLICATE_SIMILARITY = 0.92
+LLM_INPUT_REVIEWS = 30
+LLM_REVIEW_CHARS = 400
+
+DIGEST_PROMPT = """
+Streść poniższe opinie klientów o jednym produkcie w maksymalnie 3 zdaniach.
+Podaj najczęściej wymieniane zalety i wady. Nie dodawaj informacji spoza opinii.
+
+OPINIE:
+{reviews}
+"""
+
+
+def _normalize(matrix):
+    return matrix / (np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-8)
+
+
+def decode_snippet_embeddings(blob, dim, count):
+    if blob is None or not count:
+        return None
+    vectors = np.frombuffer(blob, dtype=np.float32)
+    if vectors.size % dim or vectors.size // dim < count:
+        return None
+    return vectors.reshape(-1, dim)[:count]
+
+
+class ReviewDigestService:
+    def __init__(self, repo, embedder, cfg, client=None):
+        if cfg.REVIEW_DIGEST_MODE not in DIGEST_MODES:
+            raise ValueError(f"Nieznany tryb podsumowań opinii: {cfg.REVIEW_DIGEST_MODE}")
+        self.repo = repo
+        self.embedder = embedder
+        self.client = client
+        self.mode = cfg.REVIEW_DIGEST_MODE
+        self.model_name = cfg.EMBEDDING_MODEL
+        self._dim = None
+        self.debounce = cfg.REVIEW_DIGEST_DEBOUNCE
+        self.interval = cfg.REVIEW_DIGEST_INTERVAL
+        self.lease = cfg.REVIEW_DIGEST_LEASE
+        self.batch_size = cfg.REVIEW_DIGEST_BATCH_SIZE
+        self.max_reviews = cfg.REVIEW_DIGEST_MAX_REVIEWS
+        self.snippet_count = cfg.PROMPT_REVIEW_CANDIDATES
+        self.summary_reviews = cfg.REVIEW_DIGEST_SUMMARY_REVIEWS
+        self.summary_chars = cfg.REVIEW_DIGEST_SUMMARY_CHARS
+        self.llm_min_reviews = cfg.REVIEW_DIGEST_LLM_MIN_REVIEWS
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats_lock = threading.Lock()
+        self.refreshed = 0
+        self.failed = 0
+        self.embedded = 0
+        self.llm_summaries = 0
+
+    @property
+    def dim(self):
+        if self._dim is None:
+            self._dim = self.embedder.get_sentence_embedding_dimension()
+        return self._dim
+
+    def _embeddings(self, reviews):
+        vectors = [
+            np.asarray(embedding, dtype=np.float32)
+            if embedding is not None and model == self.model_name and len(embedding) == self.dim else None
+            for _, _, embedding, model in reviews
+        ]
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            encoded = np.asarray(self.embedder.encode([reviews[i][1] for i in missing]), dtype=np.float32)
+            for i, vector in zip(missing, encoded):
+                vectors[i] = vector
+            self.repo.save_review_embeddings([(reviews[i][0], vectors[i].tolist()) for i in missing], self.model_name)
+            with self._stats_lock:
+                self.embedded += len(missing)
+        return _normalize(np.stack(vectors))
+
+    def _extractive_summary(self, texts, matrix):
+        centroid = matrix.mean(axis=0)
+        order = np.argsort(-(matrix @ centroid))
+        chosen = []
+        for i in order:
+            if len(chosen) >= self.summary_reviews:
+                break
+            if chosen and max(float(matrix[i] @ matrix[j]) for j in chosen) > DUPLICATE_SIMILARITY:
+                continue
+            chosen.append(i)
+        per_review = max(40, self.summary_chars // max(1, len(chosen)))
+        parts = []
+        for i in chosen:
+            text = " ".join(texts[i].split())
+            parts.append(text if len(text) <= per_review else text[:per_review].rstrip() + "…")
+        return " | ".join(parts)
+
+    def _llm_summary(self, texts, matrix):
+        centroid = matrix.mean(axis=0)
+        order = np.argsort(-(matrix @ centroid))[:LLM_INPUT_REVIEWS]
+        reviews = "\n".join(f"- {' '.join(texts[i].split())[:LLM_REVIEW_CHARS]}" for i in sorted(order))
+        with span("reviews.digest_llm"):
+            resp = self.client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": DIGEST_PROMPT.format(reviews=reviews)}],
+                temperature=0.2,
+            )
+        if resp.usage is not None:
+            record_llm_usage("gpt-4o-mini", resp.usage.prompt_tokens, resp.usage.completion_tokens)
+        with self._stats_lock:
+            self.llm_summaries += 1
+        return resp.choices[0].message.content.strip()[:self.summary_chars * 2]
+
+    def _summary(self, texts, matrix, review_count):
+        if self.mode == "llm" and self.client is not None and review_count >= self.llm_min_reviews:
+            try:
+                return self._llm_summary(texts, matrix)
+            except Exception as e:
+                print(f"Błąd podsumowania opinii przez LLM: {e}")
+        return self._extractive_summary(texts, matrix)
+
+    def refresh(self, product_id, revision):
+        with span("reviews.digest"):
+            reviews, review_count = self.repo.reviews_for(product_id, self.max_reviews)
+            if not reviews:
+                self.repo.save(product_id, revision, 0, None, [], None)
+                return
+
+            texts = [text for _, text, _, _ in reviews]
+            matrix = self._embeddings(reviews)
+            summary = self._summary(texts, matrix, review_count)
+            snippets = texts[:self.snippet_count]
+            blob = matrix[:len(snippets)].astype(np.float32).tobytes()
+            self.repo.save(product_id, revision, review_count, summary, snippets, blob,
+                           self.model_name, matrix.shape[1])
+
+    def run_once(self):
+        claimed = self.repo.claim(self.debounce, self.lease, self.batch_size)
+        for product_id, revision in claimed:
+            try:
+                self.refresh(product_id, revision)
+            except Exception as e:
+                print(f"Błąd odświeżania podsumowania opinii produktu {product_id}: {e}")
+                with self._stats_lock:
+                    self.failed += 1
+                try:
+                    self.repo.release(product_id, retry_after=self.lease)
+                except Exception:
+                    pass
+                continue
+            with self._stats_lock:
+                self.refreshed += 1
+        return len(claimed)
+
+    def _run(self):
+        while not self._stop.is_set():
+            failed = self.failed
+            try:
+                claimed = self.run_once()
+            except Exception as e:
+                print(f"Błąd pętli podsumowań opinii: {e}")
+                claimed = 0
+            if claimed < self.batch_size or self.failed > failed:
+                self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="review-digests", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "mode": self.mode,
+                "refreshed": self.refreshed,
+                "failed": self.failed,
+                "embedded_reviews": self.embedded,
+                "llm_summaries": self.llm_summaries,
+            }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    from config import Config
+    from connection_pool import ConnectionPool
+    from embedding import create_embedding_model
+    from llm import create_openai_client
+    from review_digest_repo import ReviewDigestRepository
+
+    parser = argparse.ArgumentParser(description="Podsumowania opinii produktów")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status")
+    rebuild = sub.add_parser("rebuild", help="oznacz wszystkie podsumowania do odświeżenia i przelicz je")
+    rebuild.add_argument("--reembed", action="store_true", help="przelicz również embeddingi opinii")
+    args = parser.parse_args()
+
+    repo = ReviewDigestRepository(ConnectionPool(Config))
+    if args.command == "status":
+        for key, value in repo.stats().items():
+            print(f"{key}: {value}")
+    elif args.command == "rebuild":
+        print(f"Oznaczono produktów: {repo.mark_all_dirty(reembed=args.reembed)}")
+        client = create_openai_client(Config) if Config.REVIEW_DIGEST_MODE == "llm" else None
+        service = ReviewDigestService(repo, create_embedding_model(Config), Config, client)
+        service.debounce = 0
+        while True:
+            before = service.refreshed
+            if not service.run_once() or service.refreshed == before:
+                break
+            print(f"Odświeżono {service.refreshed} podsumowań, błędów: {service.failed}")
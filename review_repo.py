@@ -1,57 +1,100 @@
-from database_connection import get_db_connection
+from metrics import timed
+
 
 class ReviewRepository:
-    def __init__(self, cfg):
-        self.cfg = cfg
+    def __init__(self, pool, cache=None):
+        self.pool = pool
+        self.cache = cache
+
+    def _bump_product_version(self, cur, product_id):
+        cur.execute("UPDATE products SET version = version + 1 WHERE id=%s", (product_id,))
+
+    def _mark_digest(self, cur, product_id, delta=0):
+        cur.execute("""
+            INSERT INTO review_digests (product_id, review_count, dirty_since)
+            VALUES (%s, GREATEST(%s, 0), NOW())
+            ON CONFLICT (product_id) DO UPDATE
+            SET review_count = GREATEST(review_digests.review_count + %s, 0),
+                revision = review_digests.revision + 1,
+                dirty_since = COALESCE(review_digests.dirty_since, NOW())
+        """, (product_id, delta, delta))
+
+    def _invalidate(self, product_id):
+        if self.cache is not None:
+            self.cache.invalidate_product(product_id)
 
+    @timed("db.reviews.add")
     def add(self, product_id, review_text):
-        conn = get_db_connection(self.cfg)
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO reviews (product_id, review_text) VALUES (%s, %s) RETURNING id",
-            (product_id, review_text)
-        )
-        review_id = cur.fetchone()[0]
-        conn.commit()
-        cur.close()
-        conn.close()
+        with self.pool.cursor() as cur:
+            cur.execute(
+                "INSERT INTO reviews (product_id, review_text) VALUES (%s, %s) RETURNING id",
+                (product_id, review_text)
+            )
+            review_id = cur.fetchone()[0]
+            self._bump_product_version(cur, product_id)
+            self._mark_digest(cur, product_id, 1)
+        self._invalidate(product_id)
         return review_id
 
+    @timed("db.reviews.delete")
     def delete(self, review_id):
-        conn = get_db_connection(self.cfg)
-        cur = conn.cursor()
-        cur.execute("DELETE FROM reviews WHERE id=%s", (review_id,))
-        conn.commit()
-        cur.close()
-        conn.close()
+        with self.pool.cursor() as cur:
+            cur.execute("DELETE FROM reviews WHERE id=%s RETURNING product_id", (review_id,))
+            row = cur.fetchone()
+            if row:
+                self._bump_product_version(cur, row[0])
+                self._mark_digest(cur, row[0], -1)
+        if row:
+            self._invalidate(row[0])
+        return row[0] if row else None
 
+    @timed("db.reviews.update")
     def update(self, review_id, review_text):
-        conn = get_db_connection(self.cfg)
-        cur = conn.cursor()
-        cur.execute("UPDATE reviews SET review_text=%s WHERE id=%s", (review_text, review_id))
-        conn.commit()
-        cur.close()
-        conn.close()
+        with self.pool.cursor() as cur:
+            cur.execute(
+                "UPDATE reviews SET review_text=%s, embedding=NULL WHERE id=%s RETURNING product_id",
+                (review_text, review_id)
+            )
+            row = cur.fetchone()
+            if row:
+                self._bump_product_version(cur, row[0])
+                self._mark_digest(cur, row[0])
+        if row:
+            self._invalidate(row[0])
+        return row[0] if row else None
 
-    def list_for_product(self, product_id):
-        conn = get_db_connection(self.cfg)
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT id, review_text
-            FROM reviews
-            WHERE product_id=%s
-            ORDER BY id DESC
-        """, (product_id,))
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
+    def _list_for_product(self, product_id):
+        with self.pool.cursor() as cur:
+            cur.execute("""
+                SELECT id, review_text
+                FROM reviews
+                WHERE product_id=%s
+                ORDER BY id DESC
+            """, (product_id,))
+            rows = cur.fetchall()
         return [{"id": r[0], "text": r[1]} for r in rows]
 
+    @timed("db.reviews.list_for_product")
+    def list_for_product(self, product_id):
+        if self.cache is None:
+            return self._list_for_product(product_id)
+        return self.cache.reviews(product_id, lambda: self._list_for_product(product_id))
+
+    @timed("db.reviews.list_page")
+    def list_page(self, product_id, before_id=None, limit=20):
+        with self.pool.cursor() as cur:
+            cur.execute("""
+                SELECT id, review_text
+                FROM reviews
+                WHERE product_id=%s AND (%s::int IS NULL OR id < %s::int)
+                ORDER BY id DESC
+                LIMIT %s
+            """, (product_id, before_id, before_id, limit + 1))
+            rows = cur.fetchall()
+        return [{"id": r[0], "text": r[1]} for r in rows[:limit]], len(rows) > limit
+
     def get_text(self, review_id):
-        conn = get_db_connection(self.cfg)
-        cur = conn.cursor()
-        cur.execute("SELECT review_text FROM reviews WHERE id=%s", (review_id,))
-        row = cur.fetchone()
-        cur.close()
-        conn.close()
-        return row[0] if row else None
\ No newline at end of file
+        with self.pool.cursor() as cur:
+            cur.execute("SELECT review_text FROM reviews WHERE id=%s", (review_id,))
+            row = cur.fetchone()
+        return row[0] if row else None
@@ -0,0 +1,32 @@
+import time
+from contextlib import contextmanager
+
+import embedding
+
+
+class StartupReport:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.finished = None
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - started))
+
+    def done(self, report=print):
+        self.finished = time.perf_counter()
+        parts = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.phases)
+        report(f"Start aplikacji: {self.finished - self.started:.2f}s ({parts})")
+
+    def stats(self):
+        total = (self.finished or time.perf_counter()) - self.started
+        return {
+            "total_seconds": round(total, 3),
+            "phases": {name: round(seconds, 3) for name, seconds in self.phases},
+            "model_load_seconds": dict(embedding.load_seconds),
+        }
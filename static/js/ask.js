@@ -17,14 +17,17 @@ function addMessage(sender, text) {
   div.appendChild(bubble);
   chat.appendChild(div);
   chat.scrollTop = chat.scrollHeight;
+  return bubble;
 }
 
-function addProducts(products) {
+function addProducts(products, container) {
   const chat = document.getElementById("chat");
+  const target = container || chat;
 
   products.forEach(p => {
     const card = document.createElement("div");
     card.className = "product-card";
+    card.dataset.productId = p.id;
     card.onclick = () => window.open(`/product/${p.id}`, "_blank");
 
     const img = document.createElement("img");
@@ -38,12 +41,29 @@ function addProducts(products) {
     card.appendChild(img);
     card.appendChild(name);
 
-    chat.appendChild(card);
+    if (p.capacity) {
+      const capacity = document.createElement("div");
+      capacity.innerText = p.capacity;
+      capacity.className = "text-muted small";
+      card.appendChild(capacity);
+    }
+
+    target.appendChild(card);
   });
 
   chat.scrollTop = chat.scrollHeight;
 }
 
+function parseEvent(raw) {
+  let event = "message";
+  const data = [];
+  raw.split("\n").forEach(line => {
+    if (line.startsWith("event:")) event = line.slice(6).trim();
+    else if (line.startsWith("data:")) data.push(line.slice(5).trim());
+  });
+  return { event, data: data.length ? JSON.parse(data.join("\n")) : null };
+}
+
 async function sendMessage(event) {
   event.preventDefault();
   const question = document.getElementById("question").value.trim();
@@ -51,30 +71,59 @@ async function sendMessage(event) {
 
   addMessage("user", question);
   document.getElementById("question").value = "";
-  addMessage("ai", "⏳ Myślę...");
+  const bubble = addMessage("ai", "⏳ Myślę...");
+  const chat = document.getElementById("chat");
+  const cards = document.createElement("div");
+  chat.appendChild(cards);
+
+  let answer = "";
 
   try {
-    const res = await fetch("/ask", {
+    const res = await fetch("/ask_stream", {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({ question })
     });
-
-    const data = await res.json();
-    document.querySelector(".msg-ai:last-child").remove();
-
-    if (data.answer) {
-      addMessage("ai", data.answer);
-    } else {
-      addMessage("ai", "Brak odpowiedzi od AI.");
+    if (!res.ok || !res.body) throw new Error(`HTTP ${res.status}`);
+
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let sep;
+      while ((sep = buffer.indexOf("\n\n")) !== -1) {
+        const msg = parseEvent(buffer.slice(0, sep));
+        buffer = buffer.slice(sep + 2);
+
+        if (msg.event === "products") {
+          addProducts(msg.data, cards);
+        } else if (msg.event === "token") {
+          answer += msg.data.text;
+          bubble.innerHTML = marked.parse(answer);
+          chat.scrollTop = chat.scrollHeight;
+        } else if (msg.event === "done") {
+          answer = msg.data.answer;
+          bubble.innerHTML = marked.parse(answer || "Brak odpowiedzi od AI.");
+          const keep = new Set(msg.data.products.map(String));
+          cards.querySelectorAll(".product-card").forEach(card => {
+            if (!keep.has(card.dataset.productId)) card.remove();
+          });
+        } else if (msg.event === "error") {
+          bubble.innerText = "Błąd generowania odpowiedzi.";
+        }
+      }
     }
 
-    if (data.products && data.products.length > 0) {
-      addProducts(data.products);
+    if (!answer && bubble.innerText.startsWith("⏳")) {
+      bubble.innerText = "Brak odpowiedzi od AI.";
     }
   } catch (err) {
-    document.querySelector(".msg-ai:last-child").remove();
-    addMessage("ai", "Błąd połączenia z serwerem.");
+    bubble.innerText = "Błąd połączenia z serwerem.";
     console.error(err);
   }
 }
@@ -54,7 +54,89 @@ function startEditReview(button, reviewId) {
   };
 }
 
+const JOB_STAGES = {
+  fetch: "pobieranie strony",
+  extract: "wyciąganie treści",
+  summarize: "generowanie opisu",
+  embed: "wektoryzacja",
+  upsert: "zapis w bazie"
+};
+
+async function pollJob(box) {
+  const res = await fetch(`/jobs/${box.dataset.jobId}`);
+  if (!res.ok) {
+    box.remove();
+    return;
+  }
+  const job = await res.json();
+
+  if (job.status === "done") {
+    box.className = "alert alert-success";
+    box.innerText = "✅ Produkt zapisany.";
+    const params = new URLSearchParams(window.location.search);
+    params.delete("job");
+    setTimeout(() => { window.location.search = params.toString(); }, 800);
+    return;
+  }
+  if (job.status === "failed") {
+    box.className = "alert alert-danger";
+    box.innerText = `❌ Błąd przetwarzania: ${job.error || "nieznany"}`;
+    return;
+  }
+
+  const stage = JOB_STAGES[job.stage] || "w kolejce";
+  const retry = job.attempts > 1 ? ` (próba ${job.attempts})` : "";
+  box.innerText = `⏳ Przetwarzanie produktu: ${stage} – ${job.progress}%${retry}`;
+  setTimeout(() => pollJob(box), 1500);
+}
+
+function reviewItem(r) {
+  const item = document.createElement("div");
+  item.className = "review-item";
+
+  const text = document.createElement("div");
+  text.className = "review-text";
+  text.innerText = `“${r.text}”`;
+
+  const actions = document.createElement("div");
+  actions.className = "review-actions";
+  actions.innerHTML = `
+      <button class="btn btn-sm btn-outline-warning">✏</button>
+      <button class="btn btn-sm btn-outline-danger">🗑</button>
+  `;
+  const [editBtn, deleteBtn] = actions.querySelectorAll("button");
+  editBtn.onclick = () => startEditReview(editBtn, r.id);
+  deleteBtn.onclick = () => deleteReview(r.id);
+
+  item.appendChild(text);
+  item.appendChild(actions);
+  return item;
+}
+
+async function loadMoreReviews(button) {
+  const productId = button.dataset.productId;
+  const res = await fetch(`/reviews/${productId}?before=${button.dataset.before}`);
+  if (!res.ok) return;
+  const data = await res.json();
+
+  const list = document.querySelector(`.review-list[data-product-id="${productId}"]`);
+  data.reviews.forEach(r => list.appendChild(reviewItem(r)));
+
+  if (data.has_more && data.reviews.length) {
+    button.dataset.before = data.reviews[data.reviews.length - 1].id;
+  } else {
+    button.remove();
+  }
+}
+
 document.addEventListener("DOMContentLoaded", () => {
+  document.querySelectorAll(".more-reviews").forEach(button => {
+    button.addEventListener("click", () => loadMoreReviews(button));
+  });
+
+  const jobBox = document.getElementById("jobStatus");
+  if (jobBox) pollJob(jobBox);
+
   document.querySelectorAll(".md").forEach(el => {
     el.innerHTML = marked.parse(el.innerText);
   });
@@ -0,0 +1,225 @@
+import html
+import re
+from urllib.parse import urljoin
+
+import fitz
+from bs4 import BeautifulSoup
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:
+    HTMLParser = None
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+BOILERPLATE_TAGS = [
+    "head", "script", "style", "noscript", "template", "iframe", "svg", "canvas",
+    "nav", "footer", "aside", "form", "button", "select",
+]
+
+PAGE_TAGS = ["header"]
+
+BOILERPLATE_MARKERS = [
+    "cookie", "consent", "gdpr", "rodo", "newsletter", "breadcrumb",
+    "navbar", "menu", "footer", "popup", "modal", "banner", "social", "share",
+]
+
+CONTENT_TAGS = {"main", "article"}
+KEEP_TAGS = {"html", "body"} | CONTENT_TAGS
+
+BOILERPLATE_SELECTOR = ", ".join(
+    BOILERPLATE_TAGS
+    + PAGE_TAGS
+    + [f'[class~="{m}" i]' for m in BOILERPLATE_MARKERS]
+    + [f'[id="{m}" i]' for m in BOILERPLATE_MARKERS]
+    + ['[role="navigation"]', '[role="banner"]', '[role="contentinfo"]', '[aria-hidden="true"]']
+)
+
+BOILERPLATE_ROLES = {"navigation", "banner", "contentinfo"}
+
+_MARKERS = set(BOILERPLATE_MARKERS)
+_BOILERPLATE_TAGS = set(BOILERPLATE_TAGS)
+_PAGE_TAGS = set(PAGE_TAGS)
+
+
+def is_boilerplate(tag, get, in_content):
+    if tag in KEEP_TAGS:
+        return False
+    if tag in _BOILERPLATE_TAGS:
+        return True
+    if tag in _PAGE_TAGS:
+        return not in_content()
+    if get("role") in BOILERPLATE_ROLES or get("aria-hidden") == "true":
+        return True
+    classes = get("class") or ""
+    if isinstance(classes, str):
+        classes = classes.split()
+    return any(c.lower() in _MARKERS for c in classes) or (get("id") or "").lower() in _MARKERS
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text, max_chars=None):
+    text = _WHITESPACE.sub(" ", text).strip()
+    if max_chars and len(text) > max_chars:
+        cut = text.rfind(" ", 0, max_chars)
+        text = text[:cut if cut > max_chars // 2 else max_chars]
+    return text
+
+
+_META_TAG = re.compile(rb"<meta\b[^>]*>", re.IGNORECASE)
+_META_ATTR = re.compile(rb"""([\w:-]+)\s*=\s*(?:"([^"]*)"|'([^']*)')""")
+_HEAD_END = re.compile(rb"</head\s*>", re.IGNORECASE)
+
+IMAGE_META = (b"og:image", b"og:image:url", b"og:image:secure_url", b"twitter:image")
+HEAD_SCAN_BYTES = 256 * 1024
+
+
+def meta_image_url(content, base_url=None):
+    if isinstance(content, str):
+        content = content.encode("utf-8", errors="replace")
+    head = content[:HEAD_SCAN_BYTES]
+    end = _HEAD_END.search(head)
+    if end:
+        head = head[:end.start()]
+
+    found = {}
+    for tag in _META_TAG.finditer(head):
+        attrs = {k.lower(): a or b for k, a, b in _META_ATTR.findall(tag.group(0))}
+        kind = (attrs.get(b"property") or attrs.get(b"name") or b"").lower()
+        if kind in IMAGE_META and attrs.get(b"content"):
+            found.setdefault(kind, attrs[b"content"])
+
+    for kind in IMAGE_META:
+        if kind in found:
+            url = html.unescape(found[kind].decode("utf-8", errors="replace").strip())
+            return urljoin(base_url, url) if base_url else url
+    return None
+
+
+class SelectolaxBackend:
+    name = "selectolax"
+
+    def extract(self, content, encoding=None, strip_boilerplate=True):
+        if isinstance(content, bytes):
+            content = content.decode(encoding or "utf-8", errors="replace")
+        tree = HTMLParser(content)
+        if not strip_boilerplate:
+            tree.strip_tags(["script", "style", "noscript"])
+        else:
+            nodes = [
+                n for n in tree.css(BOILERPLATE_SELECTOR)
+                if n.tag not in KEEP_TAGS and not (n.tag in _PAGE_TAGS and self._in_content(n))
+            ]
+            matched = {n.mem_id for n in nodes}
+            for node in nodes:
+                parent = node.parent
+                while parent is not None and parent.mem_id not in matched:
+                    parent = parent.parent
+                if parent is None:
+                    node.decompose()
+        root = tree.body or tree.root
+        return root.text(separator=" ") if root is not None else ""
+
+    @staticmethod
+    def _in_content(node):
+        parent = node.parent
+        while parent is not None:
+            if parent.tag in CONTENT_TAGS:
+                return True
+            parent = parent.parent
+        return False
+
+
+class LxmlBackend:
+    name = "lxml"
+
+    def extract(self, content, encoding=None, strip_boilerplate=True):
+        if isinstance(content, bytes) and encoding:
+            content = content.decode(encoding, errors="replace")
+        if not content:
+            return ""
+        doc = lxml.html.document_fromstring(content)
+        if strip_boilerplate:
+            nodes = [
+                n for n in doc.iter()
+                if isinstance(n.tag, str)
+                and is_boilerplate(n.tag, n.get, lambda: next(n.iterancestors(*CONTENT_TAGS), None) is not None)
+            ]
+        else:
+            nodes = doc.xpath("//script|//style|//noscript")
+        for node in nodes:
+            if node.getparent() is not None:
+                node.drop_tree()
+        return doc.text_content()
+
+
+class BeautifulSoupBackend:
+    name = "html.parser"
+
+    def extract(self, content, encoding=None, strip_boilerplate=True):
+        soup = BeautifulSoup(content, "html.parser", from_encoding=encoding if isinstance(content, bytes) else None)
+        if strip_boilerplate:
+            tags = soup.find_all(
+                lambda t: is_boilerplate(t.name, t.get, lambda: t.find_parent(list(CONTENT_TAGS)) is not None)
+            )
+        else:
+            tags = soup(["script", "style", "noscript"])
+        for tag in tags:
+            if not tag.decomposed:
+                tag.decompose()
+        return soup.get_text(separator=" ")
+
+
+def available_backends():
+    backends = {}
+    if HTMLParser is not None:
+        backends["selectolax"] = SelectolaxBackend
+    if lxml is not None:
+        backends["lxml"] = LxmlBackend
+    backends["html.parser"] = BeautifulSoupBackend
+    return backends
+
+
+def create_html_backend(name="auto"):
+    backends = available_backends()
+    if name == "auto":
+        return next(iter(backends.values()))()
+    if name not in backends:
+        raise ValueError(f"Parser HTML '{name}' jest niedostępny (dostępne: {', '.join(backends)})")
+    return backends[name]()
+
+
+class TextExtractionEngine:
+    def __init__(self, cfg, html_backend=None):
+        self.html_backend = html_backend or create_html_backend(cfg.EXTRACT_HTML_BACKEND)
+        self.strip_boilerplate = cfg.EXTRACT_STRIP_BOILERPLATE
+        self.max_chars = cfg.EXTRACT_MAX_CHARS
+        self.pdf_max_pages = cfg.EXTRACT_PDF_MAX_PAGES
+
+    def html_text(self, content, encoding=None):
+        text = self.html_backend.extract(content, encoding, self.strip_boilerplate)
+        return normalize_text(text, self.max_chars)
+
+    def pdf_pages(self, content):
+        budget = self.max_chars or None
+        with fitz.open(stream=content, filetype="pdf") as doc:
+            for i, page in enumerate(doc):
+                if self.pdf_max_pages and i >= self.pdf_max_pages:
+                    return
+                text = normalize_text(page.get_text())
+                if not text:
+                    continue
+                if budget is not None:
+                    if budget <= 0:
+                        return
+                    text = normalize_text(text, budget)
+                    budget -= len(text) + 1
+                yield text
+
+    def pdf_text(self, content):
+        return "\n".join(self.pdf_pages(content))